@@ -0,0 +1,64 @@
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+
+# Inline mixes, as chances that a sentence is followed by each kind of markup.
+PROSE = {
+    "plain": {"bold": 0, "italic": 0, "code": 0, "link": 0},
+    "mixed": None,
+    "link_heavy": {"bold": 0, "italic": 0, "code": 0, "link": 1},
+}
+
+
+def throughput(parse, texts, size, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in texts:
+            parse(text)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return round(size / best / (1024 * 1024), 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inline parser throughput in MB/s")
+    parser.add_argument("--texts", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5, help="report the best of N runs")
+    parser.add_argument(
+        "--src",
+        type=Path,
+        default=BENCH_DIR.parent / "src",
+        help="src/ directory to benchmark, e.g. a worktree of an older revision",
+    )
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(BENCH_DIR))
+    sys.path.insert(0, str(args.src.resolve()))
+    from corpus import DEFAULT_INLINE, generate_inline_texts
+    from markdown_blocks import text_to_textnode
+    parsers = {"text_to_textnode": text_to_textnode}
+    try:
+        from inline import scan_inline
+        parsers["scan_inline"] = scan_inline
+    except ImportError:
+        pass
+
+    result = {"src": str(args.src), "texts": args.texts, "mb_per_s": {}}
+    for name, inline in PROSE.items():
+        texts = generate_inline_texts(args.texts, args.seed, inline or DEFAULT_INLINE)
+        size = sum(len(text.encode("utf-8")) for text in texts)
+        result["mb_per_s"][name] = {
+            parser_name: throughput(parse, texts, size, args.repeat)
+            for parser_name, parse in parsers.items()
+        }
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+import argparse
+import json
+import resource
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Peak memory and allocation counts for parsing a synthetic corpus"
+    )
+    parser.add_argument("--pages", type=int, default=50000)
+    parser.add_argument("--blocks", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--src",
+        type=Path,
+        default=BENCH_DIR.parent / "src",
+        help="src/ directory to benchmark, e.g. a worktree of an older revision",
+    )
+    args = parser.parse_args()
+
+    sys.path.insert(0, str(BENCH_DIR))
+    sys.path.insert(0, str(args.src.resolve()))
+    from corpus import generate_pages
+    from markdown_blocks import markdown_to_html_node
+
+    pages = [text for _, text in generate_pages(args.pages, args.seed, args.blocks)]
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    trees = [markdown_to_html_node(text) for text in pages]
+    elapsed = time.perf_counter() - start
+    snapshot = tracemalloc.take_snapshot()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    live_blocks = sum(stat.count for stat in snapshot.statistics("filename"))
+    result = {
+        "pages": len(trees),
+        "src": str(args.src),
+        "seconds": round(elapsed, 3),
+        "retained_bytes": current,
+        "peak_traced_bytes": peak,
+        "live_allocations": live_blocks,
+        "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+import argparse
+import json
+from pathlib import Path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two bench/run.py JSON results")
+    parser.add_argument("baseline", type=Path)
+    parser.add_argument("candidate", type=Path)
+    args = parser.parse_args()
+
+    baseline = json.loads(args.baseline.read_text())
+    candidate = json.loads(args.candidate.read_text())
+
+    print(f"{'stage':<16}{'baseline s':>12}{'candidate s':>13}{'change':>9}")
+    stages = list(baseline["stages"])
+    stages += [stage for stage in candidate["stages"] if stage not in baseline["stages"]]
+    for stage in stages + ["total"]:
+        if stage == "total":
+            before = baseline["total_seconds"]
+            after = candidate["total_seconds"]
+        else:
+            before = baseline["stages"].get(stage, {}).get("seconds")
+            after = candidate["stages"].get(stage, {}).get("seconds")
+        if before is None or after is None:
+            change = "n/a"
+        else:
+            change = f"{(after - before) / before * 100:+.1f}%" if before else "n/a"
+        fmt = lambda value: "-" if value is None else f"{value:.4f}"
+        print(f"{stage:<16}{fmt(before):>12}{fmt(after):>13}{change:>9}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+import argparse
+import os
+import random
+from pathlib import Path
+
+
+WORDS = (
+    "ring elf hobbit river mountain shadow light star forest song road "
+    "journey tower gate stone fire water wind king council sword horn "
+    "valley bridge lantern map letter ship harbor silver golden ancient"
+).split()
+
+DEFAULT_MIX = {
+    "paragraph": 40,
+    "heading": 10,
+    "list": 10,
+    "ordered_list": 10,
+    "quote": 10,
+    "code": 10,
+    "image": 10,
+}
+
+# Chance that a sentence inside a paragraph or list item is followed by
+# each kind of inline markup.
+DEFAULT_INLINE = {
+    "bold": 0.2,
+    "italic": 0.15,
+    "code": 0.15,
+    "link": 0.15,
+}
+
+TEMPLATE = """<!doctype html>
+<html>
+  <head>
+    <title>{{ Title }}</title>
+    <link href="/index.css" rel="stylesheet" />
+  </head>
+  <body>
+    <article>{{ Content }}</article>
+  </body>
+</html>
+"""
+
+
+def parse_mix(text, defaults):
+    mix = dict(defaults)
+    if not text:
+        return mix
+    for item in text.split(","):
+        key, _, value = item.partition("=")
+        if key not in defaults:
+            raise ValueError(f"Unknown mix key: {key}")
+        mix[key] = float(value)
+    return mix
+
+
+def _sentence(rng, words=12):
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def _inline(rng, inline):
+    parts = []
+    for _ in range(rng.randint(2, 5)):
+        parts.append(_sentence(rng, rng.randint(4, 10)))
+        roll = rng.random()
+        if roll < inline["bold"]:
+            parts.append(f"**{rng.choice(WORDS)}**")
+            continue
+        roll -= inline["bold"]
+        if roll < inline["italic"]:
+            parts.append(f"_{rng.choice(WORDS)}_")
+            continue
+        roll -= inline["italic"]
+        if roll < inline["code"]:
+            parts.append(f"`{rng.choice(WORDS)}()`")
+            continue
+        roll -= inline["code"]
+        if roll < inline["link"]:
+            parts.append(f"[{rng.choice(WORDS)}](/blog/{rng.choice(WORDS)})")
+    return " ".join(parts)
+
+
+def _block(rng, kind, inline):
+    if kind == "paragraph":
+        return _inline(rng, inline)
+    if kind == "heading":
+        return f"{'#' * rng.randint(2, 4)} {_sentence(rng, 3)[:-1]}"
+    if kind == "list":
+        return "\n".join(f"- {_inline(rng, inline)}" for _ in range(rng.randint(2, 5)))
+    if kind == "ordered_list":
+        return "\n".join(f"{i}. {_inline(rng, inline)}" for i in range(1, rng.randint(3, 6)))
+    if kind == "quote":
+        return "\n".join(f"> {_sentence(rng)}" for _ in range(rng.randint(1, 3)))
+    if kind == "code":
+        body = "\n".join(f"    {rng.choice(WORDS)} = {rng.randint(0, 99)}" for _ in range(4))
+        return f"```\n{body}\n```"
+    if kind == "image":
+        name = rng.choice(WORDS)
+        return f"![{name}](/images/{name}.png)"
+    raise ValueError(f"Unknown block kind: {kind}")
+
+
+def generate_page(rng, blocks=8, mix=None, inline=None):
+    mix = mix or DEFAULT_MIX
+    inline = inline or DEFAULT_INLINE
+    kinds = list(mix)
+    weights = [mix[kind] for kind in kinds]
+    out = [f"# {_sentence(rng, 4)[:-1]}"]
+    for kind in rng.choices(kinds, weights, k=blocks):
+        out.append(_block(rng, kind, inline))
+    return "\n\n".join(out) + "\n"
+
+
+def generate_inline_texts(count, seed=0, inline=None):
+    rng = random.Random(seed)
+    inline = inline or DEFAULT_INLINE
+    return [_inline(rng, inline) for _ in range(count)]
+
+
+def generate_pages(count, seed=0, blocks=8, mix=None, inline=None):
+    rng = random.Random(seed)
+    for i in range(count):
+        # Spread pages over nested sections the way content/blog/<post>/ is laid out.
+        path = f"section{i % 10}/post{i // 10:05d}/index.md" if i else "index.md"
+        yield path, generate_page(rng, blocks, mix, inline)
+
+
+def write_corpus(root, pages, seed=0, blocks=8, mix=None, inline=None,
+                 assets=50, asset_size=64 * 1024):
+    root = Path(root)
+    content = root / "content"
+    static = root / "static"
+
+    for rel_path, text in generate_pages(pages, seed, blocks, mix, inline):
+        path = content / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(text)
+
+    rng = random.Random(seed + 1)
+    (static / "images").mkdir(parents=True, exist_ok=True)
+    (static / "index.css").write_text("body { font-family: serif; }\n" * 20)
+    for i in range(assets):
+        subdir = static / "images" / f"set{i % 5}"
+        subdir.mkdir(exist_ok=True)
+        size = rng.randint(asset_size // 2, asset_size * 3 // 2)
+        (subdir / f"asset{i:04d}.png").write_bytes(rng.randbytes(size))
+
+    (root / "template.html").write_text(TEMPLATE)
+    return root
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a deterministic synthetic site")
+    parser.add_argument("root", type=Path)
+    parser.add_argument("--pages", type=int, default=1000)
+    parser.add_argument("--blocks", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--mix", help="block weights, e.g. paragraph=5,code=1")
+    parser.add_argument("--inline", help="inline markup rates, e.g. link=0.5")
+    parser.add_argument("--assets", type=int, default=50)
+    parser.add_argument("--asset-size", type=int, default=64 * 1024)
+    args = parser.parse_args()
+
+    os.makedirs(args.root, exist_ok=True)
+    write_corpus(
+        args.root,
+        args.pages,
+        args.seed,
+        args.blocks,
+        parse_mix(args.mix, DEFAULT_MIX),
+        parse_mix(args.inline, DEFAULT_INLINE),
+        args.assets,
+        args.asset_size,
+    )
+    print(f"Wrote {args.pages} pages and {args.assets} assets to {args.root}")
+
+
+if __name__ == "__main__":
+    main()
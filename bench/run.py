@@ -0,0 +1,216 @@
+import argparse
+import contextlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BENCH_DIR = Path(__file__).resolve().parent
+ROOT_DIR = BENCH_DIR.parent
+sys.path.insert(0, str(BENCH_DIR))
+sys.path.insert(0, str(ROOT_DIR / "src"))
+
+from corpus import DEFAULT_INLINE, DEFAULT_MIX, parse_mix, write_corpus
+from copystatic import clear_public_dir, sync_static
+from gencontent import extract_title, find_pages
+from inline import scan_inline
+from htmlnode import LeafNode, ParentNode
+from markdown_blocks import (
+    BlockType,
+    blocktype_to_tag,
+    classify_lines,
+    remove_block_header,
+    scan_blocks,
+)
+from template import load_template
+from textnode import text_node_to_html_node
+
+
+LIST_TYPES = (BlockType.ORDERED_LIST, BlockType.UNORDERED_LIST)
+
+
+def _parse_inline(block_type, block):
+    # The stripped block and its inline nodes: one list per list item, or a
+    # single list for any other block. Code blocks have none.
+    stripped = remove_block_header(block, block_type)
+    if block_type == BlockType.CODE:
+        return stripped, []
+    if block_type in LIST_TYPES:
+        return stripped, [scan_inline(item) for item in stripped.split("\n") if item]
+    return stripped, [scan_inline(stripped)]
+
+
+def _block_node(block_type, stripped, inline, basepath):
+    # Same tree as markdown_blocks.block_to_html_node, built from the inline
+    # nodes already parsed so that no stage repeats another's work.
+    if block_type == BlockType.CODE:
+        return ParentNode("pre", [LeafNode("code", stripped)])
+    children = [[text_node_to_html_node(node, basepath) for node in nodes] for nodes in inline]
+    tag = blocktype_to_tag(block_type)
+    if block_type in LIST_TYPES:
+        return ParentNode(tag, [ParentNode("li", item) for item in children])
+    return ParentNode(tag, children[0])
+
+
+def run_stages(root, out_dir, basepath, copy_jobs=8):
+    # Returns (timings, breakdown, page count, source bytes). Each stage
+    # starts from the previous stage's output, so timings add up to the
+    # build; breakdown times parts of a stage again on their own.
+    timings = {}
+    breakdown = {}
+
+    def timed(name, fn, into=timings):
+        start = time.perf_counter()
+        result = fn()
+        into[name] = time.perf_counter() - start
+        return result
+
+    def static_copy():
+        clear_public_dir(out_dir)
+        sync_static(root / "static", out_dir, out_dir.with_suffix(".manifest.json"), jobs=copy_jobs)
+
+    # The static copy prints a line per file; keep stdout clean for the JSON.
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        timed("static_copy", static_copy)
+    pages = find_pages(root / "content", out_dir)
+
+    def read():
+        sources = []
+        for source, _ in pages:
+            with open(source, "r") as f:
+                sources.append(f.read())
+        return sources
+
+    sources = timed("read", read)
+    # scan_blocks classifies each block as it splits; block_classify is that
+    # share of block_split.
+    blocks = timed("block_split", lambda: [list(scan_blocks(text.split("\n"))) for text in sources])
+    timed(
+        "block_classify",
+        lambda: [[classify_lines(block.split("\n")) for _, block in page] for page in blocks],
+        into=breakdown,
+    )
+    inline = timed(
+        "inline_parse",
+        lambda: [[_parse_inline(block_type, block) for block_type, block in page] for page in blocks],
+    )
+
+    def build_trees():
+        return [
+            ParentNode("div", [
+                _block_node(block_type, stripped, nodes, basepath)
+                for (block_type, _), (stripped, nodes) in zip(page_blocks, page_inline)
+            ])
+            for page_blocks, page_inline in zip(blocks, inline)
+        ]
+
+    trees = timed("tree_build", build_trees)
+    html = timed("html_render", lambda: [tree.to_html() for tree in trees])
+
+    def fill():
+        template = load_template(root / "template.html", basepath)
+        return [
+            template.render(title=extract_title(text), content=content)
+            for text, content in zip(sources, html)
+        ]
+
+    documents = timed("template_fill", fill)
+
+    def write():
+        for (_, destination), document in zip(pages, documents):
+            os.makedirs(destination.parent, exist_ok=True)
+            with open(destination, "w", encoding="utf-8") as f:
+                f.write(document)
+
+    timed("write", write)
+    return timings, breakdown, len(pages), sum(len(text) for text in sources)
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time each stage of the build pipeline")
+    parser.add_argument("--pages", type=int, default=2000)
+    parser.add_argument("--blocks", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--mix", help="block weights, e.g. paragraph=5,code=1")
+    parser.add_argument("--inline", help="inline markup rates, e.g. link=0.5")
+    parser.add_argument("--assets", type=int, default=50)
+    parser.add_argument("--asset-size", type=int, default=64 * 1024)
+    parser.add_argument("--repeat", type=int, default=3, help="report the fastest of N runs")
+    parser.add_argument("--basepath", default="/")
+    parser.add_argument("--copy-jobs", type=int, default=8)
+    parser.add_argument("--corpus", type=Path, help="reuse an existing corpus directory")
+    parser.add_argument("--output", type=Path, help="write JSON results here as well")
+    args = parser.parse_args()
+    if args.repeat < 1:
+        parser.error("--repeat must be at least 1")
+
+    mix = parse_mix(args.mix, DEFAULT_MIX)
+    inline = parse_mix(args.inline, DEFAULT_INLINE)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        root = args.corpus or write_corpus(
+            tmp / "site", args.pages, args.seed, args.blocks, mix, inline,
+            args.assets, args.asset_size,
+        )
+
+        best = {}
+        best_breakdown = {}
+        for run in range(args.repeat):
+            out_dir = tmp / f"out{run}"
+            timings, breakdown, page_count, source_bytes = run_stages(
+                Path(root), out_dir, args.basepath, args.copy_jobs
+            )
+            for stage, seconds in timings.items():
+                best[stage] = min(seconds, best.get(stage, seconds))
+            for stage, seconds in breakdown.items():
+                best_breakdown[stage] = min(seconds, best_breakdown.get(stage, seconds))
+
+    def stage_result(seconds):
+        return {
+            "seconds": round(seconds, 6),
+            "us_per_page": round(seconds * 1e6 / max(page_count, 1), 2),
+        }
+
+    result = {
+        "meta": {
+            "revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "pages": page_count,
+            "source_bytes": source_bytes,
+            "seed": args.seed,
+            "blocks": args.blocks,
+            "mix": mix,
+            "inline": inline,
+            "repeat": args.repeat,
+            "copy_jobs": args.copy_jobs,
+        },
+        "stages": {stage: stage_result(seconds) for stage, seconds in best.items()},
+        # Already counted in the stages above, so not part of the total.
+        "breakdown": {stage: stage_result(seconds) for stage, seconds in best_breakdown.items()},
+        "total_seconds": round(sum(best.values()), 6),
+    }
+
+    text = json.dumps(result, indent=2)
+    if args.output:
+        args.output.write_text(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
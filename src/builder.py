@@ -0,0 +1,278 @@
+from pathlib import Path, PurePosixPath
+import io
+import os
+import time
+from plan import make_plan
+from storage import DirectoryStorage, safe_relative_path
+
+# The rendering modules (gencontent, markdown_blocks, copystatic, ...) are
+# imported by the methods that build, so planning a build or printing
+# --help never pays for them.
+
+
+MANIFEST_NAME = ".build-manifest.json"
+
+
+class Site():
+    # Where a site's sources live: a storage (or a directory path) holding
+    # the content and static trees and the template, as in this repo.
+    def __init__(self, source, basepath="/", content="content", static="static",
+                 template="template.html"):
+        if isinstance(source, (str, os.PathLike)):
+            source = DirectoryStorage(source)
+        self.source = source
+        self.basepath = basepath
+        self.content = content
+        self.static = static
+        self.template = template
+
+    def on_disk(self, name):
+        return self.source.root / name
+
+    def read_text(self, path):
+        # Same newline handling as open(path, "r").
+        text = self.source.read(path).decode("utf-8")
+        return text.replace("\r\n", "\n").replace("\r", "\n")
+
+    def __repr__(self):
+        return f"Site({self.source!r}, basepath={self.basepath!r})"
+
+
+class Builder():
+    # Builds a Site into an output storage. Directory to directory builds
+    # take the on-disk pipeline (build plan, manifest, incremental renders,
+    # reflinked static files, worker processes); any other combination is
+    # rendered in memory and written through the output storage.
+    def __init__(self, site, output, jobs=1, hooks=None, cache=None, stream=None,
+                 incremental=False, manifest=None, static_compare="mtime", hardlink=False,
+                 copy_jobs=8, scan_jobs=1, explain=False, precompress=None, site_url=None):
+        if isinstance(output, (str, os.PathLike)):
+            output = DirectoryStorage(output)
+        self.site = site
+        self.output = output
+        self.jobs = jobs
+        self.hooks = hooks
+        self.cache = cache
+        self.stream = stream
+        self.incremental = incremental
+        self.manifest = manifest
+        self.static_compare = static_compare
+        self.hardlink = hardlink
+        self.copy_jobs = copy_jobs
+        self.scan_jobs = scan_jobs
+        self.explain = explain
+        self.precompress = precompress
+        # With a site URL, sitemap.xml, feed.xml and search-index.json are
+        # written from the titles and summaries collected while rendering.
+        self.site_url = site_url
+
+    def on_disk(self):
+        return isinstance(self.site.source, DirectoryStorage) and isinstance(
+            self.output, DirectoryStorage
+        )
+
+    def manifest_path(self):
+        return self.manifest or self.site.on_disk(MANIFEST_NAME)
+
+    def _outputs_manifest(self):
+        # Where the files written to an output directory are recorded, so the
+        # next full build knows which ones it may prune; None if nowhere.
+        if self.manifest is not None:
+            return self.manifest
+        if isinstance(self.site.source, DirectoryStorage):
+            return self.site.on_disk(MANIFEST_NAME)
+        return None
+
+    def _check_output(self):
+        # Full builds prune the output directory, and every build overwrites
+        # it: it must not be, hold or sit inside the site's own sources.
+        if not isinstance(self.output, DirectoryStorage):
+            return
+        if not isinstance(self.site.source, DirectoryStorage):
+            return
+        output = self.output.root.resolve()
+        site = self.site
+        root = site.source.root.resolve()
+        if output == root or output in root.parents:
+            raise ValueError(f"The output directory {output} would contain the site sources")
+        for name in (site.content, site.static, site.template):
+            path = site.on_disk(name).resolve()
+            if output == path or output in path.parents or path in output.parents:
+                raise ValueError(f"The output directory {output} overlaps {path}")
+
+    def plan(self):
+        if not self.on_disk():
+            raise ValueError("Build plans are only made for directory builds")
+        return make_plan(
+            self.site.on_disk(self.site.content),
+            self.site.on_disk(self.site.static),
+            self.output.root,
+            self.scan_jobs,
+        )
+
+    def build(self):
+        self._check_output()
+        if self.on_disk():
+            self._build_on_disk()
+        else:
+            self._build_in_memory()
+        if self.cache is not None:
+            self.cache.evict()
+        return self.output
+
+    def _build_on_disk(self):
+        from copystatic import sync_static
+        from gencontent import generate_pages_incremental
+        from manifest import load_manifest, previous_outputs, record_outputs
+
+        site = self.site
+        hooks = self.hooks
+        static_dir = site.on_disk(site.static)
+        dest_dir = self.output.root
+        manifest = self.manifest_path()
+        previous = previous_outputs(load_manifest(manifest))
+
+        if hooks is not None:
+            hooks.stage_start("discover")
+        plan = self.plan()
+        if hooks is not None:
+            hooks.stage_end(
+                "discover", pages_planned=len(plan.pages), static_files=len(plan.static)
+            )
+
+        # A full build still records the manifest so a later incremental run
+        # knows which basepath the outputs on disk were rendered with.
+        if hooks is not None:
+            hooks.stage_start("copy_static")
+        sync_counts = sync_static(
+            static_dir, dest_dir, manifest, self.static_compare, self.hardlink,
+            self.copy_jobs, plan,
+        )
+        if hooks is not None:
+            hooks.stage_end("copy_static", **{f"static_{k}": v for k, v in sync_counts.items()})
+        keep = []
+        for step in plan.static:
+            # Static files compress while the pages render, and each page
+            # as soon as it is written.
+            self._keep_on_disk(keep, plan, step.destination, step.stat.st_size)
+        pages = generate_pages_incremental(
+            site.on_disk(site.content), site.on_disk(site.template), dest_dir, site.basepath,
+            manifest, jobs=self.jobs, hooks=hooks, cache=self.cache, stream=self.stream,
+            static_dir=static_dir, explain=self.explain, plan=plan, force=not self.incremental,
+            page_done=lambda destination: self._keep_on_disk(keep, plan, destination),
+        )
+        if self.site_url is not None:
+            from output import remove_precompressed, write_if_changed
+            from siteindex import records_from_manifest
+
+            for rel, data in self._site_index(records_from_manifest(pages, site.basepath)).items():
+                if write_if_changed(dest_dir / rel, data):
+                    remove_precompressed(dest_dir / rel)
+                keep.append(rel)
+                if self.precompress is not None:
+                    keep.extend(self.precompress.submit_file(dest_dir / rel, rel, len(data)))
+        self._finish_precompress()
+        if not self.incremental:
+            self.output.prune(keep, previous)
+        record_outputs(manifest, keep)
+
+    def _keep_on_disk(self, keep, plan, destination, size=None):
+        rel = destination.relative_to(plan.dest_dir).as_posix()
+        keep.append(rel)
+        if self.precompress is not None:
+            if size is None:
+                size = os.stat(destination).st_size
+            keep.extend(self.precompress.submit_file(destination, rel, size))
+
+    def _site_index(self, records):
+        from siteindex import site_index_files
+
+        build_time = int(os.environ.get("SOURCE_DATE_EPOCH", time.time()))
+        files = site_index_files(records, self.site_url, self.site.basepath, build_time)
+        print(f"Site index: {len(records)} page(s) in {', '.join(files)}")
+        return files
+
+    def _finish_precompress(self):
+        if self.precompress is not None:
+            compressed = self.precompress.finish()
+            print(f"Precompressed {compressed} file(s) ({', '.join(self.precompress.encodings)})")
+
+    def _build_in_memory(self):
+        from gencontent import raise_page_errors
+        from manifest import load_manifest, previous_outputs, record_outputs
+        from siteindex import PageRecord, page_url
+        from template import Template
+
+        site = self.site
+        hooks = self.hooks
+        template = Template(site.read_text(site.template), site.basepath)
+        written = []
+
+        if hooks is not None:
+            hooks.stage_start("copy_static")
+        static = site.source.list(site.static)
+        for path in static:
+            rel = safe_relative_path(PurePosixPath(path).relative_to(site.static).as_posix())
+            written.extend(self._write(rel, site.source.read(path)))
+        if hooks is not None:
+            hooks.stage_end("copy_static", static_copied=len(static))
+            hooks.stage_start("render")
+
+        errors = []
+        records = []
+        sources = [path for path in site.source.list(site.content) if path.lower().endswith(".md")]
+        for index, path in enumerate(sources):
+            rel = safe_relative_path(
+                PurePosixPath(path).relative_to(site.content).with_suffix(".html").as_posix()
+            )
+            if hooks is not None:
+                hooks.page_start(Path(path))
+            try:
+                data, info = self.render(path, template)
+            except Exception as e:
+                errors.append((index, path, f"{type(e).__name__}: {e}"))
+                continue
+            written.extend(self._write(rel, data))
+            # Storages keep no file times.
+            records.append(
+                PageRecord(page_url(rel, site.basepath), rel, info["title"], info["summary"], None)
+            )
+            if hooks is not None:
+                hooks.page_stage("render_write", bytes_written=len(data))
+                hooks.page_end(Path(path))
+        if hooks is not None:
+            hooks.stage_end("render")
+
+        if self.site_url is not None and not errors:
+            for rel, data in self._site_index(records).items():
+                written.extend(self._write(rel, data))
+        self._finish_precompress()
+        raise_page_errors(errors)
+        manifest = self._outputs_manifest()
+        if isinstance(self.output, DirectoryStorage) and manifest is not None:
+            self.output.prune(written, previous_outputs(load_manifest(manifest)))
+            record_outputs(manifest, written)
+
+    def _write(self, rel, data):
+        # Returns every path written: rel and its precompressed siblings.
+        self.output.write(rel, data)
+        if self.precompress is None:
+            return [rel]
+        return [rel] + self.precompress.submit(rel, data, self.output.write)
+
+    def render(self, path, template):
+        from gencontent import block_memo, content_summary, extract_title, render_cached
+        from markdown_blocks import markdown_to_html_node
+
+        markdown = self.site.read_text(path)
+        basepath = self.site.basepath
+        if self.cache is not None and self.cache.cacheable(markdown):
+            title, content, summary, _ = render_cached(markdown, basepath, self.cache)
+        else:
+            title = extract_title(markdown)
+            content = markdown_to_html_node(markdown, basepath, block_memo)
+            summary = content_summary(content.children)
+        buffer = io.StringIO()
+        template.write(buffer, title=title, content=content)
+        info = {"title": title, "summary": summary}
+        return buffer.getvalue().encode("utf-8"), info
@@ -0,0 +1,156 @@
+import json
+import os
+import threading
+import time
+
+
+class BuildHooks():
+    # Every layer takes hooks=None and only calls into a hooks object when one
+    # was passed, so a build without --stats does no extra work. Subclasses
+    # override what they care about.
+    def stage_start(self, name):
+        pass
+
+    def stage_end(self, name, **counters):
+        pass
+
+    def page_start(self, source):
+        pass
+
+    def page_stage(self, name, **counters):
+        pass
+
+    def page_end(self, source, **counters):
+        pass
+
+    def count(self, name, amount=1):
+        pass
+
+
+class StatsRecorder(BuildHooks):
+    def __init__(self):
+        self.events = []
+        self.counters = {}
+        self.pages = []
+        self._local = threading.local()
+        self._open_stages = {}
+        self._lock = threading.Lock()
+
+    def _now(self):
+        return time.perf_counter_ns()
+
+    def _event(self, name, category, start, end, args):
+        self.events.append({
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": start / 1000,
+            "dur": (end - start) / 1000,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": args,
+        })
+
+    def stage_start(self, name):
+        self._open_stages[name] = self._now()
+
+    def stage_end(self, name, **counters):
+        end = self._now()
+        start = self._open_stages.pop(name, end)
+        with self._lock:
+            self._event(name, "stage", start, end, counters)
+            self._add_counters(counters)
+
+    def page_start(self, source):
+        now = self._now()
+        self._local.page = (str(source), now, {})
+        self._local.mark = now
+
+    def page_stage(self, name, **counters):
+        now = self._now()
+        source, _, page_counters = self._local.page
+        start = self._local.mark
+        self._local.mark = now
+        stages = page_counters.setdefault("stages", {})
+        stages[name] = stages.get(name, 0) + (now - start)
+        for key, value in counters.items():
+            page_counters[key] = page_counters.get(key, 0) + value
+        with self._lock:
+            self._event(name, "page_stage", start, now, {"page": source, **counters})
+
+    def page_end(self, source, **counters):
+        now = self._now()
+        _, start, page_counters = self._local.page
+        for key, value in counters.items():
+            page_counters[key] = page_counters.get(key, 0) + value
+        stages = page_counters.pop("stages", {})
+        record = {
+            "page": str(source),
+            "ns": now - start,
+            "stages": stages,
+            "counters": page_counters,
+        }
+        with self._lock:
+            self.pages.append(record)
+            self._event(str(source), "page", start, now, page_counters)
+            self._add_counters(page_counters)
+            self._add_counters({"pages": 1})
+
+    def count(self, name, amount=1):
+        with self._lock:
+            self._add_counters({name: amount})
+
+    def _add_counters(self, counters):
+        for key, value in counters.items():
+            if isinstance(value, bool):
+                value = int(value)
+            if isinstance(value, (int, float)):
+                self.counters[key] = self.counters.get(key, 0) + value
+
+    def export(self):
+        return {"events": self.events, "counters": self.counters, "pages": self.pages}
+
+    def merge(self, exported):
+        with self._lock:
+            self.events.extend(exported["events"])
+            self.pages.extend(exported["pages"])
+            self._add_counters(exported["counters"])
+
+    def stage_totals(self):
+        totals = {}
+        for event in self.events:
+            if event["cat"] in ("stage", "page_stage"):
+                totals[event["name"]] = totals.get(event["name"], 0) + event["dur"]
+        return totals
+
+    def summary(self, top=10):
+        lines = ["Build stats:"]
+        for name, micros in self.stage_totals().items():
+            lines.append(f"  {name:<24}{micros / 1000:>10.1f} ms")
+        for name in sorted(self.counters):
+            lines.append(f"  {name:<24}{self.counters[name]:>10}")
+
+        slowest = sorted(self.pages, key=lambda page: page["ns"], reverse=True)[:top]
+        if slowest:
+            lines.append(f"Slowest {len(slowest)} page(s):")
+            for page in slowest:
+                stages = ", ".join(
+                    f"{name} {ns / 1e6:.2f}" for name, ns in page["stages"].items()
+                )
+                lines.append(f"  {page['ns'] / 1e6:>8.2f} ms  {page['page']}  ({stages})")
+        return "\n".join(lines)
+
+    def write_trace(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms"}, f)
+
+
+def count_nodes(node):
+    count = 0
+    stack = [node]
+    while stack:
+        current = stack.pop()
+        count += 1
+        if current.children:
+            stack.extend(current.children)
+    return count
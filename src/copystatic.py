@@ -1,6 +1,30 @@
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from manifest import hash_file, load_manifest, save_manifest
+from output import remove_precompressed
+from plan import walk
+import errno
+import fcntl
 import shutil
 import os
+import threading
+import time
+
+
+# ioctl request number for FICLONE on Linux (_IOW(0x94, 9, int)).
+FICLONE = 0x40049409
+
+# Errors that mean "this filesystem can't do that", not a real failure.
+UNSUPPORTED_ERRNOS = {
+    errno.EXDEV,
+    errno.EOPNOTSUPP,
+    errno.ENOTSUP,
+    errno.EINVAL,
+    errno.ENOSYS,
+    errno.ENOTTY,
+    errno.EPERM,
+    errno.EMLINK,
+}
 
 
 def clear_public_dir(dst):
@@ -20,33 +44,215 @@ def clear_public_dir(dst):
     destination.mkdir()
      
 
-def copy_files_recursive(src, dst):
-    source = Path(src).resolve()
+def prune_public_dir(dst, keep, previous):
+    # Full builds write over the previous output rather than clearing it
+    # first, so unchanged files keep their mtimes and the site is never
+    # half-empty. Afterwards, files the previous build wrote and this one
+    # did not are removed; anything else in the directory is not ours and
+    # is left alone.
     destination = Path(dst).resolve()
+    cwd = Path.cwd().resolve()
+    if destination == cwd or destination in cwd.parents:
+        raise RuntimeError("Refusing to prune the project root")
+    keep = {Path(path) for path in keep}
+    removed = 0
+    for path in sorted({Path(path) for path in previous} - keep):
+        if not path.is_relative_to(destination):
+            continue
+        if path.is_file() or path.is_symlink():
+            print(f"- Removing stale file: {path}")
+            path.unlink()
+            removed += 1
+            _remove_empty_parents(path, destination)
+    return removed
+
+
+def _hardlink(src, dst):
+    os.link(src, dst)
+
+
+def _reflink(src, dst):
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+
+
+def _copy_file_range(src, dst):
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        remaining = os.fstat(fsrc.fileno()).st_size
+        while remaining > 0:
+            copied = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+            if copied == 0:
+                break
+            remaining -= copied
 
-    if not destination.exists():
-        os.makedirs(destination)
 
-    for item in os.listdir(source):
-        item_path = source / item
-        dest_path = destination / item
+def _plain_copy(src, dst):
+    shutil.copyfile(src, dst)
 
-        if item_path.is_file():
-            print(f"- Copying file: {item_path}")
-            shutil.copy(item_path, dest_path)
 
-        elif item_path.is_dir():
-            print(f"Entering directory: {item_path}")
-            copy_files_recursive(item_path, dest_path)
+class FilePlacer():
+    # Tries the cheapest way to materialize a file first and drops a strategy
+    # for the rest of the run once the filesystem says it isn't supported.
+    def __init__(self, hardlink=False):
+        self.strategies = []
+        if hardlink:
+            self.strategies.append(("hardlink", _hardlink))
+        if hasattr(fcntl, "ioctl"):
+            self.strategies.append(("reflink", _reflink))
+        if hasattr(os, "copy_file_range"):
+            self.strategies.append(("copy_file_range", _copy_file_range))
+        self.strategies.append(("copy", _plain_copy))
+        self.used = {}
+        self._lock = threading.Lock()
+
+    def place(self, src, dst, src_stat):
+        # Never write through an existing file: it may be a hard link back
+        # into static/.
+        if os.path.lexists(dst):
+            os.unlink(dst)
+
+        failed = []
+        for name, strategy in list(self.strategies):
+            try:
+                strategy(src, dst)
+            except OSError as e:
+                if e.errno not in UNSUPPORTED_ERRNOS or name == "copy":
+                    raise
+                failed.append((name, strategy, e))
+                if os.path.lexists(dst):
+                    os.unlink(dst)
+                continue
+            with self._lock:
+                self.used[name] = self.used.get(name, 0) + 1
+                # Only now that a fallback has worked is the error taken to
+                # mean the filesystem can't do it; EPERM in particular can
+                # also be a real permission problem, which the plain copy
+                # then raises.
+                for failed_name, failed_strategy, e in failed:
+                    if (failed_name, failed_strategy) in self.strategies:
+                        self.strategies.remove((failed_name, failed_strategy))
+                        print(f"- {failed_name} not available ({e.strerror}), using {name} instead")
+            if name != "hardlink":
+                shutil.copymode(src, dst)
+                os.utime(dst, ns=(src_stat.st_atime_ns, src_stat.st_mtime_ns))
+            return name
+        raise RuntimeError(f"No copy strategy left for {src}")
+
+
+def file_unchanged(src, dst, src_stat, compare="mtime"):
+    try:
+        dst_stat = os.stat(dst)
+    except FileNotFoundError:
+        return False
+    if dst_stat.st_size != src_stat.st_size:
+        return False
+    if compare == "hash":
+        return hash_file(src) == hash_file(dst)
+    return dst_stat.st_mtime_ns == src_stat.st_mtime_ns
+
+
+class StaticCopyError(RuntimeError):
+    def __init__(self, message, errors):
+        super().__init__(message)
+        self.errors = errors
+
+
+def _remove_empty_parents(path, stop):
+    parent = path.parent
+    while parent != stop:
+        try:
+            parent.rmdir()
+        except OSError:
+            return
+        parent = parent.parent
+
+
+def sync_static(src, dst, manifest_path, compare="mtime", hardlink=False, jobs=8, plan=None):
+    source = Path(src).resolve()
+    destination = Path(dst).resolve()
+    manifest = load_manifest(manifest_path)
+    previous = manifest["static"]
+    placer = FilePlacer(hardlink)
+    start = time.perf_counter()
 
-        else:
-            print(f"Skipping unknown type: {item_path}")
+    if plan is not None:
+        files = [(step.rel, step.stat) for step in plan.static]
+        dirs = plan.static_dirs
+    else:
+        files, dirs = walk(source)
+    os.makedirs(destination, exist_ok=True)
+    for rel_dir in dirs:
+        os.makedirs(destination / rel_dir, exist_ok=True)
 
+    def sync_one(item):
+        rel_path, src_stat = item
+        item_path = source / rel_path
+        dest_path = destination / rel_path
+        if file_unchanged(item_path, dest_path, src_stat, compare):
+            return None
+        return placer.place(item_path, dest_path, src_stat)
 
-def copy_static(src, dst):
-    clear_public_dir(dst)
-    copy_files_recursive(src, dst)
+    results = []
+    errors = []
+    with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+        futures = [pool.submit(sync_one, item) for item in files]
+        for (rel_path, _), future in zip(files, futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                results.append(None)
+                errors.append((rel_path, f"{type(e).__name__}: {e}"))
 
+    if errors:
+        details = "\n".join(f"- {rel_path}: {message}" for rel_path, message in errors)
+        raise StaticCopyError(f"Failed to copy {len(errors)} static file(s):\n{details}", errors)
 
+    synced = {
+        rel_path: {"size": src_stat.st_size, "mtime_ns": src_stat.st_mtime_ns}
+        for rel_path, src_stat in files
+    }
+    synced_paths = {destination / rel_path for rel_path in synced}
+    copied = 0
+    copied_bytes = 0
+    for (rel_path, src_stat), method in zip(files, results):
+        if method is not None:
+            print(f"- Copying file: {source / rel_path}")
+            copied += 1
+            copied_bytes += src_stat.st_size
+            # Siblings compressed from the old copy are stale, unless they
+            # are static files themselves.
+            for sibling in remove_precompressed(destination / rel_path, synced_paths):
+                print(f"- Removing stale file: {sibling}")
 
+    removed = 0
+    for rel_path in previous:
+        if rel_path in synced:
+            continue
+        stale_path = destination / rel_path
+        siblings = remove_precompressed(stale_path, synced_paths)
+        for sibling in siblings:
+            print(f"- Removing stale file: {sibling}")
+        if stale_path.is_file() or stale_path.is_symlink():
+            print(f"- Removing stale file: {stale_path}")
+            stale_path.unlink()
+            removed += 1
+        elif not siblings:
+            continue
+        _remove_empty_parents(stale_path, destination)
 
+    manifest["static"] = synced
+    save_manifest(manifest, manifest_path)
+    elapsed = time.perf_counter() - start
+    skipped = len(files) - copied
+    methods = ", ".join(f"{name}: {count}" for name, count in placer.used.items()) or "none"
+    throughput = copied_bytes / elapsed / 1e6 if elapsed > 0 else 0.0
+    print(
+        f"Static sync: {copied} copied ({methods}), {skipped} unchanged, {removed} removed; "
+        f"{copied_bytes / 1e6:.1f} MB in {elapsed:.2f}s ({throughput:.1f} MB/s)"
+    )
+    return {
+        "copied": copied,
+        "unchanged": skipped,
+        "removed": removed,
+        "bytes_copied": copied_bytes,
+    }
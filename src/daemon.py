@@ -0,0 +1,143 @@
+from pathlib import Path
+import json
+import os
+import socket
+import socketserver
+import time
+from main import make_builder, make_parser
+from sitectl import SOCKET_PATH
+from watch import Rebuilder
+
+
+class BuildDaemon():
+    # Answers build requests from one long-lived process, so the imports,
+    # the parsed template, the block memo and the render cache stay warm.
+    # "rebuild" only looks at the paths it is given; "build" is a normal
+    # incremental build of the whole site. The build plan is not kept between
+    # builds: nothing watches the sources, so only a fresh walk sees files
+    # added or removed since the last request.
+    def __init__(self, builder):
+        if not builder.on_disk():
+            raise ValueError("The build daemon needs a source directory and an output directory")
+        site = builder.site
+        self.builder = builder
+        self.rebuilder = Rebuilder(
+            site.on_disk(site.content), site.on_disk(site.static), site.on_disk(site.template),
+            builder.output.root, site.basepath, builder.cache, builder.jobs, builder.manifest_path(),
+        )
+        self.started = time.time()
+        self.builds = 0
+        self.stopping = False
+
+    def handle(self, request):
+        command = request.get("command")
+        if command == "ping":
+            return {"pid": os.getpid(), "uptime": time.time() - self.started, "builds": self.builds}
+        if command == "stop":
+            self.stopping = True
+            return {}
+        if command == "build":
+            self.builder.build()
+            self.builds += 1
+            return {}
+        if command == "rebuild":
+            paths = request.get("paths")
+            if not isinstance(paths, list):
+                raise ValueError("rebuild needs a list of paths")
+            summary = self.rebuilder.rebuild(
+                {Path(path).resolve() for path in paths}, bool(request.get("full"))
+            )
+            self.builds += 1
+            return {key: summary[key] for key in ("pages", "static", "removed")}
+        raise ValueError(f"Unknown command: {command}")
+
+    def respond(self, line):
+        start = time.perf_counter()
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("Requests are JSON objects")
+            response = dict(self.handle(request), ok=True)
+        except Exception as e:
+            # Whatever went wrong, the client gets an answer and the daemon
+            # keeps serving.
+            response = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        response["ms"] = round((time.perf_counter() - start) * 1000, 1)
+        return response
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        daemon = self.server.build_daemon
+        for line in self.rfile:
+            response = daemon.respond(line)
+            try:
+                self.wfile.write(json.dumps(response).encode("utf-8") + b"\n")
+                self.wfile.flush()
+            except (BrokenPipeError, ConnectionResetError):
+                # The client gave up waiting; the build itself is done.
+                return
+            if daemon.stopping:
+                return
+
+
+def bind(socket_path, daemon):
+    socket_path = os.fspath(socket_path)
+    if os.path.exists(socket_path):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(socket_path)
+        except ConnectionRefusedError:
+            # Left behind by a daemon that was killed.
+            os.unlink(socket_path)
+        else:
+            raise RuntimeError(f"A build daemon is already listening on {socket_path}")
+        finally:
+            probe.close()
+    # Only this user may ask for builds.
+    umask = os.umask(0o177)
+    try:
+        server = socketserver.UnixStreamServer(socket_path, _RequestHandler)
+    finally:
+        os.umask(umask)
+    server.build_daemon = daemon
+    return server
+
+
+def serve(server):
+    # One request at a time, so builds never overlap.
+    daemon = server.build_daemon
+    try:
+        while not daemon.stopping:
+            server.handle_request()
+    finally:
+        server.server_close()
+        try:
+            os.unlink(server.server_address)
+        except FileNotFoundError:
+            pass
+
+
+def parse_args(argv=None):
+    parser = make_parser("Keep a build process running and rebuild on request (see src/sitectl.py)")
+    parser.add_argument("--socket", type=Path, default=Path(SOCKET_PATH))
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    args.incremental = True
+    daemon = BuildDaemon(make_builder(args))
+    # Listen before the first build; clients that connect meanwhile wait.
+    server = bind(args.socket, daemon)
+    daemon.builder.build()
+    print(f"Build daemon {os.getpid()} listening on {args.socket}; Ctrl-C to stop")
+    try:
+        serve(server)
+    except KeyboardInterrupt:
+        pass
+    print("Build daemon stopped")
+
+
+if __name__ == "__main__":
+    main()
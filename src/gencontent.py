@@ -1,58 +1,500 @@
 import os
+import posixpath
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from markdown_blocks import markdown_to_html_node
+from urllib.parse import unquote
+from markdown_blocks import (
+    BlockMemo,
+    BlockType,
+    extract_markdown_images,
+    iter_block_nodes,
+    markdown_to_html_node,
+    scan_blocks,
+)
+from inline import scan_inline
+from textnode import TextType
+from template import load_template
+from render_cache import BASEPATH_MARKER
+from buildstats import StatsRecorder, count_nodes
+from plan import page_steps, walk
+from output import AtomicOutput, remove_precompressed
+from manifest import (
+    file_fingerprint,
+    load_manifest,
+    page_entry,
+    page_stale_reasons,
+    previous_source_fingerprint,
+    save_manifest,
+)
+
+
+# Per process, so repeated blocks (shared footers, admonitions) and blocks
+# unchanged between watch-mode rebuilds are only parsed once.
+block_memo = BlockMemo()
+
+# Sources at least this large are rendered block by block straight into the
+# output file instead of being read and rendered whole.
+STREAM_THRESHOLD = 32 * 1024 * 1024
+
+# Longest page summary kept for feeds and the search index.
+SUMMARY_LENGTH = 200
 
 
 def extract_title(markdown):
-    for line in markdown.split("\n"):
+    # Also accepts an iterable of lines, e.g. an open file.
+    if isinstance(markdown, str):
+        markdown = markdown.split("\n")
+    for line in markdown:
         if line.startswith("# "):
             return line.split(" ", 1)[1].strip()
     raise ValueError("No title found")
 
 
-def generate_page(from_path, template_path, dest_path, basepath):
+def _summary_text(pieces, length):
+    # pieces are (text, is_link) for a paragraph's inline nodes, images left
+    # out. None for a paragraph that is only links and images (a "< Back
+    # Home" link, a banner).
+    if all(is_link or not text.strip() for text, is_link in pieces):
+        return None
+    text = " ".join("".join(text for text, _ in pieces).split())
+    if len(text) > length:
+        text = text[:length - 1].rstrip() + "…"
+    return text
+
+
+def node_summary(node, length=SUMMARY_LENGTH):
+    # The summary for one rendered block, or None if it doesn't qualify.
+    if node.tag != "p":
+        return None
+    pieces = [(leaf.value, leaf.tag == "a") for leaf in node.children if leaf.tag != "img"]
+    return _summary_text(pieces, length)
+
+
+def content_summary(nodes, length=SUMMARY_LENGTH):
+    # Plain text of the first paragraph that is more than links and images,
+    # taken from block nodes the render has already built.
+    for node in nodes:
+        summary = node_summary(node, length)
+        if summary is not None:
+            return summary
+    return ""
+
+
+def extract_summary(markdown, length=SUMMARY_LENGTH):
+    # content_summary() straight from the source, for pages that are not
+    # rendered. Also accepts an iterable of lines; nothing past the first
+    # qualifying paragraph is read or scanned.
+    if isinstance(markdown, str):
+        markdown = markdown.split("\n")
+    for block_type, block in scan_blocks(markdown):
+        if block_type != BlockType.PARAGRAPH:
+            continue
+        pieces = [
+            (node.text, node.text_type == TextType.LINK)
+            for node in scan_inline(block)
+            if node.text_type != TextType.IMAGE
+        ]
+        summary = _summary_text(pieces, length)
+        if summary is not None:
+            return summary
+    return ""
+
+
+def page_info(from_path):
+    # What the site index keeps about a page, for an unchanged page whose
+    # manifest entry predates the index; rendering returns the same dict.
+    with open(from_path, "r") as f:
+        title = extract_title(f)
+        f.seek(0)
+        return {"title": title, "summary": extract_summary(f)}
+
+
+def render_cached(from_content, basepath, cache):
+    # Returns (title, html, summary, hit).
+    entry = cache.get(from_content, basepath)
+    if entry is not None:
+        return entry + (True,)
+    title = extract_title(from_content)
+    node = markdown_to_html_node(from_content, BASEPATH_MARKER, block_memo)
+    summary = content_summary(node.children)
+    fragment = node.to_html()
+    cache.put(from_content, title, fragment, summary)
+    return title, fragment.replace(BASEPATH_MARKER, basepath), summary, False
+
+
+def render_page(from_path, template_path, basepath, cache=None):
+    with open(from_path, "r") as f:
+        from_content = f.read()
+
+    template = load_template(template_path, basepath)
+    if cache is not None and cache.cacheable(from_content):
+        title, content, _, _ = render_cached(from_content, basepath, cache)
+    else:
+        title = extract_title(from_content)
+        content = markdown_to_html_node(from_content, basepath, block_memo).to_html()
+    return template.render(title=title, content=content)
+
+
+class StreamedContent():
+    # Stands in for the content node in Template.write. Blocks are parsed and
+    # written one at a time, so memory is bounded by the largest block rather
+    # than by the document. Repeated blocks are not memoized here: a single
+    # huge block held in the memo would defeat the point.
+    def __init__(self, lines, basepath, hooks=None):
+        self.lines = lines
+        self.basepath = basepath
+        self.hooks = hooks
+        self.nodes = 0
+        self.summary = None
+
+    def write_html(self, fp):
+        fp.write("<div>")
+        for node in iter_block_nodes(self.lines, self.basepath):
+            node.write_html(fp)
+            if self.summary is None:
+                self.summary = node_summary(node)
+            if self.hooks is not None:
+                self.nodes += count_nodes(node)
+        fp.write("</div>")
+
+
+def stream_page(abs_from, template, abs_destination, basepath, hooks=None):
+    # The title line is all that is read ahead; the summary is picked up
+    # from the blocks as they are streamed.
+    with open(abs_from, "r") as source:
+        title = extract_title(source)
+    if hooks is not None:
+        hooks.page_stage("read", bytes_read=os.path.getsize(abs_from))
+
+    output = AtomicOutput(abs_destination)
+    with open(abs_from, "r") as source, output as f:
+        content = StreamedContent(source, basepath, hooks)
+        template.write(f, title=title, content=content)
+    if hooks is not None:
+        hooks.page_stage(
+            "render_write",
+            nodes=content.nodes,
+            bytes_written=output.size,
+            outputs_unchanged=not output.changed,
+        )
+        hooks.page_end(abs_from)
+    return {"title": title, "summary": content.summary or ""}
+
+
+def generate_page(
+    from_path, template_path, dest_path, basepath, hooks=None, cache=None, stream=None,
+):
     # print(f"Generating page from {from_path} to {dest_path} using {template_path}")
     abs_from = Path(from_path).resolve()
-    abs_template = Path(template_path).resolve()
     abs_destination = Path(dest_path).resolve()
+    if hooks is not None:
+        hooks.page_start(abs_from)
+
+    if stream is None:
+        stream = os.path.getsize(abs_from) >= STREAM_THRESHOLD
+    if stream:
+        template = load_template(template_path, basepath, hooks)
+        return stream_page(abs_from, template, abs_destination, basepath, hooks)
 
     with open(abs_from, "r") as f:
         from_content = f.read()
+    if hooks is not None:
+        hooks.page_stage("read", bytes_read=len(from_content.encode("utf-8")))
 
-    with open(abs_template, "r") as f:
-        template_content = f.read()
+    template = load_template(template_path, basepath, hooks)
+    if hooks is not None:
+        memo_hits, memo_misses = block_memo.hits, block_memo.misses
+    if cache is not None and cache.cacheable(from_content):
+        title, content, summary, hit = render_cached(from_content, basepath, cache)
+        if hooks is not None:
+            hooks.page_stage(
+                "parse",
+                render_cache_hits=hit,
+                render_cache_misses=not hit,
+                block_memo_hits=block_memo.hits - memo_hits,
+                block_memo_misses=block_memo.misses - memo_misses,
+            )
+    else:
+        title = extract_title(from_content)
+        content = markdown_to_html_node(from_content, basepath, block_memo)
+        summary = content_summary(content.children)
+        if hooks is not None:
+            hooks.page_stage(
+                "parse",
+                nodes=count_nodes(content),
+                block_memo_hits=block_memo.hits - memo_hits,
+                block_memo_misses=block_memo.misses - memo_misses,
+            )
 
-    title = extract_title(from_content)
-    content_nodes = markdown_to_html_node(from_content)
-    content_html = content_nodes.to_html()
+    # Compared against the existing file as it is written, so an unchanged
+    # page is never held whole in memory or rewritten.
+    output = AtomicOutput(abs_destination)
+    with output as f:
+        template.write(f, title=title, content=content)
+    if hooks is not None:
+        hooks.page_stage(
+            "render_write", bytes_written=output.size, outputs_unchanged=not output.changed
+        )
+        hooks.page_end(abs_from)
+    # The title and summary go into the site index (siteindex.py).
+    return {"title": title, "summary": summary}
+
+
+def find_pages(dir_path_content, dest_dir_path):
+    abs_content = Path(dir_path_content).resolve()
+    steps = page_steps(walk(abs_content), abs_content, Path(dest_dir_path).resolve())
+    return [(step.source, step.destination) for step in steps]
 
-    complete_template = (
-        template_content
-            .replace("{{ Title }}", title)
-            .replace("{{ Content }}", content_html)
-            .replace('href="/', 'href="' + basepath)
-            .replace('src="/', 'src="' + basepath)
+
+class PageBuildError(RuntimeError):
+    def __init__(self, message, errors):
+        super().__init__(message)
+        self.errors = errors
+
+
+def raise_page_errors(errors):
+    # errors are (page index, source, message) tuples, reported in page order.
+    if errors:
+        errors.sort()
+        details = "\n".join(f"- {source}: {message}" for _, source, message in errors)
+        raise PageBuildError(f"Failed to generate {len(errors)} page(s):\n{details}", errors)
+
+
+def _render_indexed(indexed, template_path, basepath, hooks, cache, stream, keep_going, done=None):
+    errors = []
+    infos = {}
+    for index, source, destination in indexed:
+        try:
+            infos[index] = generate_page(
+                source, template_path, destination, basepath, hooks, cache, stream
+            )
+        except Exception as e:
+            errors.append((index, str(source), f"{type(e).__name__}: {e}"))
+            if not keep_going:
+                break
+            continue
+        if done is not None:
+            done(destination)
+    return errors, infos
+
+
+def _render_chunk(chunk, template_path, basepath, record_stats, cache, stream):
+    hooks = StatsRecorder() if record_stats else None
+    errors, infos = _render_indexed(
+        chunk, template_path, basepath, hooks, cache, stream, keep_going=True
+    )
+    return errors, infos, hooks.export() if hooks is not None else None
+
+
+def render_pages(
+    pages, template_path, basepath, jobs=1, hooks=None, cache=None, stream=None, done=None,
+):
+    # Returns each page's page_info() dict, in page order. done(destination)
+    # is called in this process as each page's output is written (per chunk
+    # of pages when rendering in parallel).
+    indexed = [(index, source, destination) for index, (source, destination) in enumerate(pages)]
+    if jobs <= 1 or len(pages) <= 1:
+        # Serially, a page that fails to render or write stops the build
+        # right away, reported like a failure in a worker.
+        errors, infos = _render_indexed(
+            indexed, template_path, basepath, hooks, cache, stream, keep_going=False, done=done
         )
+    else:
+        errors, infos = _render_parallel(
+            indexed, template_path, basepath, jobs, hooks, cache, stream, done
+        )
+
+    raise_page_errors(errors)
+    return [infos[index] for index in range(len(pages))]
+
+
+def _render_parallel(indexed, template_path, basepath, jobs, hooks, cache, stream, done=None):
+    chunk_size = max(1, len(indexed) // (jobs * 4))
+    chunks = [indexed[i:i + chunk_size] for i in range(0, len(indexed), chunk_size)]
 
-    os.makedirs(abs_destination.parent, exist_ok=True)
-    with open(abs_destination, "w", encoding="utf-8") as f:
-        f.write(complete_template)
+    errors = []
+    infos = {}
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        # Worker processes record into their own StatsRecorder and ship the
+        # results back to be merged, since hooks objects can't be shared.
+        record_stats = isinstance(hooks, StatsRecorder)
+        futures = [
+            pool.submit(_render_chunk, chunk, template_path, basepath, record_stats, cache, stream)
+            for chunk in chunks
+        ]
+        for future in futures:
+            chunk_errors, chunk_infos, stats = future.result()
+            errors.extend(chunk_errors)
+            infos.update(chunk_infos)
+            if stats is not None:
+                hooks.merge(stats)
+            if done is not None:
+                for index in sorted(chunk_infos):
+                    done(indexed[index][2])
+    return errors, infos
 
 
-def generate_pages_recursive(dir_path_content, template_path, dest_dir_path, basepath):
+def generate_pages_recursive(
+    dir_path_content, template_path, dest_dir_path, basepath,
+    jobs=1, hooks=None, cache=None, stream=None,
+):
+    template_path = Path(template_path).resolve()
+    pages = find_pages(dir_path_content, dest_dir_path)
+    return render_pages(pages, template_path, basepath, jobs, hooks, cache, stream)
+
+
+def referenced_assets(markdown, rel_source):
+    # Paths, relative to static/, of the local images a page embeds. Relative
+    # URLs resolve against the page's own directory, as a browser would.
+    # markdown is text or an iterable of lines such as an open file, which
+    # is scanned a block at a time.
+    if isinstance(markdown, str):
+        markdown = markdown.split("\n")
+    page_dir = posixpath.dirname(rel_source)
+    assets = set()
+    images = (
+        image for _, block in scan_blocks(markdown) for image in extract_markdown_images(block)
+    )
+    for _, url in images:
+        url = unquote(url.split("#", 1)[0].split("?", 1)[0])
+        if not url or "://" in url or url.startswith(("//", "data:")):
+            continue
+        if url.startswith("/"):
+            path = posixpath.normpath(url.lstrip("/"))
+        else:
+            path = posixpath.normpath(posixpath.join(page_dir, url))
+        if path == "." or path.startswith("../") or path == "..":
+            continue
+        assets.add(path)
+    return sorted(assets)
+
+
+def generate_pages_incremental(
+    dir_path_content, template_path, dest_dir_path, basepath, manifest_path,
+    jobs=1, hooks=None, cache=None, stream=None, static_dir=None, explain=False, plan=None,
+    force=False, page_done=None,
+):
+    # page_done(destination) is called for every page whose output is in
+    # place: unchanged pages before rendering starts, the rest as they are
+    # rendered. The builder uses it to precompress while pages render.
     abs_content = Path(dir_path_content).resolve()
     template_path = Path(template_path).resolve()
     dest_dir_path = Path(dest_dir_path).resolve()
-    content_files = os.listdir(abs_content)
-    
-    for filename in content_files:
-        file_path = os.path.join(abs_content, filename)
-        if filename.lower().endswith(".md"):
-            destination = Path(dest_dir_path) / filename
-            destination = destination.with_suffix(".html")
-            generate_page(file_path, template_path, destination, basepath)
-        elif os.path.isdir(file_path):
-            destination = Path(dest_dir_path) / filename
-            generate_pages_recursive(file_path, template_path, destination, basepath)
+    if static_dir is not None:
+        static_dir = Path(static_dir).resolve()
+
+    if hooks is not None:
+        hooks.stage_start("plan")
+    old_manifest = load_manifest(manifest_path)
+    old_pages = old_manifest["pages"]
+    # Page rendering owns the "pages" and "template" sections; other sections
+    # (static assets) are carried over untouched.
+    new_manifest = dict(old_manifest, pages={})
+    template_fp = file_fingerprint(template_path, old_manifest.get("template"))
+    new_manifest["template"] = template_fp
+
+    # Each referenced static file is fingerprinted once, however many pages
+    # embed it.
+    asset_fps = {}
+
+    def asset_fingerprint(asset, previous):
+        if asset not in asset_fps:
+            path = static_dir / asset
+            asset_fps[asset] = file_fingerprint(path, previous) if path.is_file() else None
+        return asset_fps[asset]
+
+    stale_pages = []
+    fingerprint_hits = 0
+    if plan is not None:
+        steps = plan.pages
+    else:
+        steps = page_steps(walk(abs_content), abs_content, dest_dir_path)
+    for step in steps:
+        source, destination, rel_source = step.source, step.destination, step.rel
+        key = destination.relative_to(dest_dir_path).as_posix()
+        entry = old_pages.get(key)
+        if entry is not None and entry.get("source") != rel_source:
+            entry = None
+        previous_fp = previous_source_fingerprint(entry)
+        source_fp = file_fingerprint(source, previous_fp, step.stat)
+        fingerprint_hits += source_fp is previous_fp
+
+        old_assets = entry.get("assets") if entry is not None else None
+        if static_dir is None:
+            assets = {}
+        elif old_assets is not None and source_fp["sha256"] == entry.get("source_sha256"):
+            # Unchanged markdown references the same files as last time.
+            assets = {asset: asset_fingerprint(asset, fp) for asset, fp in old_assets.items()}
+        else:
+            with open(source, "r") as f:
+                assets = {
+                    asset: asset_fingerprint(asset, (old_assets or {}).get(asset))
+                    for asset in referenced_assets(f, rel_source)
+                }
+
+        reasons = page_stale_reasons(
+            entry, rel_source, source_fp, template_fp, basepath, destination, assets
+        )
+        if force and not reasons:
+            reasons = ["full build"]
+        if reasons:
+            stale_pages.append((source, destination))
+            if explain:
+                print(f"- Rendering {key}: {', '.join(reasons)}")
+            info = None
+        elif entry.get("title") is not None:
+            info = {"title": entry["title"], "summary": entry.get("summary", "")}
         else:
-            continue
\ No newline at end of file
+            # Recorded before pages kept their index entry.
+            info = page_info(source)
+        new_manifest["pages"][key] = page_entry(
+            rel_source, source_fp, template_fp, basepath, assets, info
+        )
+
+    removed = 0
+    for key in old_pages:
+        if key in new_manifest["pages"]:
+            continue
+        stale_output = dest_dir_path / key
+        if stale_output.is_file():
+            print(f"- Removing stale page: {stale_output}")
+            stale_output.unlink()
+            removed += 1
+        for sibling in remove_precompressed(stale_output):
+            print(f"- Removing stale file: {sibling}")
+
+    if hooks is not None:
+        hooks.stage_end(
+            "plan",
+            pages_unchanged=len(new_manifest["pages"]) - len(stale_pages),
+            manifest_hash_cache_hits=fingerprint_hits,
+            pages_removed=removed,
+        )
+        hooks.stage_start("render")
+    if page_done is not None:
+        stale = {destination for _, destination in stale_pages}
+        for step in steps:
+            if step.destination not in stale:
+                page_done(step.destination)
+    try:
+        infos = render_pages(
+            stale_pages, template_path, basepath, jobs, hooks, cache, stream, page_done
+        )
+    except PageBuildError as e:
+        failed = {Path(source) for _, source, _ in e.errors}
+        for source, destination in stale_pages:
+            if source in failed:
+                del new_manifest["pages"][destination.relative_to(dest_dir_path).as_posix()]
+        save_manifest(new_manifest, manifest_path)
+        raise
+    if hooks is not None:
+        hooks.stage_end("render")
+    for (source, destination), info in zip(stale_pages, infos):
+        new_manifest["pages"][destination.relative_to(dest_dir_path).as_posix()].update(info)
+
+    save_manifest(new_manifest, manifest_path)
+    rendered = len(stale_pages)
+    kind = "Full build" if force else "Incremental build"
+    print(f"{kind}: {rendered} rendered, "
+          f"{len(new_manifest['pages']) - rendered} unchanged, {removed} removed")
+    return new_manifest["pages"]
@@ -1,13 +1,28 @@
- 
+from types import MappingProxyType
+
+
+# Shared by every node created without attributes, which is nearly all of
+# them; read-only so one node can't leak props into another.
+EMPTY_PROPS = MappingProxyType({})
+
+
 class HTMLNode():
+    __slots__ = ("tag", "value", "children", "props")
+
     def __init__(self, tag=None, value=None, children=None, props=None):
         self.tag = tag
         self.value = value
         self.children = children
-        self.props = props or {}
+        self.props = props or EMPTY_PROPS
 
     def to_html(self):
         raise NotImplementedError("to_html method not implemented")
+
+    def iter_html(self):
+        yield self.to_html()
+
+    def write_html(self, fp):
+        fp.writelines(self.iter_html())
     
     def props_to_html(self):
         if not self.props:
@@ -28,6 +43,8 @@ class HTMLNode():
         
 
 class LeafNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, value, props=None):
         super().__init__(tag, value, None, props)
         self.children = None
@@ -44,14 +61,13 @@ class LeafNode(HTMLNode):
     
 
 class ParentNode(HTMLNode):
+    __slots__ = ()
+
     def __init__(self, tag, children, props=None):
         super().__init__(tag=tag, value=None, children=children, props=props)
 
     def to_html(self):
-        if self.tag is None:
-            raise ValueError("tag must have a value")
-        if self.children is None:
-            raise ValueError("children must have a value")
+        self._check()
         
         result = []
         for child in self.children:
@@ -60,4 +76,29 @@ class ParentNode(HTMLNode):
 
         return(f'<{self.tag}>{"".join(result)}</{self.tag}>')
 
+    def _check(self):
+        if self.tag is None:
+            raise ValueError("tag must have a value")
+        if self.children is None:
+            raise ValueError("children must have a value")
+
+    def iter_html(self):
+        # Depth-first with an explicit stack of child iterators, so deep
+        # trees are streamed without nested generators or joined strings.
+        self._check()
+        yield f"<{self.tag}>"
+        stack = [(self.tag, iter(self.children))]
+        while stack:
+            tag, children = stack[-1]
+            for child in children:
+                if isinstance(child, ParentNode):
+                    child._check()
+                    yield f"<{child.tag}>"
+                    stack.append((child.tag, iter(child.children)))
+                    break
+                yield from child.iter_html()
+            else:
+                stack.pop()
+                yield f"</{tag}>"
+
        
\ No newline at end of file
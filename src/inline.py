@@ -0,0 +1,70 @@
+from textnode import TextNode, TextType
+import re
+
+
+# Same nesting order as text_to_textnode: code spans are cut out first, then
+# bold, then italic, and only the remaining plain text is searched for
+# images and links.
+DELIMITERS = (
+    ("`", TextType.CODE),
+    ("**", TextType.BOLD),
+    ("_", TextType.ITALIC),
+)
+
+IMAGE_OR_LINK_RE = re.compile(
+    r"!\[([^\[\]]*)\]\(([^\(\)]*)\)|(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)"
+)
+
+
+def scan_inline(text):
+    nodes = []
+    _scan_delimited(text, 0, nodes)
+    return nodes
+
+
+def _scan_delimited(text, level, nodes):
+    if level == len(DELIMITERS):
+        _scan_images_and_links(text, nodes)
+        return
+
+    delimiter, inner_type = DELIMITERS[level]
+    width = len(delimiter)
+    position = 0
+    inside = False
+    while True:
+        end = text.find(delimiter, position)
+        if end == -1:
+            break
+        if end > position:
+            if inside:
+                nodes.append(TextNode(text[position:end], inner_type))
+            else:
+                _scan_delimited(text[position:end], level + 1, nodes)
+        inside = not inside
+        position = end + width
+
+    if inside:
+        raise ValueError("Invalid markdown, unmatched delimiter")
+    if position < len(text):
+        _scan_delimited(text[position:] if position else text, level + 1, nodes)
+
+
+def _scan_images_and_links(text, nodes):
+    # Both forms contain "](", so most prose skips the regex entirely.
+    if "](" not in text:
+        nodes.append(TextNode(text, TextType.TEXT))
+        return
+    position = 0
+    for match in IMAGE_OR_LINK_RE.finditer(text):
+        start = match.start()
+        if match.group(1) is not None:
+            node = TextNode(match.group(1), TextType.IMAGE, match.group(2))
+        else:
+            node = TextNode(match.group(3), TextType.LINK, match.group(4))
+        if start > position:
+            nodes.append(TextNode(text[position:start], TextType.TEXT))
+        nodes.append(node)
+        position = match.end()
+
+    if position < len(text):
+        nodes.append(TextNode(text[position:] if position else text, TextType.TEXT))
@@ -1,19 +1,242 @@
 from pathlib import Path
-from copystatic import copy_static
-from gencontent import generate_pages_recursive
+from builder import Builder, Site
+from plan import format_plan
+from precompress import PRECOMPRESS_MIN_SIZE, Precompressor
+from storage import open_storage
+import argparse
 import sys
 
+# Subsystems that only some runs need (stats, the render cache, watch mode,
+# the profiler) are imported where they are used; see startup.py.
 
-def main():
-    src = Path("static/")
-    dst = Path("docs/")
-    copy_static(src, dst)
-    if len(sys.argv) < 2:
-        basepath = "/"  
+
+__version__ = "0.1.0"
+
+MANIFEST_PATH = Path(".build-manifest.json")
+CACHE_DIR = Path(".render-cache")
+
+
+def make_parser(description="Build the static site into docs/"):
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--version", action="version", version=f"%(prog)s {__version__}")
+    parser.add_argument(
+        "--startup-stats",
+        action="store_true",
+        help="run the command in a fresh interpreter and print where its startup time went",
+    )
+    parser.add_argument("basepath", nargs="?", default="/")
+    parser.add_argument(
+        "--source",
+        type=Path,
+        default=Path("."),
+        help="directory or .zip/.tar(.gz) archive holding content/, static/ and template.html",
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=Path("docs"),
+        help="output directory, or an archive to write (.zip, .tar.gz, .tar.zst, ...)",
+    )
+    parser.add_argument(
+        "--site-url",
+        help="write sitemap.xml, an Atom feed of blog/ and search-index.json, "
+        "linking to pages under this URL (e.g. https://example.github.io)",
+    )
+    parser.add_argument(
+        "--precompress",
+        action="store_true",
+        help="also write .gz (and .br, with brotli installed) copies of text outputs",
+    )
+    parser.add_argument(
+        "--precompress-min-size",
+        type=int,
+        default=PRECOMPRESS_MIN_SIZE,
+        help="leave outputs smaller than this many bytes uncompressed",
+    )
+    parser.add_argument(
+        "--compress-jobs",
+        type=int,
+        default=4,
+        help="precompress on a pool of N threads while pages render",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="only re-render pages whose markdown, template or basepath changed",
+    )
+    parser.add_argument("--manifest", type=Path, default=MANIFEST_PATH)
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="print the build plan (every source, destination and action) and exit",
+    )
+    parser.add_argument(
+        "--scan-jobs",
+        type=int,
+        default=1,
+        help="walk content/ and static/ with N threads, one top-level directory each",
+    )
+    parser.add_argument(
+        "--explain",
+        action="store_true",
+        help="print why each page is re-rendered (changed markdown, template, image, ...)",
+    )
+    parser.add_argument(
+        "--jobs",
+        "-j",
+        type=int,
+        default=1,
+        help="render pages on a pool of N worker processes",
+    )
+    parser.add_argument(
+        "--static-compare",
+        choices=("mtime", "hash"),
+        default="mtime",
+        help="how to decide a static file in docs/ is already up to date",
+    )
+    parser.add_argument(
+        "--hardlink",
+        action="store_true",
+        help="hard-link static files into docs/ instead of copying them",
+    )
+    parser.add_argument(
+        "--copy-jobs",
+        type=int,
+        default=8,
+        help="copy static files on a pool of N threads",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="render every page block by block straight to disk (always on for huge sources)",
+    )
+    parser.add_argument(
+        "--render-cache",
+        action="store_true",
+        help="reuse rendered page content from an on-disk content-addressed cache",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=CACHE_DIR,
+        help="render cache location; point CI runners at a shared directory",
+    )
+    parser.add_argument(
+        "--cache-max-mb",
+        type=int,
+        default=512,
+        help="evict least recently used cache entries beyond this size",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="after building, rebuild whatever changes in content/, static/ and template.html",
+    )
+    parser.add_argument(
+        "--poll",
+        action="store_true",
+        help="watch by polling mtimes instead of inotify",
+    )
+    parser.add_argument(
+        "--stats",
+        action="store_true",
+        help="record per-stage and per-page timings, bytes and node counts",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="like --stats, and also run the build under cProfile",
+    )
+    parser.add_argument("--trace", type=Path, help="write a Chrome trace-event JSON file")
+    parser.add_argument("--top", type=int, default=10, help="number of slowest pages to list")
+    return parser
+
+
+def parse_args(argv=None):
+    return make_parser().parse_args(argv)
+
+
+def make_builder(args, hooks=None):
+    site = Site(open_storage(args.source), args.basepath)
+    cache = None
+    if args.render_cache:
+        from render_cache import RenderCache
+
+        cache = RenderCache(args.cache_dir, args.cache_max_mb * 1024 * 1024)
+    precompress = None
+    if args.precompress:
+        precompress = Precompressor(min_size=args.precompress_min_size, jobs=args.compress_jobs)
+    return Builder(
+        site,
+        open_storage(args.output, "w"),
+        jobs=args.jobs,
+        hooks=hooks,
+        cache=cache,
+        stream=True if args.stream else None,
+        incremental=args.incremental,
+        manifest=args.manifest,
+        static_compare=args.static_compare,
+        hardlink=args.hardlink,
+        copy_jobs=args.copy_jobs,
+        scan_jobs=args.scan_jobs,
+        explain=args.explain,
+        precompress=precompress,
+        site_url=args.site_url,
+    )
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    if "--startup-stats" in argv:
+        from startup import report_startup
+
+        argv = [arg for arg in argv if arg != "--startup-stats"]
+        sys.exit(report_startup(__file__, argv))
+
+    args = parse_args(argv)
+    hooks = None
+    if args.stats or args.profile or args.trace:
+        from buildstats import StatsRecorder
+
+        hooks = StatsRecorder()
+    builder = make_builder(args, hooks)
+    if (args.dry_run or args.watch) and not builder.on_disk():
+        raise SystemExit("--dry-run and --watch need a source directory and an output directory")
+
+    if args.dry_run:
+        print(format_plan(builder.plan()))
+        return
+    if args.profile:
+        import cProfile
+
+        profiler = cProfile.Profile()
+        profiler.runcall(builder.build)
     else:
-        basepath = sys.argv[1]
-    generate_pages_recursive("content", "template.html", "docs", basepath) 
+        builder.build()
+    builder.output.close()
     print("Successfully generated page")
 
+    if hooks is not None:
+        print(hooks.summary(args.top))
+    if args.profile:
+        import pstats
+
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(args.top)
+    if args.trace:
+        hooks.write_trace(args.trace)
+        print(f"Wrote trace to {args.trace}")
+
+    if args.watch:
+        from watch import watch
+
+        site = builder.site
+        watch(
+            site.on_disk(site.content), site.on_disk(site.static), site.on_disk(site.template),
+            builder.output.root, args.basepath,
+            cache=builder.cache, jobs=args.jobs, polling=args.poll, manifest=builder.manifest_path(),
+        )
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,140 @@
+from pathlib import Path
+import hashlib
+import json
+import os
+
+
+MANIFEST_VERSION = 1
+
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def file_fingerprint(path, previous=None, stat=None):
+    if stat is None:
+        stat = os.stat(path)
+    if (
+        previous is not None
+        and previous.get("size") == stat.st_size
+        and previous.get("mtime_ns") == stat.st_mtime_ns
+    ):
+        return previous
+    return {
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha256": hash_file(path),
+    }
+
+
+def empty_manifest():
+    return {"version": MANIFEST_VERSION, "pages": {}, "static": {}}
+
+
+def load_manifest(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return empty_manifest()
+
+    if not isinstance(manifest, dict) or manifest.get("version") != MANIFEST_VERSION:
+        return empty_manifest()
+    manifest.setdefault("pages", {})
+    manifest.setdefault("static", {})
+    return manifest
+
+
+def previous_outputs(manifest):
+    # Every file the last build wrote, relative to the output directory.
+    # Manifests from before "outputs" was kept only know pages and static
+    # files.
+    outputs = manifest.get("outputs")
+    if outputs is None:
+        return list(manifest["pages"]) + list(manifest["static"])
+    return outputs
+
+
+def record_outputs(path, outputs):
+    manifest = load_manifest(path)
+    manifest["outputs"] = sorted(set(outputs))
+    save_manifest(manifest, path)
+
+
+def save_manifest(manifest, path):
+    path = Path(path)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def page_stale_reasons(entry, source, source_fp, template_fp, basepath, dest_path, assets):
+    # Why a page must be re-rendered; an empty list means it is up to date.
+    # assets maps each static file the page references to its current
+    # fingerprint, or None when the file does not exist.
+    if entry is None:
+        return ["new page"]
+    reasons = []
+    if entry.get("source") != source:
+        reasons.append("source moved")
+    if entry.get("source_sha256") != source_fp["sha256"]:
+        reasons.append("markdown changed")
+    if entry.get("template_sha256") != template_fp["sha256"]:
+        reasons.append("template changed")
+    if entry.get("basepath") != basepath:
+        reasons.append(f"basepath changed from {entry.get('basepath')} to {basepath}")
+
+    old_assets = entry.get("assets")
+    if old_assets is None:
+        reasons.append("no dependency record")
+    else:
+        # References added or dropped by an edit show up as "markdown changed".
+        for asset in sorted(assets.keys() & old_assets.keys()):
+            old_fp = old_assets[asset]
+            new_fp = assets[asset]
+            old_sha = old_fp["sha256"] if old_fp is not None else None
+            new_sha = new_fp["sha256"] if new_fp is not None else None
+            if old_sha == new_sha:
+                continue
+            if old_sha is None:
+                reasons.append(f"asset created: {asset}")
+            elif new_sha is None:
+                reasons.append(f"asset deleted: {asset}")
+            else:
+                reasons.append(f"asset changed: {asset}")
+
+    if not os.path.exists(dest_path):
+        reasons.append("output missing")
+    return reasons
+
+
+def page_entry(source, source_fp, template_fp, basepath, assets, info=None):
+    # info is the page's title and summary, kept so the site index can list
+    # pages that were not re-rendered.
+    entry = {
+        "source": source,
+        "source_size": source_fp["size"],
+        "source_mtime_ns": source_fp["mtime_ns"],
+        "source_sha256": source_fp["sha256"],
+        "template_sha256": template_fp["sha256"],
+        "basepath": basepath,
+        "assets": assets,
+    }
+    if info is not None:
+        entry.update(info)
+    return entry
+
+
+def previous_source_fingerprint(entry):
+    if entry is None:
+        return None
+    return {
+        "size": entry.get("source_size"),
+        "mtime_ns": entry.get("source_mtime_ns"),
+        "sha256": entry.get("source_sha256"),
+    }
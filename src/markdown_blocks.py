@@ -1,9 +1,17 @@
 from textnode import TextNode, TextType, text_node_to_html_node
 from htmlnode import LeafNode, ParentNode, HTMLNode
+from inline import scan_inline
 import re
+from collections import OrderedDict
 from enum import Enum
 
 
+IMAGE_RE = re.compile(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)")
+LINK_RE = re.compile(r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)")
+UNORDERED_ITEM_RE = re.compile(r"-+\s")
+ORDERED_ITEM_RE = re.compile(r"\d+\.\s")
+
+
 def split_nodes_delimiter(old_nodes, delimiter, text_type):
     new_nodes = []
     if not isinstance(old_nodes, list):
@@ -40,12 +48,16 @@ def split_nodes_delimiter(old_nodes, delimiter, text_type):
 
 
 def extract_markdown_images(text):
-    text_url_list =  re.findall(r"!\[([^\[\]]*)\]\(([^\(\)]*)\)", text)
+    if "![" not in text:
+        return []
+    text_url_list = IMAGE_RE.findall(text)
     return text_url_list
 
 
 def extract_markdown_links(text):
-    markdown_link = re.findall(r"(?<!!)\[([^\[\]]*)\]\(([^\(\)]*)\)", text)
+    if "](" not in text:
+        return []
+    markdown_link = LINK_RE.findall(text)
     return markdown_link
 
 
@@ -59,12 +71,12 @@ def split_nodes_images(old_nodes):
             continue
         if original_text == "":
             continue
-        if extract_markdown_images(original_text) == []:
+        image_alt_and_urls = extract_markdown_images(original_text)
+        if image_alt_and_urls == []:
             new_nodes.append(node)
             continue
 
         node_sections = []
-        image_alt_and_urls = extract_markdown_images(original_text)
         text = original_text
         for image in image_alt_and_urls:
             image_alt = image[0]
@@ -92,12 +104,12 @@ def split_nodes_links(old_nodes):
             continue
         if original_text == "":
             continue
-        if extract_markdown_links(original_text) == []:
+        link_desc_and_urls = extract_markdown_links(original_text)
+        if link_desc_and_urls == []:
             new_nodes.append(node)
             continue
 
         node_sections = []
-        link_desc_and_urls = extract_markdown_links(original_text)
         text = original_text
         for link in link_desc_and_urls:
             link_desc = link[0]
@@ -123,15 +135,6 @@ def text_to_textnode(text):
     return split_nodes_links(split_images_result)
 
 
-def markdown_to_blocks(text):
-    raw_blocks= text.split("\n\n")
-    blocks = []
-    for block in raw_blocks:
-        if block.strip() != "":
-            blocks.append(block.strip())
-    return(blocks)
-
-
 class BlockType(Enum):
     PARAGRAPH = "paragraph"
     HEADING = "heading"
@@ -139,33 +142,166 @@ class BlockType(Enum):
     QUOTE = "quote"
     ORDERED_LIST = "ordered_list"
     UNORDERED_LIST = "unordered_list"
-    
 
-def block_to_block_type(block):
-    if block.startswith(("# ", "## ", "### ", "#### ", "##### ", "###### ")):
+
+HEADING_PREFIXES = ("# ", "## ", "### ", "#### ", "##### ", "###### ")
+FENCE = "```"
+
+# How much of an open fenced block scan_blocks holds in memory before moving
+# it to a temporary file.
+FENCE_SPILL_CHARS = 4 * 1024 * 1024
+
+
+def classify_lines(lines):
+    # lines are the block's lines with the block already stripped, i.e. the
+    # first line lstripped and the last rstripped.
+    if lines[0].startswith(HEADING_PREFIXES):
         return BlockType.HEADING
-    
-    stripped = block.strip()
-    if stripped.startswith("```") and stripped.endswith("```"):
+    if lines[0].startswith(FENCE) and lines[-1].endswith(FENCE):
         return BlockType.CODE
-    
-    lines = [line for line in block.strip().split("\n") if line]
-    
-    if not lines:
-        return BlockType.PARAGRAPH
 
-    if all(re.match(r"^\>", line) for line in lines):
+    quote = unordered = ordered = True
+    seen = False
+    for line in lines:
+        if not line:
+            continue
+        seen = True
+        if quote and line[0] != ">":
+            quote = False
+        if unordered and (line[0] != "-" or not UNORDERED_ITEM_RE.match(line)):
+            unordered = False
+        if ordered and (not line[0].isdigit() or not ORDERED_ITEM_RE.match(line)):
+            ordered = False
+        if not (quote or unordered or ordered):
+            return BlockType.PARAGRAPH
+
+    if not seen:
+        return BlockType.PARAGRAPH
+    if quote:
         return BlockType.QUOTE
-
-    if all(re.match(r"^\-+\s", line) for line in lines):
+    if unordered:
         return BlockType.UNORDERED_LIST
+    return BlockType.ORDERED_LIST
+
+
+def _finish_block(lines):
+    start = 0
+    end = len(lines)
+    while start < end and not lines[start].strip():
+        start += 1
+    while end > start and not lines[end - 1].strip():
+        end -= 1
+    if start == end:
+        return None
+    lines = lines[start:end]
+    lines[0] = lines[0].lstrip()
+    lines[-1] = lines[-1].rstrip()
+    return classify_lines(lines), "\n".join(lines)
+
+
+def _opens_fence(line):
+    stripped = line.strip()
+    # A fence opened and closed on one line is a whole code block already.
+    return stripped.startswith(FENCE) and not (len(stripped) >= 6 and stripped.endswith(FENCE))
+
+
+def _split_unclosed(lines):
+    # The lines of a fence left open at the end of the input, split on empty
+    # lines as if it were never opened.
+    piece = []
+    for line in lines:
+        if line:
+            piece.append(line)
+            continue
+        finished = _finish_block(piece)
+        if finished is not None:
+            yield finished
+        piece = []
+    finished = _finish_block(piece)
+    if finished is not None:
+        yield finished
+
+
+def _spill(lines):
+    import tempfile
+
+    # newline="\n" so a stray "\r" inside a line reads back unsplit.
+    spill = tempfile.TemporaryFile("w+", encoding="utf-8", newline="\n")
+    for line in lines:
+        spill.write(line + "\n")
+    return spill
+
+
+def _unspill(spill):
+    spill.seek(0)
+    for line in spill:
+        yield line[:-1]
+
+
+def scan_blocks(lines):
+    """Yield (block_type, block) for an iterable of lines, e.g. an open file.
+
+    Blocks are separated by empty lines, except inside a fenced code block.
+    A fence still open at the end of the input does not swallow the rest of
+    the document: its lines are split as if it were never opened. Until a
+    fence closes there is no telling which, so past FENCE_SPILL_CHARS its
+    lines go to a temporary file; memory stays bounded by the largest block.
+    """
+    block = []
+    fenced = False
+    fence_chars = 0
+    spill = None
+    for line in lines:
+        if line.endswith("\n"):
+            line = line[:-1]
+        if fenced:
+            if spill is not None:
+                spill.write(line + "\n")
+            else:
+                block.append(line)
+                fence_chars += len(line) + 1
+                if fence_chars > FENCE_SPILL_CHARS:
+                    spill = _spill(block)
+                    block = []
+            if line.rstrip().endswith(FENCE):
+                fenced = False
+                if spill is not None:
+                    # Closed after all: the code block is read back whole.
+                    with spill:
+                        block = list(_unspill(spill))
+                    spill = None
+            continue
+        if not line:
+            if block:
+                finished = _finish_block(block)
+                if finished is not None:
+                    yield finished
+                block = []
+            continue
+        if not block:
+            if not line.strip():
+                continue
+            fenced = _opens_fence(line)
+            fence_chars = 0
+        block.append(line)
+
+    if spill is not None:
+        with spill:
+            yield from _split_unclosed(_unspill(spill))
+    elif fenced:
+        yield from _split_unclosed(block)
+    else:
+        finished = _finish_block(block)
+        if finished is not None:
+            yield finished
 
-    lines = [line for line in block.strip().split("\n") if line]
-    if all(re.match(r"^\d+\.\s", line) for line in lines):
-        return BlockType.ORDERED_LIST
 
-    else:
-        return BlockType.PARAGRAPH
+def markdown_to_blocks(text):
+    return [block for _, block in scan_blocks(text.split("\n"))]
+
+
+def block_to_block_type(block):
+    return classify_lines(block.strip().split("\n"))
 
 
 def blocktype_to_tag(block_type):
@@ -200,12 +336,12 @@ def remove_block_header(block, block_type):
         return "\n".join(cleaned_lines).strip()
     
     if block_type == BlockType.UNORDERED_LIST:
-        unordered_list = block.split("\n")
-        return "\n".join(re.sub("- ", "", item) for item in unordered_list)
+        # Every "- " in the item goes, not just the marker; kept as it was.
+        return block.replace("- ", "")
     
     if block_type == BlockType.ORDERED_LIST:
         ordered_list = block.split("\n")
-        return "\n".join(re.sub(r"^\d+\.\s", "", item) for item in ordered_list)
+        return "\n".join(_strip_ordered_marker(item) for item in ordered_list)
     
     if block_type == BlockType.CODE:
         lines = block.split("\n")
@@ -216,62 +352,94 @@ def remove_block_header(block, block_type):
         return block
 
 
-def text_to_children(text):
+def _strip_ordered_marker(item):
+    match = ORDERED_ITEM_RE.match(item) if item[:1].isdigit() else None
+    return item[match.end():] if match else item
+
+
+def text_to_children(text, basepath="/"):
     children = []
-    textnodes = text_to_textnode(text)
+    textnodes = scan_inline(text)
     for node in textnodes:
-        leafnode = text_node_to_html_node(node)
+        leafnode = text_node_to_html_node(node, basepath)
         children.append(leafnode)
     return children
 
 
-def markdown_to_html_node(markdown):
-    blocks = markdown_to_blocks(markdown)
-    parentnodes = []
-
-    for block in blocks:
-        if block == "":
-            continue
-
+def block_to_html_node(block, basepath="/", block_type=None):
+    if block_type is None:
         block_type = block_to_block_type(block)
-        stripped_block = remove_block_header(block, block_type)
-        tag = blocktype_to_tag(block_type)
-
-        if block_type not in {BlockType.CODE, BlockType.UNORDERED_LIST, BlockType.ORDERED_LIST}:
-            children = text_to_children(stripped_block)
-
-        elif block_type == BlockType.ORDERED_LIST:
-            li_nodes = []
-            for item in stripped_block.split("\n"):
-                if not item:
-                    continue
-                li_children = text_to_children(item)
-                li_nodes.append(ParentNode('li', li_children))
-            children = li_nodes
-
-        elif block_type == BlockType.UNORDERED_LIST:
-            li_nodes = []
-            for item in stripped_block.split("\n"):
-                if not item:
-                    continue
-                li_children = text_to_children(item)
-                li_nodes.append(ParentNode("li", li_children))
-            children = li_nodes            
-
-        elif block_type == BlockType.CODE:
-            code_leaf = LeafNode("code", stripped_block)
-            tag = 'pre'
-            children = [code_leaf]
-        
-        parentnodes.append(ParentNode(tag, children))
-
-    root_node = ParentNode("div", parentnodes)
-    return root_node
-
-
+    stripped_block = remove_block_header(block, block_type)
+    tag = blocktype_to_tag(block_type)
 
+    if block_type not in {BlockType.CODE, BlockType.UNORDERED_LIST, BlockType.ORDERED_LIST}:
+        children = text_to_children(stripped_block, basepath)
 
+    elif block_type == BlockType.ORDERED_LIST:
+        li_nodes = []
+        for item in stripped_block.split("\n"):
+            if not item:
+                continue
+            li_children = text_to_children(item, basepath)
+            li_nodes.append(ParentNode('li', li_children))
+        children = li_nodes
 
+    elif block_type == BlockType.UNORDERED_LIST:
+        li_nodes = []
+        for item in stripped_block.split("\n"):
+            if not item:
+                continue
+            li_children = text_to_children(item, basepath)
+            li_nodes.append(ParentNode("li", li_children))
+        children = li_nodes            
 
+    elif block_type == BlockType.CODE:
+        code_leaf = LeafNode("code", stripped_block)
+        tag = 'pre'
+        children = [code_leaf]
+
+    return ParentNode(tag, children)
+
+
+class BlockMemo():
+    # Bounded LRU of (block text, basepath) -> rendered ParentNode. Nodes are
+    # never mutated after rendering, so one node can sit in many page trees.
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, block, basepath, block_type=None):
+        key = (block, basepath)
+        node = self.entries.get(key)
+        if node is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return node
+
+        self.misses += 1
+        node = block_to_html_node(block, basepath, block_type)
+        self.entries[key] = node
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+        return node
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+def iter_block_nodes(lines, basepath="/", memo=None):
+    for block_type, block in scan_blocks(lines):
+        if memo is not None:
+            yield memo.render(block, basepath, block_type)
+        else:
+            yield block_to_html_node(block, basepath, block_type)
 
 
+def markdown_to_html_node(markdown, basepath="/", memo=None):
+    parentnodes = list(iter_block_nodes(markdown.split("\n"), basepath, memo))
+    root_node = ParentNode("div", parentnodes)
+    return root_node
@@ -0,0 +1,176 @@
+from pathlib import Path
+import os
+import threading
+
+
+def _temp_path(path):
+    # Hidden and unique per writer thread, so a half-written file is never
+    # picked up by a server or a concurrent build.
+    return path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+
+
+def _same_contents(path, data):
+    try:
+        if os.stat(path).st_size != len(data):
+            return False
+        with open(path, "rb") as f:
+            return f.read() == data
+    except FileNotFoundError:
+        return False
+
+
+def write_if_changed(path, data):
+    # Returns True if the file was (re)written, False if it already held
+    # exactly these bytes. Skipping keeps the mtime, so rsync and CDN
+    # caches see nothing new.
+    path = Path(path)
+    if _same_contents(path, data):
+        return False
+    os.makedirs(path.parent, exist_ok=True)
+    tmp_path = _temp_path(path)
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        _unlink_quietly(tmp_path)
+        raise
+    return True
+
+
+# Extensions of the siblings precompress.py writes next to an output.
+PRECOMPRESSED_SUFFIXES = (".gz", ".br")
+
+
+def remove_precompressed(path, keep=()):
+    # Deletes the precompressed siblings of an output that was removed or
+    # is no longer compressed; returns the paths removed. Siblings in keep
+    # (outputs in their own right) are left alone.
+    removed = []
+    for suffix in PRECOMPRESSED_SUFFIXES:
+        sibling = Path(f"{path}{suffix}")
+        if sibling in keep:
+            continue
+        try:
+            os.unlink(sibling)
+        except FileNotFoundError:
+            continue
+        removed.append(sibling)
+    return removed
+
+
+def _unlink_quietly(path):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+class _ComparingFile():
+    # Text file handed out by AtomicOutput. While the output matches the
+    # existing file, nothing is written: each buffered chunk is compared with
+    # the next bytes on disk. At the first difference the matched prefix is
+    # copied to the temp file and writing carries on there, so memory stays
+    # bounded by the buffer and an unchanged page costs only a read.
+    def __init__(self, path, tmp_path, buffer_size=1 << 16):
+        self.path = path
+        self.tmp_path = tmp_path
+        self.buffer_size = buffer_size
+        self.buffer = []
+        self.buffered = 0
+        self.matched = 0
+        self.size = 0
+        self.out = None
+        try:
+            self.existing = open(path, "rb")
+        except FileNotFoundError:
+            self.existing = None
+            self.out = open(tmp_path, "wb")
+
+    def write(self, text):
+        self.buffer.append(text)
+        self.buffered += len(text)
+        if self.buffered >= self.buffer_size:
+            self._flush()
+        return len(text)
+
+    def writelines(self, lines):
+        for line in lines:
+            self.write(line)
+
+    def _flush(self):
+        data = "".join(self.buffer).encode("utf-8")
+        self.buffer = []
+        self.buffered = 0
+        self.size += len(data)
+        if self.out is None:
+            if self.existing.read(len(data)) == data:
+                self.matched += len(data)
+                return
+            self._diverge()
+        self.out.write(data)
+
+    def _diverge(self):
+        self.out = open(self.tmp_path, "wb")
+        self.existing.seek(0)
+        remaining = self.matched
+        while remaining:
+            chunk = self.existing.read(min(remaining, 1 << 16))
+            self.out.write(chunk)
+            remaining -= len(chunk)
+        self.existing.close()
+        self.existing = None
+
+    def finish(self):
+        # Returns True if the file was replaced, False if it already held
+        # exactly this output.
+        self._flush()
+        if self.out is None:
+            if self.existing.read(1) == b"":
+                self.existing.close()
+                return False
+            # The old file is longer.
+            self._diverge()
+        self.out.close()
+        os.replace(self.tmp_path, self.path)
+        return True
+
+    def abort(self):
+        for f in (self.existing, self.out):
+            if f is not None:
+                f.close()
+        if self.out is not None:
+            _unlink_quietly(self.tmp_path)
+
+
+class AtomicOutput():
+    # Text file context manager for rendered pages: written to a temp file
+    # and swapped in, or dropped if the existing file is byte-for-byte the
+    # same (see _ComparingFile). changed and size are set on exit, and a
+    # changed page loses its precompressed siblings.
+    def __init__(self, path):
+        self.path = Path(path)
+        self.tmp_path = _temp_path(self.path)
+        self.changed = None
+        self.size = 0
+
+    def __enter__(self):
+        os.makedirs(self.path.parent, exist_ok=True)
+        self.file = _ComparingFile(self.path, self.tmp_path)
+        return self.file
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.file.abort()
+            return False
+        try:
+            self.changed = self.file.finish()
+        except BaseException:
+            self.file.abort()
+            raise
+        if self.changed:
+            # Siblings of the old output are stale; precompress.py writes
+            # fresh ones when it is on.
+            remove_precompressed(self.path)
+        self.size = self.file.size
+        return False
@@ -0,0 +1,108 @@
+from collections import namedtuple
+from pathlib import Path
+import os
+
+
+# rel is relative to the tree root, always with "/" separators; stat comes
+# from the scandir walk so executors never stat a source again.
+Tree = namedtuple("Tree", ["files", "dirs"])
+Step = namedtuple("Step", ["action", "rel", "source", "destination", "stat"])
+BuildPlan = namedtuple(
+    "BuildPlan", ["content_dir", "static_dir", "dest_dir", "pages", "static", "static_dirs"]
+)
+
+
+def _walk_from(root, start):
+    # DirEntry carries the file type from readdir, so only regular files
+    # cost a stat call (needed for size and mtime anyway).
+    files = []
+    dirs = []
+    pending = [start]
+    while pending:
+        rel = pending.pop()
+        with os.scandir(root / rel if rel else root) as entries:
+            for entry in entries:
+                rel_path = f"{rel}/{entry.name}" if rel else entry.name
+                if entry.is_file():
+                    files.append((rel_path, entry.stat()))
+                elif entry.is_dir():
+                    dirs.append(rel_path)
+                    pending.append(rel_path)
+                else:
+                    print(f"Skipping unknown type: {entry.path}")
+    return files, dirs
+
+
+def walk(root, jobs=1):
+    root = Path(root)
+    if jobs <= 1:
+        files, dirs = _walk_from(root, "")
+    else:
+        # The top level is listed once; each top-level directory is then
+        # walked on its own thread. scandir and stat release the GIL, which
+        # pays off on network filesystems where every call is a round trip.
+        from concurrent.futures import ThreadPoolExecutor
+
+        files = []
+        dirs = []
+        with os.scandir(root) as entries:
+            for entry in entries:
+                if entry.is_file():
+                    files.append((entry.name, entry.stat()))
+                elif entry.is_dir():
+                    dirs.append(entry.name)
+                else:
+                    print(f"Skipping unknown type: {entry.path}")
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            for sub_files, sub_dirs in pool.map(lambda rel: _walk_from(root, rel), list(dirs)):
+                files.extend(sub_files)
+                dirs.extend(sub_dirs)
+    files.sort()
+    dirs.sort()
+    return Tree(tuple(files), tuple(dirs))
+
+
+def page_steps(tree, content_dir, dest_dir):
+    content_dir = Path(content_dir)
+    dest_dir = Path(dest_dir)
+    return tuple(
+        Step("render", rel, content_dir / rel, (dest_dir / rel).with_suffix(".html"), stat)
+        for rel, stat in tree.files
+        if rel.lower().endswith(".md")
+    )
+
+
+def static_steps(tree, static_dir, dest_dir):
+    static_dir = Path(static_dir)
+    dest_dir = Path(dest_dir)
+    return tuple(
+        Step("copy", rel, static_dir / rel, dest_dir / rel, stat) for rel, stat in tree.files
+    )
+
+
+def make_plan(content_dir, static_dir, dest_dir, jobs=1):
+    content_dir = Path(content_dir).resolve()
+    static_dir = Path(static_dir).resolve()
+    dest_dir = Path(dest_dir).resolve()
+    static_tree = walk(static_dir, jobs)
+    return BuildPlan(
+        content_dir,
+        static_dir,
+        dest_dir,
+        page_steps(walk(content_dir, jobs), content_dir, dest_dir),
+        static_steps(static_tree, static_dir, dest_dir),
+        static_tree.dirs,
+    )
+
+
+def format_plan(plan):
+    lines = []
+    for step in plan.static + plan.pages:
+        source = os.path.relpath(step.source)
+        destination = os.path.relpath(step.destination)
+        lines.append(f"{step.action:6} {source} -> {destination} ({step.stat.st_size} bytes)")
+    lines.append(
+        f"{len(plan.pages)} page(s) to render, {len(plan.static)} static file(s) to copy "
+        f"into {len(plan.static_dirs)} director{'y' if len(plan.static_dirs) == 1 else 'ies'}"
+    )
+    return "\n".join(lines)
@@ -0,0 +1,139 @@
+from collections import deque
+from pathlib import Path
+import gzip
+import os
+from output import remove_precompressed, write_if_changed
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+PRECOMPRESS_MIN_SIZE = 1024
+
+# Already compressed; another pass only costs time.
+COMPRESSED_SUFFIXES = {
+    ".png", ".jpg", ".jpeg", ".gif", ".webp", ".avif", ".heic",
+    ".woff", ".woff2", ".mp3", ".mp4", ".webm", ".ogg", ".pdf",
+    ".zip", ".gz", ".tgz", ".br", ".zst", ".xz", ".bz2",
+}
+
+
+def _gzip(data):
+    # mtime=0 keeps the output identical from build to build.
+    return gzip.compress(data, 9, mtime=0)
+
+
+def _brotli(data):
+    return brotli.compress(data, quality=11)
+
+
+# Keep output.PRECOMPRESSED_SUFFIXES in step with these.
+ENCODERS = {"gz": _gzip, "br": _brotli}
+
+
+def available_encodings():
+    return ("gz", "br") if brotli is not None else ("gz",)
+
+
+class Precompressor():
+    # Writes .gz (and .br, with brotli installed) siblings of text outputs
+    # for servers that send precompressed files as-is. Compression runs on
+    # a thread pool (zlib and brotli release the GIL) while the build goes
+    # on; finish() waits for it.
+    def __init__(self, encodings=None, min_size=PRECOMPRESS_MIN_SIZE, jobs=4):
+        if encodings is None:
+            encodings = available_encodings()
+        for encoding in encodings:
+            if encoding not in ENCODERS:
+                raise ValueError(f"Unknown encoding: {encoding}")
+            if encoding == "br" and brotli is None:
+                raise RuntimeError("Brotli needs the brotli package (pip install brotli)")
+        self.encodings = tuple(encodings)
+        self.min_size = min_size
+        self.jobs = jobs
+        self.pool = None
+        self.pending = deque()
+        self.compressed = 0
+
+    def wanted(self, path, size):
+        return size >= self.min_size and os.path.splitext(path)[1].lower() not in COMPRESSED_SUFFIXES
+
+    def siblings(self, path, size):
+        if not self.wanted(str(path), size):
+            return []
+        return [f"{path}.{encoding}" for encoding in self.encodings]
+
+    def _submit(self, fn, *args):
+        if self.pool is None:
+            from concurrent.futures import ThreadPoolExecutor
+
+            self.pool = ThreadPoolExecutor(max_workers=self.jobs)
+        return self.pool.submit(fn, *args)
+
+    def submit(self, path, data, write):
+        # For storages: data is compressed on the pool, and write(sibling,
+        # compressed) is called from this thread in submission order, so
+        # archives get the same member order on every build.
+        siblings = self.siblings(path, len(data))
+        for sibling, encoding in zip(siblings, self.encodings):
+            self.pending.append((sibling, self._submit(ENCODERS[encoding], data), write))
+        self._drain(block=False)
+        return siblings
+
+    def submit_file(self, path, rel, size):
+        # For output directories: read, compressed and written on the pool.
+        # Returns the siblings' paths relative to the output, as rel is.
+        # Siblings left from when the file was big enough are deleted.
+        siblings = self.siblings(rel, size)
+        if siblings:
+            self.pending.append((None, self._submit(self._compress_file, Path(path)), None))
+        elif size < self.min_size:
+            for sibling in remove_precompressed(path):
+                print(f"- Removing stale file: {sibling}")
+        self._drain(block=False)
+        return siblings
+
+    def _compress_file(self, path):
+        mtime_ns = os.stat(path).st_mtime_ns
+        data = None
+        written = 0
+        for encoding in self.encodings:
+            sibling = path.with_name(f"{path.name}.{encoding}")
+            try:
+                if os.stat(sibling).st_mtime_ns >= mtime_ns:
+                    continue
+            except FileNotFoundError:
+                pass
+            if data is None:
+                data = path.read_bytes()
+            if not write_if_changed(sibling, ENCODERS[encoding](data)):
+                # Same bytes as before; mark it up to date for the next build.
+                os.utime(sibling)
+            written += 1
+        return written
+
+    def _drain(self, block):
+        while self.pending and (block or self.pending[0][1].done()):
+            sibling, future, write = self.pending.popleft()
+            result = future.result()
+            if write is None:
+                self.compressed += result
+            else:
+                write(sibling, result)
+                self.compressed += 1
+
+    def finish(self):
+        # Waits for every queued file and shuts the pool down; returns the
+        # number of siblings written.
+        try:
+            self._drain(block=True)
+        finally:
+            self.pending.clear()
+            if self.pool is not None:
+                self.pool.shutdown()
+                self.pool = None
+        compressed = self.compressed
+        self.compressed = 0
+        return compressed
@@ -0,0 +1,107 @@
+from pathlib import Path
+import hashlib
+import json
+import os
+import threading
+
+
+# Bump when the HTML produced for the same markdown changes in a way the
+# renderer source digest below would not catch (e.g. a dependency upgrade),
+# or when the entry format changes.
+RENDERER_VERSION = "2"
+
+RENDERER_MODULES = ("markdown_blocks", "inline", "htmlnode", "textnode")
+
+# Fragments are rendered with this in place of the basepath, so a single
+# cache entry serves every basepath (main.sh and build.sh use different
+# ones). Markdown that contains it is never cached.
+BASEPATH_MARKER = "\x00"
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+def renderer_fingerprint():
+    digest = hashlib.sha256(RENDERER_VERSION.encode())
+    src_dir = Path(__file__).resolve().parent
+    for module in RENDERER_MODULES:
+        digest.update((src_dir / f"{module}.py").read_bytes())
+    return digest.hexdigest()
+
+
+class RenderCache():
+    def __init__(self, directory, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.renderer = renderer_fingerprint()
+        self.hits = 0
+        self.misses = 0
+
+    def __getstate__(self):
+        return {"directory": self.directory, "max_bytes": self.max_bytes, "renderer": self.renderer}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, markdown):
+        digest = hashlib.sha256(self.renderer.encode())
+        digest.update(b"\0")
+        digest.update(markdown.encode("utf-8"))
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return self.directory / key[:2] / f"{key}.json"
+
+    def cacheable(self, markdown):
+        return BASEPATH_MARKER not in markdown
+
+    def get(self, markdown, basepath):
+        path = self._path(self.key(markdown))
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        try:
+            # Touch the entry so eviction sees it as recently used.
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return entry["title"], entry["html"].replace(BASEPATH_MARKER, basepath), entry["summary"]
+
+    def put(self, markdown, title, fragment, summary=""):
+        path = self._path(self.key(markdown))
+        os.makedirs(path.parent, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"title": title, "html": fragment, "summary": summary}, f)
+        os.replace(tmp_path, path)
+
+    def evict(self):
+        if not self.directory.exists():
+            return 0
+        entries = []
+        total = 0
+        for path in self.directory.glob("*/*.json"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+            total += stat.st_size
+
+        removed = 0
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        return removed
@@ -0,0 +1,386 @@
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+import argparse
+import asyncio
+import hashlib
+import mimetypes
+import os
+import posixpath
+import threading
+from urllib.parse import quote, unquote
+from gencontent import render_page
+from watch import Rebuilder, make_watcher, wait_for_changes
+
+
+LIVE_RELOAD_PATH = "/__livereload"
+LIVE_RELOAD_SCRIPT = (
+    "<script>new EventSource(\"" + LIVE_RELOAD_PATH + "\")"
+    ".onmessage = function () { location.reload(); };</script>"
+).encode()
+KEEP_ALIVE_TIMEOUT = 15
+SSE_HEARTBEAT = 15
+
+REASONS = {
+    200: "OK",
+    301: "Moved Permanently",
+    304: "Not Modified",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    500: "Internal Server Error",
+}
+
+
+class Entry():
+    __slots__ = ("body", "etag", "mtime", "content_type")
+
+    def __init__(self, body, mtime, content_type):
+        self.body = body
+        self.etag = '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+        self.mtime = int(mtime)
+        self.content_type = content_type
+
+
+def content_type_for(path):
+    content_type, _ = mimetypes.guess_type(str(path))
+    content_type = content_type or "application/octet-stream"
+    if content_type.startswith("text/") or content_type == "application/javascript":
+        content_type += "; charset=utf-8"
+    return content_type
+
+
+def inject_live_reload(body):
+    index = body.rfind(b"</body>")
+    if index == -1:
+        return body + LIVE_RELOAD_SCRIPT
+    return body[:index] + LIVE_RELOAD_SCRIPT + body[index:]
+
+
+class FileCache():
+    # Every file under root, pre-loaded. refresh() re-reads only files whose
+    # size or mtime changed and swaps in a new dict, so readers never lock.
+    def __init__(self, root, live_reload=False):
+        self.root = Path(root).resolve()
+        self.live_reload = live_reload
+        self.entries = {}
+        self._stats = {}
+
+    def refresh(self):
+        entries = {}
+        stats = {}
+        for directory, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                path = Path(directory) / filename
+                rel = path.relative_to(self.root).as_posix()
+                stat = os.stat(path)
+                key = (stat.st_size, stat.st_mtime_ns)
+                stats[rel] = key
+                if self._stats.get(rel) == key:
+                    entries[rel] = self.entries[rel]
+                    continue
+                body = path.read_bytes()
+                if self.live_reload and path.suffix == ".html":
+                    body = inject_live_reload(body)
+                entries[rel] = Entry(body, stat.st_mtime, content_type_for(path))
+        self.entries = entries
+        self._stats = stats
+
+    def get(self, rel):
+        return self.entries.get(rel)
+
+    def is_dir(self, rel):
+        prefix = rel.rstrip("/") + "/"
+        return any(key.startswith(prefix) for key in self.entries)
+
+
+class PageRenderer():
+    # Renders content/<rel>.md on first request and keeps the result until a
+    # source changes; nothing is written to disk. get() blocks while it
+    # renders, so the server calls it from an executor thread; the lock
+    # keeps a page rendered before invalidate() from being stored after it.
+    def __init__(self, content_dir, template_path, basepath="/", cache=None, live_reload=False):
+        self.content_dir = Path(content_dir).resolve()
+        self.template_path = Path(template_path).resolve()
+        self.basepath = basepath
+        self.cache = cache
+        self.live_reload = live_reload
+        self.pages = {}
+        self._lock = threading.Lock()
+
+    def source_for(self, rel):
+        if not rel.endswith(".html"):
+            return None
+        source = self.content_dir / (rel[:-len(".html")] + ".md")
+        return source if source.is_file() else None
+
+    def get(self, rel):
+        entry = self.pages.get(rel)
+        if entry is not None:
+            return entry
+        source = self.source_for(rel)
+        if source is None:
+            return None
+        with self._lock:
+            entry = self.pages.get(rel)
+            if entry is not None:
+                return entry
+            body = render_page(source, self.template_path, self.basepath, self.cache).encode("utf-8")
+            if self.live_reload:
+                body = inject_live_reload(body)
+            entry = Entry(body, os.stat(source).st_mtime, "text/html; charset=utf-8")
+            self.pages[rel] = entry
+        return entry
+
+    def is_dir(self, rel):
+        return (self.content_dir / rel).is_dir()
+
+    def invalidate(self):
+        # Called from the watcher thread.
+        with self._lock:
+            self.pages = {}
+
+
+class DevServer():
+    def __init__(self, files, renderer=None):
+        self.files = files
+        self.renderer = renderer
+        self.listeners = set()
+        self.loop = None
+
+    def lookup(self, rel):
+        if self.renderer is not None:
+            entry = self.renderer.get(rel)
+            if entry is not None:
+                return entry
+        return self.files.get(rel)
+
+    def is_dir(self, rel):
+        if self.renderer is not None and self.renderer.is_dir(rel):
+            return True
+        return self.files.is_dir(rel)
+
+    def resolve(self, url_path):
+        # Returns (entry, redirect) for a percent-decoded path; mirrors
+        # http.server's index.html and trailing-slash handling.
+        if "\x00" in url_path:
+            return None, None
+        path = posixpath.normpath(url_path)
+        if path.startswith("..") or "/../" in path:
+            return None, None
+        rel = path.lstrip("/")
+        if rel in ("", "."):
+            return self.lookup("index.html"), None
+        if url_path.endswith("/"):
+            return self.lookup(f"{rel}/index.html"), None
+        entry = self.lookup(rel)
+        if entry is not None:
+            return entry, None
+        if self.is_dir(rel):
+            return None, url_path + "/"
+        return None, None
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    head = await asyncio.wait_for(
+                        reader.readuntil(b"\r\n\r\n"), KEEP_ALIVE_TIMEOUT
+                    )
+                except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+                    break
+                keep_alive = await self.respond(head, writer)
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    async def respond(self, head, writer):
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, version = lines[0].split(" ", 2)
+        except ValueError:
+            await self.send(writer, 400, b"Bad Request", keep_alive=False)
+            return False
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(":")
+            if name:
+                headers[name.strip().lower()] = value.strip()
+
+        connection = headers.get("connection", "").lower()
+        if version == "HTTP/1.1":
+            keep_alive = connection != "close"
+        else:
+            keep_alive = connection == "keep-alive"
+
+        url_path = unquote(target.split("?", 1)[0].split("#", 1)[0])
+        if method not in ("GET", "HEAD"):
+            await self.send(writer, 405, b"Method Not Allowed", keep_alive, {"Allow": "GET, HEAD"})
+            return keep_alive
+        if url_path == LIVE_RELOAD_PATH:
+            await self.event_stream(writer)
+            return False
+
+        try:
+            if self.renderer is not None:
+                # Rendering would stall every other connection on the loop.
+                loop = asyncio.get_running_loop()
+                entry, redirect = await loop.run_in_executor(None, self.resolve, url_path)
+            else:
+                entry, redirect = self.resolve(url_path)
+        except Exception as e:
+            await self.send(writer, 500, f"Render failed: {e}".encode(), keep_alive)
+            return keep_alive
+        if redirect is not None:
+            await self.send(writer, 301, b"", keep_alive, {"Location": quote(redirect)})
+            return keep_alive
+        if entry is None:
+            await self.send(writer, 404, b"Not Found", keep_alive)
+            return keep_alive
+
+        extra = {
+            "ETag": entry.etag,
+            "Last-Modified": formatdate(entry.mtime, usegmt=True),
+            "Cache-Control": "no-cache",
+        }
+        if self.not_modified(headers, entry):
+            await self.send(writer, 304, b"", keep_alive, extra, head_only=True)
+            return keep_alive
+        extra["Content-Type"] = entry.content_type
+        await self.send(writer, 200, entry.body, keep_alive, extra, head_only=method == "HEAD")
+        return keep_alive
+
+    def not_modified(self, headers, entry):
+        if_none_match = headers.get("if-none-match")
+        if if_none_match is not None:
+            tags = [tag.strip() for tag in if_none_match.split(",")]
+            return "*" in tags or entry.etag in tags or f"W/{entry.etag}" in tags
+        if_modified_since = headers.get("if-modified-since")
+        if if_modified_since is not None:
+            try:
+                since = parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+            return entry.mtime <= since
+        return False
+
+    async def send(self, writer, status, body, keep_alive, extra=None, head_only=False):
+        lines = [f"HTTP/1.1 {status} {REASONS[status]}"]
+        headers = {"Content-Length": str(len(body))}
+        if status != 304 and "Content-Type" not in (extra or {}):
+            headers["Content-Type"] = "text/plain; charset=utf-8"
+        headers.update(extra or {})
+        headers["Connection"] = "keep-alive" if keep_alive else "close"
+        lines.extend(f"{name}: {value}" for name, value in headers.items())
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+        if not head_only and status != 304:
+            writer.write(body)
+        await writer.drain()
+
+    async def event_stream(self, writer):
+        writer.write(
+            b"HTTP/1.1 200 OK\r\n"
+            b"Content-Type: text/event-stream\r\n"
+            b"Cache-Control: no-cache\r\n"
+            b"Connection: keep-alive\r\n\r\n"
+            b"retry: 1000\n\n"
+        )
+        await writer.drain()
+        queue = asyncio.Queue()
+        self.listeners.add(queue)
+        try:
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), SSE_HEARTBEAT)
+                    writer.write(f"data: {message}\n\n".encode())
+                except asyncio.TimeoutError:
+                    writer.write(b": ping\n\n")
+                await writer.drain()
+        finally:
+            self.listeners.discard(queue)
+
+    def push_reload(self):
+        for queue in list(self.listeners):
+            queue.put_nowait("reload")
+
+    def sources_changed(self):
+        # Called from the watcher thread.
+        self.loop.call_soon_threadsafe(self.push_reload)
+
+
+def watch_sources(server, content_dir, static_dir, template_path, rebuilder, polling):
+    watcher = make_watcher([content_dir, static_dir], [template_path], polling)
+    while True:
+        changed, _ = wait_for_changes(watcher)
+        full = watcher.overflowed
+        watcher.overflowed = False
+        try:
+            if server.renderer is not None:
+                server.renderer.invalidate()
+            else:
+                rebuilder.rebuild(changed, full)
+            server.files.refresh()
+        except Exception as e:
+            print(f"Rebuild failed: {e}")
+            continue
+        print(f"Changed: {', '.join(sorted(str(path) for path in changed)) or 'everything'}")
+        server.sources_changed()
+
+
+async def serve(server, host, port):
+    server.loop = asyncio.get_running_loop()
+    listener = await asyncio.start_server(server.handle, host, port)
+    print(f"Serving on http://{host}:{port}/")
+    async with listener:
+        await listener.serve_forever()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the site with live reload")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8888)
+    parser.add_argument("--dir", type=Path, default=Path("docs"), help="output directory to serve")
+    parser.add_argument(
+        "--render",
+        action="store_true",
+        help="render pages from content/ on request and serve static/ directly; nothing is written",
+    )
+    parser.add_argument("--basepath", default="/")
+    parser.add_argument("--no-reload", action="store_true", help="disable live reload")
+    parser.add_argument("--poll", action="store_true", help="watch by polling mtimes")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    live_reload = not args.no_reload
+    content_dir, static_dir, template_path = Path("content"), Path("static"), Path("template.html")
+
+    if args.render:
+        files = FileCache(static_dir, live_reload)
+        renderer = PageRenderer(content_dir, template_path, args.basepath, live_reload=live_reload)
+    else:
+        files = FileCache(args.dir, live_reload)
+        renderer = None
+    files.refresh()
+    server = DevServer(files, renderer)
+
+    if live_reload:
+        rebuilder = Rebuilder(content_dir, static_dir, template_path, args.dir, args.basepath)
+        thread = threading.Thread(
+            target=watch_sources,
+            args=(server, content_dir, static_dir, template_path, rebuilder, args.poll),
+            daemon=True,
+        )
+        thread.start()
+
+    try:
+        asyncio.run(serve(server, args.host, args.port))
+    except KeyboardInterrupt:
+        print("Stopped serving")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+import argparse
+import json
+import os
+import socket
+import sys
+
+
+# Kept to the standard library so asking the daemon for a rebuild costs
+# little more than interpreter startup.
+
+SOCKET_PATH = ".build-daemon.sock"
+
+
+def request(message, socket_path=SOCKET_PATH, timeout=None):
+    # One JSON object per line each way.
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(os.fspath(socket_path))
+        sock.sendall(json.dumps(message).encode("utf-8") + b"\n")
+        with sock.makefile("rb") as f:
+            line = f.readline()
+    if not line.endswith(b"\n"):
+        raise ConnectionError("The build daemon closed the connection without answering")
+    return json.loads(line)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Talk to a running build daemon (src/daemon.py)")
+    parser.add_argument("command", choices=("rebuild", "build", "ping", "stop"))
+    parser.add_argument("paths", nargs="*", help="changed sources, for rebuild")
+    parser.add_argument("--full", action="store_true", help="rebuild re-renders every page")
+    parser.add_argument("--socket", default=SOCKET_PATH)
+    parser.add_argument("--timeout", type=float, help="give up after this many seconds")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    message = {"command": args.command}
+    if args.command == "rebuild":
+        # The daemon may run from another directory.
+        message["paths"] = [os.path.abspath(path) for path in args.paths]
+        message["full"] = args.full
+    try:
+        response = request(message, args.socket, args.timeout)
+    except (FileNotFoundError, ConnectionRefusedError):
+        print(f"No build daemon on {args.socket}; start one with python3 src/daemon.py", file=sys.stderr)
+        return 2
+    except TimeoutError:
+        print(f"{args.command} timed out after {args.timeout}s", file=sys.stderr)
+        return 1
+    except ConnectionError as e:
+        print(f"{args.command} failed: {e}", file=sys.stderr)
+        return 1
+    if not response.get("ok"):
+        print(f"{args.command} failed: {response.get('error')}", file=sys.stderr)
+        return 1
+
+    if args.command == "rebuild":
+        print(
+            f"Rebuilt {response['pages']} page(s), copied {response['static']} static file(s), "
+            f"removed {response['removed']} in {response['ms']} ms"
+        )
+    elif args.command == "ping":
+        print(
+            f"Build daemon {response['pid']} up {response['uptime']:.0f}s, "
+            f"{response['builds']} build(s) served"
+        )
+    elif args.command == "build":
+        print(f"Built in {response['ms']} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+from collections import namedtuple
+from datetime import datetime, timezone
+from xml.sax.saxutils import escape, quoteattr
+import json
+
+
+SITEMAP_NAME = "sitemap.xml"
+FEED_NAME = "feed.xml"
+SEARCH_INDEX_NAME = "search-index.json"
+
+# Pages under this output directory go into the feed, newest first.
+FEED_DIR = "blog/"
+FEED_ENTRIES = 20
+
+# rel is the output path relative to the site root; mtime is the source's,
+# in seconds, or None when the source storage keeps no times.
+PageRecord = namedtuple("PageRecord", ["url", "rel", "title", "summary", "mtime"])
+
+
+def page_url(rel, basepath):
+    # Pretty URLs: blog/tom/index.html is served as blog/tom/.
+    if rel == "index.html":
+        rel = ""
+    elif rel.endswith("/index.html"):
+        rel = rel[:-len("index.html")]
+    return basepath.rstrip("/") + "/" + rel
+
+
+def records_from_manifest(pages, basepath):
+    # pages is the manifest's "pages" section, as returned by
+    # generate_pages_incremental: rendered and unchanged pages alike.
+    return [
+        PageRecord(
+            page_url(rel, basepath), rel, entry.get("title"), entry.get("summary", ""),
+            entry["source_mtime_ns"] / 1e9,
+        )
+        for rel, entry in sorted(pages.items())
+    ]
+
+
+def _timestamp(mtime):
+    return datetime.fromtimestamp(mtime, timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def sitemap_xml(records, site_url):
+    site_url = site_url.rstrip("/")
+    lines = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">',
+    ]
+    for record in records:
+        lines.append(f"<url><loc>{escape(site_url + record.url)}</loc>")
+        if record.mtime is not None:
+            lines.append(f"<lastmod>{_timestamp(record.mtime)}</lastmod>")
+        lines.append("</url>")
+    lines.append("</urlset>")
+    return "\n".join(lines) + "\n"
+
+
+def atom_feed(records, site_url, basepath, build_time):
+    # An Atom feed of the pages under FEED_DIR. Pages without a source time
+    # are dated with the build.
+    site_url = site_url.rstrip("/")
+    entries = [record for record in records if record.rel.startswith(FEED_DIR)]
+    entries.sort(key=lambda record: (record.mtime or build_time, record.rel), reverse=True)
+    entries = entries[:FEED_ENTRIES]
+    titles = {record.rel: record.title for record in records}
+    title = titles.get(FEED_DIR + "index.html") or titles.get("index.html") or "Blog"
+    section_url = site_url + page_url(FEED_DIR, basepath)
+    feed_url = site_url + page_url(FEED_NAME, basepath)
+    updated = max((record.mtime or build_time for record in entries), default=build_time)
+
+    lines = [
+        '<?xml version="1.0" encoding="utf-8"?>',
+        '<feed xmlns="http://www.w3.org/2005/Atom">',
+        f"<title>{escape(title)}</title>",
+        f"<id>{escape(section_url)}</id>",
+        f"<link href={quoteattr(section_url)}/>",
+        f'<link rel="self" href={quoteattr(feed_url)}/>',
+        f"<updated>{_timestamp(updated)}</updated>",
+        f"<author><name>{escape(title)}</name></author>",
+    ]
+    for record in entries:
+        url = site_url + record.url
+        lines.extend([
+            "<entry>",
+            f"<title>{escape(record.title or record.rel)}</title>",
+            f"<id>{escape(url)}</id>",
+            f"<link href={quoteattr(url)}/>",
+            f"<updated>{_timestamp(record.mtime or build_time)}</updated>",
+            f"<summary>{escape(record.summary)}</summary>",
+            "</entry>",
+        ])
+    lines.append("</feed>")
+    return "\n".join(lines) + "\n"
+
+
+def search_index_json(records):
+    # One short-keyed object per page, no whitespace: fetched whole by a
+    # client-side search box.
+    index = [{"u": record.url, "t": record.title, "s": record.summary} for record in records]
+    return json.dumps(index, ensure_ascii=False, separators=(",", ":"))
+
+
+def site_index_files(records, site_url, basepath, build_time):
+    # Output path -> bytes, for every file the site index produces.
+    return {
+        SITEMAP_NAME: sitemap_xml(records, site_url).encode("utf-8"),
+        FEED_NAME: atom_feed(records, site_url, basepath, build_time).encode("utf-8"),
+        SEARCH_INDEX_NAME: search_index_json(records).encode("utf-8"),
+    }
@@ -0,0 +1,64 @@
+import subprocess
+import sys
+import time
+
+
+def parse_importtime(text):
+    # `python -X importtime` writes "import time: self | cumulative | name"
+    # to stderr, in microseconds, nested imports indented two spaces per
+    # level. Returns (name, self_us, cumulative_us, depth) tuples.
+    entries = []
+    for line in text.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        name = fields[2].rstrip()
+        module = name.lstrip(" ")
+        depth = (len(name) - len(module) - 1) // 2
+        entries.append((module, int(fields[0]), int(fields[1]), depth))
+    return entries
+
+
+def import_total_us(entries):
+    return sum(cumulative for _, _, cumulative, depth in entries if depth == 0)
+
+
+def measure(script, argv, cwd=None):
+    # Runs the script in a fresh interpreter, as a user would, so the
+    # numbers include interpreter startup and nothing is already imported.
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", str(script), *argv],
+        capture_output=True,
+        text=True,
+        cwd=cwd,
+    )
+    wall = time.perf_counter() - start
+    return wall, parse_importtime(result.stderr), result
+
+
+def format_startup(wall, entries, top=10):
+    top_level = [entry for entry in entries if entry[3] == 0]
+    lines = [
+        f"Startup: {wall * 1000:.1f} ms wall, {import_total_us(entries) / 1000:.1f} ms "
+        f"importing {len(entries)} modules",
+        "Slowest top-level imports (including what they import):",
+    ]
+    for module, _, cumulative, _ in sorted(top_level, key=lambda e: e[2], reverse=True)[:top]:
+        lines.append(f"  {cumulative / 1000:8.1f} ms  {module}")
+    lines.append("Slowest modules by their own import time:")
+    for module, self_us, _, _ in sorted(entries, key=lambda e: e[1], reverse=True)[:top]:
+        lines.append(f"  {self_us / 1000:8.1f} ms  {module}")
+    return "\n".join(lines)
+
+
+def report_startup(script, argv, top=10):
+    wall, entries, result = measure(script, argv)
+    sys.stdout.write(result.stdout)
+    other = [line for line in result.stderr.splitlines() if not line.startswith("import time:")]
+    if other:
+        print("\n".join(other), file=sys.stderr)
+    print(format_startup(wall, entries, top))
+    return result.returncode
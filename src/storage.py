@@ -0,0 +1,288 @@
+from pathlib import Path, PurePosixPath
+import io
+import os
+import time
+from output import write_if_changed
+from plan import walk
+
+# tarfile, zipfile and zstandard are imported when an archive is opened.
+
+
+# Storages hold files by "/"-separated relative path and share four methods:
+# list(prefix) -> sorted paths under prefix, read(path) -> bytes,
+# write(path, data) and close(). Read-only storages raise on write.
+
+
+def _under(prefix, path):
+    return not prefix or path.startswith(prefix.rstrip("/") + "/")
+
+
+def safe_relative_path(path):
+    # Archive member names and output paths come from whoever made the
+    # archive; an absolute name or a ".." part could write outside the
+    # output directory.
+    pure = PurePosixPath(path.replace("\\", "/"))
+    parts = [part for part in pure.parts if part != "."]
+    if pure.is_absolute() or not parts or ".." in parts or ":" in parts[0]:
+        raise ValueError(f"Unsafe path in archive or output: {path!r}")
+    return "/".join(parts)
+
+
+class DirectoryStorage():
+    def __init__(self, root):
+        self.root = Path(root)
+
+    def list(self, prefix=""):
+        base = self.root / prefix if prefix else self.root
+        if not base.is_dir():
+            return []
+        prefix = prefix.rstrip("/")
+        return [f"{prefix}/{rel}" if prefix else rel for rel, _ in walk(base).files]
+
+    def read(self, path):
+        return (self.root / path).read_bytes()
+
+    def write(self, path, data):
+        root = self.root.resolve()
+        target = (root / safe_relative_path(path)).resolve()
+        if not target.is_relative_to(root):
+            # A symlink inside the output pointing elsewhere.
+            raise ValueError(f"Refusing to write outside {root}: {path}")
+        return write_if_changed(target, data)
+
+    def prune(self, keep, previous):
+        # keep and previous are paths relative to root: this build's outputs
+        # and the last build's.
+        from copystatic import prune_public_dir
+
+        root = self.root.resolve()
+        return prune_public_dir(
+            root, [root / path for path in keep], [root / path for path in previous]
+        )
+
+    def close(self):
+        pass
+
+    def __repr__(self):
+        return f"DirectoryStorage({str(self.root)!r})"
+
+
+class MemoryStorage():
+    def __init__(self, files=None):
+        self.files = {}
+        for path, data in (files or {}).items():
+            self.write(path, data)
+
+    def list(self, prefix=""):
+        return sorted(path for path in self.files if _under(prefix, path))
+
+    def read(self, path):
+        try:
+            return self.files[path]
+        except KeyError:
+            raise FileNotFoundError(path) from None
+
+    def write(self, path, data):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        if self.files.get(path) == data:
+            return False
+        self.files[path] = data
+        return True
+
+    def close(self):
+        pass
+
+    def __repr__(self):
+        return f"MemoryStorage({len(self.files)} files)"
+
+
+# Suffix -> (archive kind, tarfile compression).
+ARCHIVE_FORMATS = {
+    ".zip": ("zip", None),
+    ".tar": ("tar", ""),
+    ".tar.gz": ("tar", "gz"),
+    ".tgz": ("tar", "gz"),
+    ".tar.bz2": ("tar", "bz2"),
+    ".tar.xz": ("tar", "xz"),
+    ".tar.zst": ("tar", "zst"),
+    ".tzst": ("tar", "zst"),
+}
+
+ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+def _import_zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError(
+            "Zstandard archives need the zstandard package (pip install zstandard)"
+        ) from None
+    return zstandard
+
+
+def archive_format(name):
+    name = str(name).lower()
+    for suffix in sorted(ARCHIVE_FORMATS, key=len, reverse=True):
+        if name.endswith(suffix):
+            return suffix
+    raise ValueError(f"Unknown archive format: {name}")
+
+
+class ArchiveStorage():
+    # A zip or tar archive, read whole on open or written as a stream (tar
+    # output works on pipes, e.g. sys.stdout.buffer). When reading, a single
+    # top-level directory, as in `git archive --prefix` or a GitHub branch
+    # tarball, is stripped.
+    def __init__(self, target, mode="r", format=None):
+        import tarfile
+        import zipfile
+
+        if mode not in ("r", "w"):
+            raise ValueError(f"Unsupported mode: {mode}")
+        self.target = target
+        self.mode = mode
+        if mode == "r":
+            self.files = self._read_all(target)
+            return
+        if format is None and isinstance(target, (str, os.PathLike)):
+            format = archive_format(target)
+        if format is None:
+            raise ValueError("An archive format is needed to write to a file object")
+        kind, compression = ARCHIVE_FORMATS[format]
+        self.mtime = int(os.environ.get("SOURCE_DATE_EPOCH", time.time()))
+        self._zip = None
+        self._tar = None
+        self._file = None
+        self._zstd = None
+        if kind == "zip":
+            self._zip = zipfile.ZipFile(target, "w", zipfile.ZIP_DEFLATED)
+        elif compression == "zst":
+            # tarfile has no zstd support before Python 3.14, so the tar
+            # stream goes through a zstandard writer.
+            zstandard = _import_zstandard()
+            if isinstance(target, (str, os.PathLike)):
+                target = self._file = open(target, "wb")
+            self._zstd = zstandard.ZstdCompressor(level=10, threads=-1).stream_writer(
+                target, closefd=False
+            )
+            self._tar = tarfile.open(fileobj=self._zstd, mode="w|")
+        else:
+            stream_mode = f"w|{compression}"
+            if isinstance(target, (str, os.PathLike)):
+                self._tar = tarfile.open(os.fspath(target), stream_mode)
+            else:
+                self._tar = tarfile.open(fileobj=target, mode=stream_mode)
+        self.written = []
+
+    def _read_all(self, target):
+        import tarfile
+        import zipfile
+
+        files = {}
+        is_path = isinstance(target, (str, os.PathLike))
+        if zipfile.is_zipfile(target):
+            with zipfile.ZipFile(target) as archive:
+                for info in archive.infolist():
+                    if not info.is_dir():
+                        files[safe_relative_path(info.filename)] = archive.read(info)
+        else:
+            f = open(target, "rb") if is_path else target
+            try:
+                f.seek(0)
+                if f.read(4) == ZSTD_MAGIC:
+                    zstandard = _import_zstandard()
+                    f.seek(0)
+                    opener = {
+                        "fileobj": zstandard.ZstdDecompressor().stream_reader(f, closefd=False),
+                        "mode": "r|",
+                    }
+                else:
+                    f.seek(0)
+                    opener = {"fileobj": f, "mode": "r:*"}
+                with tarfile.open(**opener) as archive:
+                    for member in archive:
+                        if member.isfile():
+                            files[safe_relative_path(member.name)] = archive.extractfile(member).read()
+            finally:
+                if is_path:
+                    f.close()
+
+        names = [PurePosixPath(name) for name in files]
+        tops = {name.parts[0] for name in names}
+        if len(tops) == 1 and all(len(name.parts) > 1 for name in names):
+            files = {PurePosixPath(*PurePosixPath(name).parts[1:]).as_posix(): data
+                     for name, data in files.items()}
+        return files
+
+    def list(self, prefix=""):
+        if self.mode != "r":
+            return sorted(path for path in self.written if _under(prefix, path))
+        return sorted(path for path in self.files if _under(prefix, path))
+
+    def read(self, path):
+        if self.mode != "r":
+            raise io.UnsupportedOperation("archive opened for writing")
+        try:
+            return self.files[path]
+        except KeyError:
+            raise FileNotFoundError(path) from None
+
+    def write(self, path, data):
+        import tarfile
+        import zipfile
+
+        if self.mode != "w":
+            raise io.UnsupportedOperation("archive opened for reading")
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        if self._zip is not None:
+            # Zip timestamps start in 1980.
+            info = zipfile.ZipInfo(path, time.gmtime(max(self.mtime, 315532800))[:6])
+            info.compress_type = zipfile.ZIP_DEFLATED
+            info.external_attr = 0o644 << 16
+            self._zip.writestr(info, data)
+        else:
+            info = tarfile.TarInfo(path)
+            info.size = len(data)
+            info.mtime = self.mtime
+            info.mode = 0o644
+            self._tar.addfile(info, io.BytesIO(data))
+        self.written.append(path)
+        return True
+
+    def close(self):
+        if self.mode == "w":
+            if self._zip is not None:
+                self._zip.close()
+            else:
+                self._tar.close()
+            if self._zstd is not None:
+                self._zstd.close()
+            if self._file is not None:
+                self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def __repr__(self):
+        return f"ArchiveStorage({self.target!r}, {self.mode!r})"
+
+
+def open_storage(location, mode="r"):
+    # A directory, or an archive picked by its suffix.
+    location = Path(location)
+    if mode == "r" and location.is_dir():
+        return DirectoryStorage(location)
+    try:
+        archive_format(location)
+    except ValueError:
+        if mode == "w":
+            return DirectoryStorage(location)
+        raise
+    return ArchiveStorage(location, mode)
@@ -0,0 +1,66 @@
+from pathlib import Path
+import os
+import re
+
+
+PLACEHOLDER_RE = re.compile(r"\{\{ (Title|Content) \}\}")
+
+
+def rewrite_basepath(html, basepath):
+    if basepath == "/":
+        return html
+    return (
+        html
+            .replace('href="/', 'href="' + basepath)
+            .replace('src="/', 'src="' + basepath)
+        )
+
+
+class Template():
+    def __init__(self, text, basepath="/"):
+        self.parts = []
+        self.slots = []
+        position = 0
+        for match in PLACEHOLDER_RE.finditer(text):
+            self.parts.append(rewrite_basepath(text[position:match.start()], basepath))
+            self.slots.append(match.group(1).lower())
+            position = match.end()
+        self.parts.append(rewrite_basepath(text[position:], basepath))
+
+    def render(self, **values):
+        pieces = [self.parts[0]]
+        for slot, part in zip(self.slots, self.parts[1:]):
+            pieces.append(values[slot])
+            pieces.append(part)
+        return "".join(pieces)
+
+    def write(self, fp, **values):
+        fp.write(self.parts[0])
+        for slot, part in zip(self.slots, self.parts[1:]):
+            value = values[slot]
+            if isinstance(value, str):
+                fp.write(value)
+            else:
+                value.write_html(fp)
+            fp.write(part)
+
+    def __repr__(self):
+        return f"Template(parts={self.parts!r}, slots={self.slots!r})"
+
+
+_template_cache = {}
+
+
+def load_template(template_path, basepath="/", hooks=None):
+    abs_template = Path(template_path).resolve()
+    stat = os.stat(abs_template)
+    key = (abs_template, stat.st_mtime_ns, stat.st_size, basepath)
+    template = _template_cache.get(key)
+    if hooks is not None:
+        hooks.count("template_cache_hits" if template is not None else "template_cache_misses")
+    if template is None:
+        with open(abs_template, "r") as f:
+            template = Template(f.read(), basepath)
+        _template_cache.clear()
+        _template_cache[key] = template
+    return template
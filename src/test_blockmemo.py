@@ -0,0 +1,51 @@
+import unittest
+from markdown_blocks import BlockMemo, markdown_to_html_node
+
+
+DOC = """# Heading
+
+A paragraph with a [link](/blog/tom) and **bold**.
+
+- one
+- two
+
+```
+code here
+```
+
+> Shared admonition block"""
+
+
+class TestBlockMemo(unittest.TestCase):
+    def test_memoized_output_matches_unmemoized(self):
+        memo = BlockMemo()
+        for basepath in ("/", "/site/"):
+            expected = markdown_to_html_node(DOC, basepath).to_html()
+            self.assertEqual(markdown_to_html_node(DOC, basepath, memo).to_html(), expected)
+            self.assertEqual(markdown_to_html_node(DOC, basepath, memo).to_html(), expected)
+
+    def test_counts_hits_and_misses(self):
+        memo = BlockMemo()
+        markdown_to_html_node(DOC, "/", memo)
+        self.assertEqual((memo.hits, memo.misses), (0, 5))
+        edited = DOC.replace("A paragraph", "An edited paragraph")
+        markdown_to_html_node(edited, "/", memo)
+        self.assertEqual((memo.hits, memo.misses), (4, 6))
+
+    def test_basepath_is_part_of_the_key(self):
+        memo = BlockMemo()
+        markdown_to_html_node(DOC, "/", memo)
+        html = markdown_to_html_node(DOC, "/site/", memo).to_html()
+        self.assertIn('href="/site/blog/tom"', html)
+        self.assertEqual(memo.hits, 0)
+
+    def test_evicts_least_recently_used(self):
+        memo = BlockMemo(maxsize=2)
+        markdown_to_html_node("a\n\nb", "/", memo)
+        markdown_to_html_node("a", "/", memo)
+        markdown_to_html_node("c", "/", memo)
+        self.assertEqual([block for block, _ in memo.entries], ["a", "c"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,174 @@
+import unittest
+import importlib.util
+import io
+import os
+import tarfile
+import tempfile
+import zipfile
+from pathlib import Path
+from builder import Builder, Site
+from buildstats import StatsRecorder
+from gencontent import PageBuildError
+from manifest import load_manifest, record_outputs
+from storage import ArchiveStorage, DirectoryStorage, MemoryStorage, archive_format
+
+
+TEMPLATE = "<title>{{ Title }}</title><main>{{ Content }}</main>"
+
+SOURCES = {
+    "template.html": TEMPLATE,
+    "content/index.md": "# Home\n\n![pic](/images/a.png)",
+    "content/blog/post.md": "# Post\n\n[home](/)",
+    "static/index.css": "body {}",
+    "static/images/a.png": b"\x89PNG",
+}
+
+
+class TestBuilder(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def build_in_memory(self, source, basepath="/"):
+        output = MemoryStorage()
+        Builder(Site(source, basepath), output).build()
+        return output.files
+
+    def test_memory_build(self):
+        files = self.build_in_memory(MemoryStorage(SOURCES), "/site/")
+        self.assertEqual(
+            sorted(files), ["blog/post.html", "images/a.png", "index.css", "index.html"]
+        )
+        self.assertIn(b"<title>Post</title>", files["blog/post.html"])
+        self.assertIn(b'href="/site/"', files["blog/post.html"])
+        self.assertEqual(files["images/a.png"], b"\x89PNG")
+
+    def test_directory_build_matches_memory_build(self):
+        source = DirectoryStorage(self.root / "src")
+        for path, data in SOURCES.items():
+            source.write(path, data.encode("utf-8") if isinstance(data, str) else data)
+        stale = self.root / "out" / "old.html"
+        stale.parent.mkdir()
+        stale.write_text("gone")
+        (self.root / "out" / "notes.txt").write_text("not the build's")
+
+        # Only files an earlier build recorded are pruned.
+        manifest = self.root / "manifest.json"
+        record_outputs(manifest, ["old.html"])
+        Builder(Site(source), self.root / "out", manifest=manifest).build()
+        out = DirectoryStorage(self.root / "out")
+        on_disk = {path: out.read(path) for path in out.list() if path != "notes.txt"}
+        self.assertEqual(on_disk, self.build_in_memory(MemoryStorage(SOURCES)))
+        self.assertTrue((self.root / "out" / "notes.txt").exists())
+        self.assertEqual(
+            load_manifest(manifest)["outputs"],
+            ["blog/post.html", "images/a.png", "index.css", "index.html"],
+        )
+
+    def test_stats_count_each_page_once(self):
+        source = DirectoryStorage(self.root / "src")
+        for path, data in SOURCES.items():
+            source.write(path, data.encode("utf-8") if isinstance(data, str) else data)
+        stats = StatsRecorder()
+        Builder(
+            Site(source), self.root / "out", manifest=self.root / "manifest.json", hooks=stats
+        ).build()
+        self.assertEqual(stats.counters["pages"], 2)
+        self.assertEqual(stats.counters["pages_planned"], 2)
+
+    def test_output_must_not_overlap_the_sources(self):
+        for path, data in SOURCES.items():
+            (self.root / path).parent.mkdir(parents=True, exist_ok=True)
+            (self.root / path).write_bytes(data.encode("utf-8") if isinstance(data, str) else data)
+        for output in ("content", "static/css", ".", "..", "content/..", self.root.parent):
+            with self.assertRaises(ValueError):
+                Builder(Site(self.root), self.root / output).build()
+        self.assertTrue((self.root / "content" / "index.md").exists())
+
+    def test_archive_sources_strip_top_level_directory(self):
+        expected = self.build_in_memory(MemoryStorage(SOURCES))
+        zip_path = self.root / "site.zip"
+        with zipfile.ZipFile(zip_path, "w") as archive:
+            for path, data in SOURCES.items():
+                archive.writestr(f"site-main/{path}", data)
+        self.assertEqual(self.build_in_memory(ArchiveStorage(zip_path)), expected)
+
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+            for path, data in SOURCES.items():
+                data = data.encode("utf-8") if isinstance(data, str) else data
+                info = tarfile.TarInfo(f"site-main/{path}")
+                info.size = len(data)
+                archive.addfile(info, io.BytesIO(data))
+        self.assertEqual(self.build_in_memory(ArchiveStorage(buffer)), expected)
+
+    def test_archive_output(self):
+        buffer = io.BytesIO()
+        os.environ["SOURCE_DATE_EPOCH"] = "1700000000"
+        try:
+            with ArchiveStorage(buffer, "w", ".tar.gz") as output:
+                Builder(Site(MemoryStorage(SOURCES)), output).build()
+        finally:
+            del os.environ["SOURCE_DATE_EPOCH"]
+        buffer.seek(0)
+        with tarfile.open(fileobj=buffer, mode="r:gz") as archive:
+            members = {member.name: member for member in archive.getmembers()}
+            self.assertEqual(
+                sorted(members), ["blog/post.html", "images/a.png", "index.css", "index.html"]
+            )
+            self.assertEqual(members["index.css"].mtime, 1700000000)
+            self.assertEqual(archive.extractfile("index.css").read(), b"body {}")
+        self.assertEqual(archive_format("site.TGZ"), ".tgz")
+        with self.assertRaises(ValueError):
+            archive_format("site.rar")
+
+    @unittest.skipIf(importlib.util.find_spec("zstandard") is None, "zstandard is not installed")
+    def test_zstandard_archive_round_trip(self):
+        path = self.root / "site.tar.zst"
+        with ArchiveStorage(path, "w") as output:
+            Builder(Site(MemoryStorage(SOURCES)), output).build()
+        self.assertEqual(ArchiveStorage(path).files, self.build_in_memory(MemoryStorage(SOURCES)))
+
+    def test_unsafe_member_names_are_rejected(self):
+        for name in ("static/../../escaped.txt", "/tmp/escaped.txt", "site/./../escaped.txt"):
+            zip_path = self.root / "site.zip"
+            with zipfile.ZipFile(zip_path, "w") as archive:
+                archive.writestr("template.html", TEMPLATE)
+                archive.writestr(name, "pwned")
+            with self.assertRaises(ValueError):
+                ArchiveStorage(zip_path)
+
+            buffer = io.BytesIO()
+            with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+                info = tarfile.TarInfo(name)
+                info.size = 5
+                archive.addfile(info, io.BytesIO(b"pwned"))
+            with self.assertRaises(ValueError):
+                ArchiveStorage(buffer)
+
+        out = DirectoryStorage(self.root / "out")
+        for path in ("../escaped.txt", "a/../../escaped.txt", "/tmp/escaped.txt"):
+            with self.assertRaises(ValueError):
+                out.write(path, b"pwned")
+        (self.root / "out").mkdir(exist_ok=True)
+        (self.root / "out" / "link").symlink_to(self.root)
+        with self.assertRaises(ValueError):
+            out.write("link/escaped.txt", b"pwned")
+        self.assertFalse((self.root / "escaped.txt").exists())
+        self.assertTrue(out.write("a/./b.txt", b"ok"))
+
+    def test_bad_page_is_reported(self):
+        sources = dict(SOURCES)
+        sources["content/broken.md"] = "no title here"
+        output = MemoryStorage()
+        with self.assertRaises(PageBuildError) as cm:
+            Builder(Site(MemoryStorage(sources)), output).build()
+        self.assertEqual([source for _, source, _ in cm.exception.errors], ["content/broken.md"])
+        self.assertIn("index.html", output.files)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import unittest
+import json
+import tempfile
+from pathlib import Path
+from buildstats import StatsRecorder, count_nodes
+from gencontent import generate_pages_recursive
+from htmlnode import LeafNode, ParentNode
+
+
+class TestStatsRecorder(unittest.TestCase):
+    def test_page_stages_and_counters(self):
+        stats = StatsRecorder()
+        stats.page_start("a.md")
+        stats.page_stage("read", bytes_read=10)
+        stats.page_stage("parse", nodes=3)
+        stats.page_end("a.md")
+        self.assertEqual(stats.counters, {"bytes_read": 10, "nodes": 3, "pages": 1})
+        self.assertEqual(list(stats.pages[0]["stages"]), ["read", "parse"])
+        self.assertIn("a.md", stats.summary())
+
+    def test_merge_combines_exports(self):
+        first = StatsRecorder()
+        first.count("hits", 2)
+        second = StatsRecorder()
+        second.count("hits")
+        second.stage_start("copy")
+        second.stage_end("copy", files=4)
+        first.merge(second.export())
+        self.assertEqual(first.counters, {"hits": 3, "files": 4})
+        self.assertEqual([event["name"] for event in first.events], ["copy"])
+
+    def test_write_trace(self):
+        stats = StatsRecorder()
+        stats.stage_start("render")
+        stats.stage_end("render")
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "trace.json"
+            stats.write_trace(path)
+            events = json.loads(path.read_text())["traceEvents"]
+        self.assertEqual(events[0]["ph"], "X")
+        self.assertEqual(events[0]["name"], "render")
+
+    def test_count_nodes(self):
+        tree = ParentNode("div", [ParentNode("p", [LeafNode(None, "a"), LeafNode("b", "c")])])
+        self.assertEqual(count_nodes(tree), 4)
+
+    def test_generate_pages_records_every_page(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            root = Path(tmp)
+            (root / "content").mkdir()
+            (root / "template.html").write_text("{{ Title }}{{ Content }}")
+            for i in range(3):
+                (root / "content" / f"p{i}.md").write_text(f"# P{i}\n\ntext")
+            stats = StatsRecorder()
+            generate_pages_recursive(root / "content", root / "template.html", root / "docs", "/", hooks=stats)
+        self.assertEqual(stats.counters["pages"], 3)
+        self.assertEqual(len(stats.pages), 3)
+        self.assertGreater(stats.counters["bytes_written"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
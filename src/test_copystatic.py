@@ -0,0 +1,146 @@
+import unittest
+import errno
+import os
+import tempfile
+from contextlib import redirect_stdout
+from io import StringIO
+from pathlib import Path
+from unittest import mock
+from copystatic import FilePlacer, StaticCopyError, prune_public_dir, sync_static
+
+
+class TestSyncStatic(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.static = self.root / "static"
+        (self.static / "images").mkdir(parents=True)
+        (self.static / "index.css").write_text("body {}")
+        (self.static / "images" / "a.png").write_bytes(b"\x89PNG" * 100)
+        self.docs = self.root / "docs"
+        self.manifest = self.root / "manifest.json"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def sync(self, **kwargs):
+        with redirect_stdout(StringIO()):
+            return sync_static(self.static, self.docs, self.manifest, **kwargs)
+
+    def test_first_sync_copies_everything(self):
+        counts = self.sync()
+        self.assertEqual(counts["copied"], 2)
+        self.assertEqual(counts["bytes_copied"], 407)
+        self.assertEqual((self.docs / "images" / "a.png").read_bytes(), b"\x89PNG" * 100)
+
+    def test_copies_preserve_mtime(self):
+        self.sync()
+        self.assertEqual(
+            os.stat(self.docs / "index.css").st_mtime_ns,
+            os.stat(self.static / "index.css").st_mtime_ns,
+        )
+
+    def test_second_sync_skips_unchanged(self):
+        self.sync()
+        counts = self.sync()
+        self.assertEqual((counts["copied"], counts["unchanged"], counts["removed"]), (0, 2, 0))
+
+    def test_changed_file_is_recopied(self):
+        self.sync()
+        (self.static / "index.css").write_text("body { color: red }")
+        self.assertEqual(self.sync()["copied"], 1)
+        self.assertEqual((self.docs / "index.css").read_text(), "body { color: red }")
+
+    def test_hash_compare_ignores_touch(self):
+        self.sync()
+        os.utime(self.static / "index.css", ns=(0, 0))
+        self.assertEqual(self.sync(compare="hash")["copied"], 0)
+
+    def test_removed_source_is_deleted(self):
+        self.sync()
+        (self.static / "images" / "a.png").unlink()
+        self.assertEqual(self.sync()["removed"], 1)
+        self.assertFalse((self.docs / "images").exists())
+
+    def test_unrelated_output_files_are_kept(self):
+        self.sync()
+        (self.docs / "index.html").write_text("<html>")
+        self.sync()
+        self.assertTrue((self.docs / "index.html").exists())
+
+    def test_hardlink(self):
+        self.sync(hardlink=True)
+        self.assertTrue(os.path.samefile(self.docs / "index.css", self.static / "index.css"))
+
+    def test_serial_and_threaded_sync_match(self):
+        for i in range(20):
+            (self.static / "images" / f"b{i}.png").write_bytes(bytes([i]) * (i + 1))
+        outputs = []
+        for jobs in (1, 8):
+            docs = self.root / f"docs{jobs}"
+            with redirect_stdout(StringIO()):
+                sync_static(self.static, docs, self.root / f"manifest{jobs}.json", jobs=jobs)
+            outputs.append({
+                path.relative_to(docs): path.read_bytes() for path in docs.rglob("*") if path.is_file()
+            })
+        self.assertEqual(len(outputs[0]), 22)
+        self.assertEqual(outputs[0], outputs[1])
+
+    def test_copy_failure_raises_after_all_files(self):
+        original_place = FilePlacer.place
+
+        def flaky_place(placer, src, dst, src_stat):
+            if src.name == "a.png":
+                raise OSError(errno.EIO, "disk on fire")
+            return original_place(placer, src, dst, src_stat)
+
+        with mock.patch.object(FilePlacer, "place", flaky_place):
+            with self.assertRaises(StaticCopyError) as cm:
+                self.sync()
+        self.assertEqual([rel for rel, _ in cm.exception.errors], ["images/a.png"])
+        self.assertTrue((self.docs / "index.css").exists())
+        self.assertFalse(self.manifest.exists())
+
+    def test_prune_removes_only_unplanned_outputs(self):
+        self.sync()
+        (self.docs / "old").mkdir()
+        (self.docs / "old" / "page.html").write_text("stale")
+        (self.docs / "notes.txt").write_text("not ours")
+        keep = [self.docs / "index.css", self.docs / "images" / "a.png"]
+        previous = keep + [self.docs / "old" / "page.html"]
+        with redirect_stdout(StringIO()):
+            self.assertEqual(prune_public_dir(self.docs, keep, previous), 1)
+        self.assertFalse((self.docs / "old").exists())
+        self.assertTrue((self.docs / "images" / "a.png").exists())
+        self.assertTrue((self.docs / "notes.txt").exists())
+
+    def test_unsupported_strategy_falls_back(self):
+        def unsupported(src, dst):
+            raise OSError(errno.EOPNOTSUPP, "not supported")
+
+        placer = FilePlacer()
+        placer.strategies.insert(0, ("broken", unsupported))
+        src = self.static / "index.css"
+        dst = self.root / "copy.css"
+        out = StringIO()
+        with redirect_stdout(out):
+            placer.place(src, dst, os.stat(src))
+            placer.place(src, dst, os.stat(src))
+        self.assertEqual(dst.read_text(), "body {}")
+        self.assertNotIn("broken", [name for name, _ in placer.strategies])
+        self.assertEqual(out.getvalue().count("broken not available"), 1)
+
+    def test_permission_error_is_not_mistaken_for_unsupported(self):
+        def denied(src, dst):
+            raise PermissionError(errno.EPERM, "Operation not permitted")
+
+        placer = FilePlacer()
+        placer.strategies = [("hardlink", denied), ("copy", denied)]
+        src = self.static / "index.css"
+        with self.assertRaises(PermissionError):
+            placer.place(src, self.root / "copy.css", os.stat(src))
+        self.assertEqual([name for name, _ in placer.strategies], ["hardlink", "copy"])
+
+
+if __name__ == "__main__":
+    unittest.main()
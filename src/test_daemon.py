@@ -0,0 +1,99 @@
+import unittest
+import contextlib
+import io
+import socket
+import tempfile
+import threading
+from pathlib import Path
+from builder import Builder, Site
+from daemon import BuildDaemon, bind, serve
+from sitectl import main as sitectl_main, request
+
+
+class TestDaemon(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        (self.root / "content").mkdir()
+        (self.root / "static").mkdir()
+        (self.root / "template.html").write_text("<title>{{ Title }}</title>{{ Content }}")
+        self.page = self.root / "content" / "index.md"
+        self.page.write_text("# Home")
+        self.socket = self.root / "daemon.sock"
+
+        builder = Builder(
+            Site(self.root), self.root / "docs", incremental=True,
+            manifest=self.root / "manifest.json",
+        )
+        self.daemon = BuildDaemon(builder)
+        server = bind(self.socket, self.daemon)
+        self.thread = threading.Thread(target=serve, args=(server,))
+        self.thread.start()
+
+    def tearDown(self):
+        if self.thread.is_alive():
+            request({"command": "stop"}, self.socket, timeout=5)
+            self.thread.join()
+        self.tmp.cleanup()
+
+    def test_requests(self):
+        self.assertTrue(request({"command": "build"}, self.socket, timeout=5)["ok"])
+        output = self.root / "docs" / "index.html"
+        self.assertIn("<title>Home</title>", output.read_text())
+
+        self.page.write_text("# Changed")
+        response = request({"command": "rebuild", "paths": [str(self.page)]}, self.socket, timeout=5)
+        self.assertEqual((response["ok"], response["pages"]), (True, 1))
+        self.assertIn("<title>Changed</title>", output.read_text())
+
+        self.page.write_text("no title")
+        response = request({"command": "rebuild", "paths": [str(self.page)]}, self.socket, timeout=5)
+        self.assertFalse(response["ok"])
+        self.assertIn("ValueError", response["error"])
+
+        response = request({"command": "unknown"}, self.socket, timeout=5)
+        self.assertFalse(response["ok"])
+        self.assertEqual(request({"command": "ping"}, self.socket, timeout=5)["builds"], 2)
+
+    def test_unexpected_errors_are_answered(self):
+        def fail():
+            raise KeyError("boom")
+
+        self.daemon.builder.build = fail
+        response = request({"command": "build"}, self.socket, timeout=5)
+        self.assertEqual((response["ok"], response["error"]), (False, "KeyError: 'boom'"))
+        self.assertTrue(request({"command": "ping"}, self.socket, timeout=5)["ok"])
+
+    def test_client_reports_a_dropped_connection(self):
+        path = self.root / "closing.sock"
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        listener.bind(str(path))
+        listener.listen()
+
+        def drop():
+            conn, _ = listener.accept()
+            conn.recv(1024)
+            conn.sendall(b'{"ok": tr')
+            conn.close()
+
+        thread = threading.Thread(target=drop)
+        thread.start()
+        stderr = io.StringIO()
+        with contextlib.redirect_stderr(stderr):
+            status = sitectl_main(["ping", "--socket", str(path), "--timeout", "5"])
+        thread.join()
+        listener.close()
+        self.assertEqual(status, 1)
+        self.assertIn("closed the connection", stderr.getvalue())
+
+    def test_stop_removes_socket(self):
+        with self.assertRaises(RuntimeError):
+            bind(self.socket, self.daemon)
+        self.assertTrue(request({"command": "stop"}, self.socket, timeout=5)["ok"])
+        self.thread.join(5)
+        self.assertFalse(self.thread.is_alive())
+        self.assertFalse(self.socket.exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+import tempfile
+from pathlib import Path
+from gencontent import PageBuildError, extract_title, find_pages, generate_pages_recursive
+
+
+TEMPLATE = "<title>{{ Title }}</title><body>{{ Content }}</body>"
+
+
+class TestGeneratePages(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.content = self.root / "content"
+        self.template = self.root / "template.html"
+        self.template.write_text(TEMPLATE)
+        for i in range(12):
+            page_dir = self.content / f"section{i % 3}"
+            page_dir.mkdir(parents=True, exist_ok=True)
+            (page_dir / f"page{i}.md").write_text(
+                f"# Page {i}\n\nSome **bold** text and a [link](/section{i % 3}/page{i})\n\n- one\n- two"
+            )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def read_outputs(self, dest):
+        return {
+            path.relative_to(dest).as_posix(): path.read_bytes()
+            for path in sorted(dest.rglob("*.html"))
+        }
+
+    def test_extract_title(self):
+        self.assertEqual(extract_title("intro\n# Hello there \n## sub"), "Hello there")
+
+    def test_extract_title_missing(self):
+        with self.assertRaises(ValueError):
+            extract_title("## Only a subheading")
+
+    def test_find_pages_maps_md_to_html(self):
+        pages = find_pages(self.content, self.root / "docs")
+        self.assertEqual(len(pages), 12)
+        for source, destination in pages:
+            self.assertEqual(destination.suffix, ".html")
+            self.assertEqual(source.stem, destination.stem)
+
+    def test_parallel_output_matches_serial(self):
+        serial = self.root / "serial"
+        parallel = self.root / "parallel"
+        generate_pages_recursive(self.content, self.template, serial, "/base/")
+        generate_pages_recursive(self.content, self.template, parallel, "/base/", jobs=3)
+        self.assertEqual(self.read_outputs(serial), self.read_outputs(parallel))
+
+    def test_parallel_errors_reported_per_page_in_order(self):
+        (self.content / "section2" / "broken.md").write_text("no title here")
+        (self.content / "section0" / "broken.md").write_text("no title either")
+        with self.assertRaises(PageBuildError) as cm:
+            generate_pages_recursive(self.content, self.template, self.root / "docs", "/", jobs=3)
+
+        pages = [str(source) for source, _ in find_pages(self.content, self.root / "docs")]
+        failed = [source for _, source, _ in cm.exception.errors]
+        self.assertEqual(failed, [source for source in pages if source.endswith("broken.md")])
+        self.assertIn("ValueError: No title found", str(cm.exception))
+
+    def test_streamed_output_matches_whole_file_rendering(self):
+        (self.content / "section1" / "code.md").write_text(
+            "Intro\n\n# Code\n\n```\na\n\nb\n```\n\n> quote\n\n1. x\n2. ![i](/i.png)\n"
+        )
+        whole = self.root / "whole"
+        streamed = self.root / "streamed"
+        generate_pages_recursive(self.content, self.template, whole, "/base/")
+        generate_pages_recursive(self.content, self.template, streamed, "/base/", stream=True)
+        self.assertEqual(self.read_outputs(whole), self.read_outputs(streamed))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,4 +1,5 @@
 import unittest
+import io
 from htmlnode import HTMLNode, LeafNode, ParentNode
 
 class TestHtmlNode(unittest.TestCase):
@@ -97,4 +98,33 @@ class TestHtmlNode(unittest.TestCase):
             parent_node.to_html()
         self.assertEqual(str(cm.exception), "children must have a value")
 
+    def test_iter_html_matches_to_html(self):
+        tree = ParentNode("div", [
+            ParentNode("p", [LeafNode(None, "a "), LeafNode("b", "bold")]),
+            ParentNode("ul", [ParentNode("li", [LeafNode("a", "x", {"href": "/x"})])]),
+            ParentNode("pre", [LeafNode("code", "print()\n")]),
+        ])
+        chunks = list(tree.iter_html())
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual("".join(chunks), tree.to_html())
+
+    def test_iter_html_deep_tree(self):
+        tree = LeafNode("b", "leaf")
+        for _ in range(5000):
+            tree = ParentNode("span", [tree])
+        self.assertEqual("".join(tree.iter_html()), "<span>" * 5000 + "<b>leaf</b>" + "</span>" * 5000)
+
+    def test_write_html(self):
+        buffer = io.StringIO()
+        ParentNode("div", [LeafNode("i", "x")]).write_html(buffer)
+        self.assertEqual(buffer.getvalue(), "<div><i>x</i></div>")
+
+    def test_iter_html_child_no_child(self):
+        parent_node = ParentNode("div", [ParentNode("span", None)])
+        with self.assertRaises(ValueError) as cm:
+            list(parent_node.iter_html())
+        self.assertEqual(str(cm.exception), "children must have a value")
+
 
+if __name__ == "__main__":
+    unittest.main()
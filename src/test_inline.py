@@ -0,0 +1,78 @@
+import unittest
+import random
+from inline import scan_inline
+from markdown_blocks import text_to_textnode
+from textnode import TextNode, TextType
+
+
+FRAGMENTS = [
+    "plain words ", "`", "**", "_", "*", "!", "[", "]", "(", ")",
+    "![alt](/images/a.png)", "[link](https://boot.dev)", "[](/empty)",
+    "![](x)", "!![x](y)", "[a](b", "snake_case", "`code`", "**bold**",
+    "_it_", " ", "\n", "# ", "x",
+]
+
+
+def reference(text):
+    try:
+        return text_to_textnode(text)
+    except ValueError as e:
+        return ("error", str(e))
+
+
+def scanned(text):
+    try:
+        return scan_inline(text)
+    except ValueError as e:
+        return ("error", str(e))
+
+
+class TestScanInline(unittest.TestCase):
+    def assertMatchesReference(self, text):
+        self.assertEqual(scanned(text), reference(text), msg=repr(text))
+
+    def test_mixed_inline(self):
+        text = (
+            "This is **text** with an _italic_ word and a `code block` and an "
+            "![obi wan image](https://i.imgur.com/fJRm4Vk.jpeg) and a [link](https://boot.dev)"
+        )
+        self.assertEqual(
+            scan_inline(text),
+            [
+                TextNode("This is ", TextType.TEXT),
+                TextNode("text", TextType.BOLD),
+                TextNode(" with an ", TextType.TEXT),
+                TextNode("italic", TextType.ITALIC),
+                TextNode(" word and a ", TextType.TEXT),
+                TextNode("code block", TextType.CODE),
+                TextNode(" and an ", TextType.TEXT),
+                TextNode("obi wan image", TextType.IMAGE, "https://i.imgur.com/fJRm4Vk.jpeg"),
+                TextNode(" and a ", TextType.TEXT),
+                TextNode("link", TextType.LINK, "https://boot.dev"),
+            ],
+        )
+
+    def test_empty_text(self):
+        self.assertEqual(scan_inline(""), [])
+
+    def test_unmatched_delimiter_raises(self):
+        with self.assertRaises(ValueError):
+            scan_inline("a **bold without end")
+
+    def test_edge_cases_match_reference(self):
+        for text in [
+            "", "`", "``", "****", "***a**", "a_b_c", "![a](b)[c](d)", "!![a](b)",
+            "[a](b) ![a](b) [a](b)", "`[a](b)` [a](b)", "**[a](b)**", "_![a](b)_",
+            "[a](x![b](c)", "text ending with link [x](y)", "![x](y) leading image",
+        ]:
+            self.assertMatchesReference(text)
+
+    def test_random_inputs_match_reference(self):
+        rng = random.Random(1234)
+        for _ in range(3000):
+            text = "".join(rng.choice(FRAGMENTS) for _ in range(rng.randint(0, 12)))
+            self.assertMatchesReference(text)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+import unittest
+import tempfile
+import os
+from pathlib import Path
+from contextlib import redirect_stdout
+from io import StringIO
+from gencontent import generate_pages_incremental, referenced_assets
+from manifest import file_fingerprint, load_manifest, empty_manifest
+
+
+TEMPLATE = "<title>{{ Title }}</title><body>{{ Content }}</body>"
+
+
+class TestIncrementalBuild(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.content = self.root / "content"
+        self.content.mkdir()
+        self.dest = self.root / "docs"
+        self.template = self.root / "template.html"
+        self.template.write_text(TEMPLATE)
+        self.manifest = self.root / "manifest.json"
+        (self.content / "index.md").write_text("# Home\n\nWelcome")
+        (self.content / "blog").mkdir()
+        (self.content / "blog" / "post.md").write_text("# Post\n\nHello")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def build(self, basepath="/"):
+        generate_pages_incremental(self.content, self.template, self.dest, basepath, self.manifest)
+        return load_manifest(self.manifest)
+
+    def explain(self):
+        out = StringIO()
+        with redirect_stdout(out):
+            generate_pages_incremental(
+                self.content, self.template, self.dest, "/", self.manifest,
+                static_dir=self.root / "static", explain=True,
+            )
+        return [line for line in out.getvalue().splitlines() if line.startswith("- Rendering")]
+
+    def test_first_build_renders_everything(self):
+        manifest = self.build()
+        self.assertEqual(sorted(manifest["pages"]), ["blog/post.html", "index.html"])
+        self.assertTrue((self.dest / "blog" / "post.html").exists())
+
+    def test_unchanged_pages_are_not_rewritten(self):
+        self.build()
+        output = self.dest / "index.html"
+        os.utime(output, ns=(0, 0))
+        self.build()
+        self.assertEqual(output.stat().st_mtime_ns, 0)
+
+    def test_changed_markdown_is_rerendered(self):
+        self.build()
+        (self.content / "index.md").write_text("# Home\n\nChanged")
+        self.build()
+        self.assertIn("Changed", (self.dest / "index.html").read_text())
+
+    def test_template_change_rerenders_all(self):
+        self.build()
+        self.template.write_text("<h1>{{ Title }}</h1>{{ Content }}")
+        self.build()
+        self.assertTrue((self.dest / "blog" / "post.html").read_text().startswith("<h1>Post</h1>"))
+
+    def test_basepath_change_rerenders(self):
+        (self.content / "index.md").write_text("# Home\n\n[post](/blog/post)")
+        self.build()
+        self.build("/site/")
+        self.assertIn('href="/site/blog/post"', (self.dest / "index.html").read_text())
+
+    def test_removed_source_deletes_output(self):
+        self.build()
+        (self.content / "blog" / "post.md").unlink()
+        manifest = self.build()
+        self.assertFalse((self.dest / "blog" / "post.html").exists())
+        self.assertEqual(list(manifest["pages"]), ["index.html"])
+
+    def test_image_change_rerenders_only_pages_embedding_it(self):
+        (self.root / "static" / "images").mkdir(parents=True)
+        (self.root / "static" / "images" / "a.png").write_bytes(b"a")
+        (self.content / "blog" / "post.md").write_text("# Post\n\n![a](/images/a.png)")
+        self.assertEqual(len(self.explain()), 2)
+        self.assertEqual(self.explain(), [])
+
+        (self.root / "static" / "images" / "a.png").write_bytes(b"changed")
+        self.assertEqual(self.explain(), ["- Rendering blog/post.html: asset changed: images/a.png"])
+        (self.root / "static" / "images" / "a.png").unlink()
+        self.assertEqual(self.explain(), ["- Rendering blog/post.html: asset deleted: images/a.png"])
+
+    def test_explain_lists_every_reason(self):
+        self.explain()
+        self.template.write_text("<h1>{{ Title }}</h1>{{ Content }}")
+        (self.content / "index.md").write_text("# Home\n\nChanged")
+        (self.dest / "blog" / "post.html").unlink()
+        self.assertEqual(self.explain(), [
+            "- Rendering blog/post.html: template changed, output missing",
+            "- Rendering index.html: markdown changed, template changed",
+        ])
+
+    def test_summary_names_the_kind_of_build(self):
+        self.build()
+        for force, kind in ((True, "Full build"), (False, "Incremental build")):
+            out = StringIO()
+            with redirect_stdout(out):
+                generate_pages_incremental(
+                    self.content, self.template, self.dest, "/", self.manifest, force=force
+                )
+            self.assertIn(f"{kind}: {2 if force else 0} rendered", out.getvalue())
+
+    def test_referenced_assets_resolve_like_urls(self):
+        markdown = (
+            "![a](/images/a.png) ![b](b%20c.png?v=2) ![c](../up.png) "
+            "![d](https://x.org/d.png) ![e](../../../etc/passwd)"
+        )
+        self.assertEqual(
+            referenced_assets(markdown, "blog/tom/index.md"),
+            ["blog/tom/b c.png", "blog/up.png", "images/a.png"],
+        )
+
+    def test_referenced_assets_read_lines_a_block_at_a_time(self):
+        lines = StringIO("# T\n\n![a](a.png)\n\n```\n\n![b](/b.png)\n```\n")
+        self.assertEqual(referenced_assets(lines, "blog/index.md"), ["b.png", "blog/a.png"])
+
+    def test_missing_manifest_loads_empty(self):
+        self.assertEqual(load_manifest(self.root / "missing.json"), empty_manifest())
+
+    def test_fingerprint_reuses_hash_when_stat_matches(self):
+        path = self.content / "index.md"
+        fingerprint = file_fingerprint(path)
+        self.assertIs(file_fingerprint(path, fingerprint), fingerprint)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+import unittest
+import io
+import markdown_blocks
+from markdown_blocks import BlockType, markdown_to_blocks, markdown_to_html_node, scan_blocks
+
+
+class TestScanBlocks(unittest.TestCase):
+    def scan(self, text):
+        return [(block_type, block) for block_type, block in scan_blocks(text.split("\n"))]
+
+    def test_types_and_stripping(self):
+        text = "  # Title  \n\n> a\n> b\n\n- x\n- y\n\n1. one\n2. two\n\n\n\nplain\ntext\n"
+        self.assertEqual(self.scan(text), [
+            (BlockType.HEADING, "# Title"),
+            (BlockType.QUOTE, "> a\n> b"),
+            (BlockType.UNORDERED_LIST, "- x\n- y"),
+            (BlockType.ORDERED_LIST, "1. one\n2. two"),
+            (BlockType.PARAGRAPH, "plain\ntext"),
+        ])
+
+    def test_whitespace_only_line_does_not_split(self):
+        self.assertEqual(markdown_to_blocks("a\n   \nb\n\nc"), ["a\n   \nb", "c"])
+
+    def test_fenced_code_keeps_blank_lines(self):
+        text = "```\ndef f():\n\n    return 1\n```\n\nafter"
+        self.assertEqual(self.scan(text), [
+            (BlockType.CODE, "```\ndef f():\n\n    return 1\n```"),
+            (BlockType.PARAGRAPH, "after"),
+        ])
+        html = markdown_to_html_node(text).to_html()
+        self.assertEqual(html, "<div><pre><code>def f():\n\n    return 1\n</code></pre><p>after</p></div>")
+
+    def test_single_line_fence_does_not_open(self):
+        self.assertEqual(markdown_to_blocks("```x```\n\nnext"), ["```x```", "next"])
+
+    def test_unclosed_fence_falls_back_to_plain_splitting(self):
+        self.assertEqual(markdown_to_blocks("```\ncode\n\nrest\n\nmore"), ["```\ncode", "rest", "more"])
+
+    def test_long_fences_spill_without_changing_blocks(self):
+        texts = [
+            "# T\n\n```\n" + "line\r\n\n" * 50 + "```\n\nafter\n\nend",
+            "# T\n\n```\n" + "line\n\n" * 50 + "rest\n\nmore",
+            "```\nshort\n```\n\n```\n" + "x" * 100 + "\n",
+        ]
+        expected = [self.scan(text) for text in texts]
+        limit = markdown_blocks.FENCE_SPILL_CHARS
+        markdown_blocks.FENCE_SPILL_CHARS = 16
+        try:
+            self.assertEqual([self.scan(text) for text in texts], expected)
+        finally:
+            markdown_blocks.FENCE_SPILL_CHARS = limit
+        self.assertEqual(expected[0][1][0], BlockType.CODE)
+        self.assertEqual(len(expected[1]), 53)
+
+    def test_reads_file_lines(self):
+        lines = io.StringIO("# T\n\n```\na\n\nb\n```\n")
+        self.assertEqual(
+            [block_type for block_type, _ in scan_blocks(lines)],
+            [BlockType.HEADING, BlockType.CODE],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
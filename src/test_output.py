@@ -0,0 +1,90 @@
+import unittest
+import os
+import tempfile
+from pathlib import Path
+from gencontent import PageBuildError, render_pages
+from output import AtomicOutput, write_if_changed
+
+
+class TestOutput(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.path = self.root / "out" / "index.html"
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def leftovers(self):
+        return [path.name for path in self.root.rglob("*.tmp")]
+
+    def test_identical_write_is_skipped(self):
+        self.assertTrue(write_if_changed(self.path, b"<p>a</p>"))
+        os.utime(self.path, ns=(0, 0))
+        self.assertFalse(write_if_changed(self.path, b"<p>a</p>"))
+        self.assertEqual(self.path.stat().st_mtime_ns, 0)
+        self.assertTrue(write_if_changed(self.path, b"<p>b</p>"))
+        self.assertEqual(self.path.read_bytes(), b"<p>b</p>")
+        self.assertEqual(self.leftovers(), [])
+
+    def test_atomic_output(self):
+        write_if_changed(self.path, b"same")
+        output = AtomicOutput(self.path)
+        with output as f:
+            f.write("same")
+        self.assertFalse(output.changed)
+
+        with self.assertRaises(ValueError):
+            with AtomicOutput(self.path) as f:
+                f.write("half a page")
+                raise ValueError("render failed")
+        self.assertEqual(self.path.read_bytes(), b"same")
+        self.assertEqual(self.leftovers(), [])
+
+    def test_atomic_output_compares_while_streaming(self):
+        page = "<p>" + "x" * 100000 + "</p>"
+        write_if_changed(self.path, page.encode("utf-8"))
+        os.utime(self.path, ns=(0, 0))
+        for text, changed in [
+            (page, False),
+            (page + "more", True),
+            (page[:50000], True),
+            (page[:70000] + "y" + page[70001:], True),
+            ("", True),
+        ]:
+            output = AtomicOutput(self.path)
+            with output as f:
+                for i in range(0, len(text), 1000):
+                    f.write(text[i:i + 1000])
+            self.assertEqual(output.changed, changed)
+            self.assertEqual(output.size, len(text))
+            self.assertEqual(self.path.read_text(), text)
+            if not changed:
+                self.assertEqual(self.path.stat().st_mtime_ns, 0)
+            write_if_changed(self.path, page.encode("utf-8"))
+        self.assertEqual(self.leftovers(), [])
+
+    def test_write_failure_fails_the_page(self):
+        source = self.root / "page.md"
+        source.write_text("# Title\n\nbody")
+        template = self.root / "template.html"
+        template.write_text("{{ Title }}{{ Content }}")
+        (self.root / "blocked").write_text("")
+        # Serially the first failure stops the build, named like in a worker.
+        with self.assertRaises(PageBuildError) as cm:
+            render_pages(
+                [(source, self.root / "blocked" / "page.html"), (source, self.root / "page.html")],
+                template, "/",
+            )
+        self.assertEqual([str(source)], [failed for _, failed, _ in cm.exception.errors])
+        self.assertFalse((self.root / "page.html").exists())
+        with self.assertRaises(PageBuildError) as cm:
+            render_pages(
+                [(source, self.root / "blocked" / "page.html"), (source, self.root / "page.html")],
+                template, "/", jobs=2,
+            )
+        self.assertEqual([str(source)], [failed for _, failed, _ in cm.exception.errors])
+
+
+if __name__ == "__main__":
+    unittest.main()
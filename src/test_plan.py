@@ -0,0 +1,75 @@
+import unittest
+import os
+import tempfile
+from contextlib import redirect_stdout
+from io import StringIO
+from pathlib import Path
+from copystatic import sync_static
+from plan import format_plan, make_plan, walk
+
+
+class TestBuildPlan(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.content = self.root / "content"
+        self.static = self.root / "static"
+        self.docs = self.root / "docs"
+        for rel in ("index.md", "blog/a/index.md", "blog/b.MD", "notes/draft.txt", "about/index.md"):
+            path = self.content / rel
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(f"# {rel}")
+        (self.static / "images" / "deep").mkdir(parents=True)
+        (self.static / "index.css").write_text("body {}")
+        (self.static / "images" / "deep" / "a.png").write_bytes(b"png")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_parallel_walk_matches_serial(self):
+        serial = walk(self.content)
+        parallel = walk(self.content, jobs=4)
+        self.assertEqual(
+            [rel for rel, _ in serial.files],
+            ["about/index.md", "blog/a/index.md", "blog/b.MD", "index.md", "notes/draft.txt"],
+        )
+        self.assertEqual(serial.dirs, ("about", "blog", "blog/a", "notes"))
+        self.assertEqual(serial, parallel)
+
+    def test_walk_skips_special_files(self):
+        os.mkfifo(self.static / "pipe")
+        with redirect_stdout(StringIO()) as out:
+            tree = walk(self.static)
+        self.assertNotIn("pipe", [rel for rel, _ in tree.files])
+        self.assertIn("Skipping unknown type", out.getvalue())
+
+    def test_plan_lists_every_source_and_destination(self):
+        plan = make_plan(self.content, self.static, self.docs)
+        self.assertEqual(
+            [(step.action, step.destination.relative_to(self.docs).as_posix()) for step in plan.pages],
+            [
+                ("render", "about/index.html"),
+                ("render", "blog/a/index.html"),
+                ("render", "blog/b.html"),
+                ("render", "index.html"),
+            ],
+        )
+        self.assertEqual([step.rel for step in plan.static], ["images/deep/a.png", "index.css"])
+        self.assertEqual(plan.static_dirs, ("images", "images/deep"))
+        self.assertIsInstance(plan.pages, tuple)
+        with self.assertRaises(AttributeError):
+            plan.pages[0].action = "copy"
+        self.assertTrue(format_plan(plan).endswith(
+            "4 page(s) to render, 2 static file(s) to copy into 2 directories"
+        ))
+
+    def test_sync_static_consumes_plan(self):
+        plan = make_plan(self.content, self.static, self.docs)
+        with redirect_stdout(StringIO()):
+            counts = sync_static(self.static, self.docs, self.root / "manifest.json", plan=plan)
+        self.assertEqual(counts["copied"], 2)
+        self.assertEqual((self.docs / "images" / "deep" / "a.png").read_bytes(), b"png")
+
+
+if __name__ == "__main__":
+    unittest.main()
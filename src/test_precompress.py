@@ -0,0 +1,138 @@
+import unittest
+import gzip
+import os
+import tempfile
+from pathlib import Path
+from builder import Builder, Site
+from precompress import Precompressor
+from storage import DirectoryStorage, MemoryStorage
+from watch import Rebuilder
+
+
+TEXT = ("<p>" + "The quick brown fox jumps over the lazy dog. " * 50 + "</p>").encode("utf-8")
+
+SOURCES = {
+    "template.html": "<title>{{ Title }}</title><main>{{ Content }}</main>",
+    "content/index.md": "# Home\n\n" + "Lots of words. " * 200,
+    "content/short.md": "# Short",
+    "static/index.css": "body { color: black; }\n" * 100,
+    "static/images/a.png": b"\x89PNG" * 1000,
+}
+
+
+class TestPrecompress(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_siblings(self):
+        precompressor = Precompressor(["gz"], min_size=1024)
+        self.assertEqual(precompressor.siblings("a/index.html", 2048), ["a/index.html.gz"])
+        self.assertEqual(precompressor.siblings("a/index.html", 100), [])
+        self.assertEqual(precompressor.siblings("images/a.PNG", 2048), [])
+        with self.assertRaises(ValueError):
+            Precompressor(["zip"])
+
+    def test_submit_file_skips_up_to_date_siblings(self):
+        path = self.root / "index.html"
+        path.write_bytes(TEXT)
+        os.utime(path, ns=(1, 1))
+        precompressor = Precompressor(["gz"], min_size=1024, jobs=2)
+        self.assertEqual(precompressor.submit_file(path, "index.html", len(TEXT)), ["index.html.gz"])
+        self.assertEqual(precompressor.finish(), 1)
+        self.assertEqual(gzip.decompress((self.root / "index.html.gz").read_bytes()), TEXT)
+
+        precompressor.submit_file(path, "index.html", len(TEXT))
+        self.assertEqual(precompressor.finish(), 0)
+
+    def test_memory_build(self):
+        output = MemoryStorage()
+        precompressor = Precompressor(["gz"], min_size=1024, jobs=2)
+        Builder(Site(MemoryStorage(SOURCES)), output, precompress=precompressor).build()
+        self.assertEqual(
+            sorted(output.files),
+            ["images/a.png", "index.css", "index.css.gz", "index.html", "index.html.gz", "short.html"],
+        )
+        self.assertEqual(gzip.decompress(output.files["index.html.gz"]), output.files["index.html"])
+
+    def test_directory_build_keeps_siblings(self):
+        source = DirectoryStorage(self.root / "src")
+        for path, data in SOURCES.items():
+            source.write(path, data.encode("utf-8") if isinstance(data, str) else data)
+        out = self.root / "out"
+        manifest = self.root / "manifest.json"
+
+        precompressor = Precompressor(["gz"], min_size=1024, jobs=2)
+        Builder(Site(source), out, manifest=manifest, precompress=precompressor).build()
+        self.assertTrue((out / "index.html.gz").exists())
+        self.assertTrue((out / "index.css.gz").exists())
+        self.assertFalse((out / "short.html.gz").exists())
+
+        Builder(Site(source), out, manifest=manifest, precompress=precompressor).build()
+        self.assertTrue((out / "index.html.gz").exists())
+        Builder(Site(source), out, manifest=manifest).build()
+        self.assertFalse((out / "index.html.gz").exists())
+
+    def test_incremental_build_removes_stale_siblings(self):
+        source = DirectoryStorage(self.root / "src")
+        for path, data in SOURCES.items():
+            source.write(path, data.encode("utf-8") if isinstance(data, str) else data)
+        source.write("content/gone.md", ("# Gone\n\n" + "Words. " * 300).encode("utf-8"))
+        out = self.root / "out"
+        manifest = self.root / "manifest.json"
+
+        def build():
+            precompressor = Precompressor(["gz"], min_size=1024, jobs=2)
+            Builder(
+                Site(source), out, manifest=manifest, incremental=True, precompress=precompressor
+            ).build()
+
+        build()
+        for name in ("index.html.gz", "gone.html.gz", "index.css.gz"):
+            self.assertTrue((out / name).exists(), name)
+
+        source.write("content/index.md", b"# Home\n\nShort now.")
+        (self.root / "src" / "content" / "gone.md").unlink()
+        (self.root / "src" / "static" / "index.css").unlink()
+        build()
+        self.assertTrue((out / "index.html").exists())
+        for name in ("index.html.gz", "gone.html", "gone.html.gz", "index.css.gz"):
+            self.assertFalse((out / name).exists(), name)
+
+    def test_changed_outputs_drop_siblings_without_a_precompressor(self):
+        source = DirectoryStorage(self.root / "src")
+        for path, data in SOURCES.items():
+            source.write(path, data.encode("utf-8") if isinstance(data, str) else data)
+        source.write("static/data.txt", b"plain " * 400)
+        source.write("static/data.txt.gz", b"shipped as is")
+        source.write("content/about.md", ("# About\n\n" + "Words. " * 300).encode("utf-8"))
+        out = self.root / "out"
+        manifest = self.root / "manifest.json"
+        src = self.root / "src"
+
+        precompressor = Precompressor(["gz"], min_size=1024, jobs=2)
+        Builder(Site(source), out, manifest=manifest, precompress=precompressor).build()
+        for name in ("index.html.gz", "about.html.gz", "index.css.gz", "data.txt.gz"):
+            self.assertTrue((out / name).exists(), name)
+
+        source.write("content/index.md", ("# Home\n\n" + "New words. " * 200).encode("utf-8"))
+        source.write("static/index.css", b"body { color: red; }\n" * 100)
+        os.utime(src / "static" / "index.css", ns=(1, 1))
+        Builder(Site(source), out, manifest=manifest, incremental=True).build()
+        self.assertFalse((out / "index.html.gz").exists())
+        self.assertFalse((out / "index.css.gz").exists())
+        self.assertTrue((out / "about.html.gz").exists())
+
+        source.write("content/about.md", b"# About\n\nShorter.")
+        source.write("static/data.txt", b"changed " * 400)
+        rebuilder = Rebuilder(src / "content", src / "static", src / "template.html", out, "/")
+        rebuilder.rebuild([src / "content" / "about.md", src / "static" / "data.txt"])
+        self.assertFalse((out / "about.html.gz").exists())
+        self.assertEqual((out / "data.txt.gz").read_bytes(), b"shipped as is")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+import os
+import pickle
+import tempfile
+from pathlib import Path
+from gencontent import generate_page
+from render_cache import BASEPATH_MARKER, RenderCache
+
+
+MARKDOWN = "# Title\n\nA [link](/blog/tom) and ![img](/images/tom.png)\n\n- [x](https://boot.dev)"
+
+
+class TestRenderCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.cache = RenderCache(self.root / "cache")
+        self.source = self.root / "page.md"
+        self.source.write_text(MARKDOWN)
+        self.template = self.root / "template.html"
+        self.template.write_text('<link href="/index.css"><title>{{ Title }}</title>{{ Content }}')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def render(self, basepath, cache=None):
+        dest = self.root / "out.html"
+        generate_page(self.source, self.template, dest, basepath, cache=cache)
+        return dest.read_text()
+
+    def test_miss_then_hit(self):
+        self.assertIsNone(self.cache.get(MARKDOWN, "/"))
+        self.cache.put(MARKDOWN, "Title", "<p>x</p>", "x")
+        self.assertEqual(self.cache.get(MARKDOWN, "/"), ("Title", "<p>x</p>", "x"))
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_cached_output_matches_uncached_for_every_basepath(self):
+        for basepath in ("/", "/static-site-generator/", "/a/"):
+            expected = self.render(basepath)
+            self.assertEqual(self.render(basepath, self.cache), expected)
+        self.assertEqual(self.cache.misses, 1)
+        self.assertEqual(self.cache.hits, 2)
+
+    def test_marker_in_markdown_is_not_cached(self):
+        self.assertFalse(self.cache.cacheable("# T\n\n" + BASEPATH_MARKER))
+        self.assertTrue(self.cache.cacheable(MARKDOWN))
+
+    def test_evict_removes_least_recently_used(self):
+        self.cache.max_bytes = 0
+        self.cache.put("# a", "a", "<p>a</p>")
+        self.cache.put("# b", "b", "<p>b</p>")
+        paths = sorted((self.root / "cache").glob("*/*.json"))
+        size = paths[0].stat().st_size
+        self.cache.max_bytes = size
+        old, new = (self.cache._path(self.cache.key(text)) for text in ("# a", "# b"))
+        os.utime(old, ns=(1, 1))
+        self.assertEqual(self.cache.evict(), 1)
+        self.assertFalse(old.exists())
+        self.assertTrue(new.exists())
+
+    def test_pickles_for_worker_processes(self):
+        self.cache.hits = 5
+        copy = pickle.loads(pickle.dumps(self.cache))
+        self.assertEqual(copy.directory, self.cache.directory)
+        self.assertEqual(copy.key(MARKDOWN), self.cache.key(MARKDOWN))
+        self.assertEqual(copy.hits, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
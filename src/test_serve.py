@@ -0,0 +1,129 @@
+import unittest
+import asyncio
+import tempfile
+import threading
+from pathlib import Path
+from serve import LIVE_RELOAD_SCRIPT, DevServer, FileCache, PageRenderer
+
+
+class TestDevServer(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+        self.docs = self.root / "docs"
+        (self.docs / "blog").mkdir(parents=True)
+        (self.docs / "index.html").write_text("<html><body><p>home</p></body></html>")
+        (self.docs / "blog" / "index.html").write_text("<html><body>blog</body></html>")
+        (self.docs / "index.css").write_text("body {}")
+        self.files = FileCache(self.docs, live_reload=True)
+        self.files.refresh()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def request(self, server, *raw_requests):
+        async def run():
+            listener = await asyncio.start_server(server.handle, "127.0.0.1", 0)
+            port = listener.sockets[0].getsockname()[1]
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            responses = []
+            for raw in raw_requests:
+                writer.write(raw.encode())
+                head = await reader.readuntil(b"\r\n\r\n")
+                lines = head.decode().split("\r\n")
+                headers = dict(line.split(": ", 1) for line in lines[1:] if line)
+                body = await reader.readexactly(int(headers.get("Content-Length", 0)))
+                if raw.startswith("HEAD") or lines[0].split()[1] == "304":
+                    body = b""
+                responses.append((int(lines[0].split()[1]), headers, body))
+            writer.close()
+            listener.close()
+            await listener.wait_closed()
+            return responses
+
+        return asyncio.run(run())
+
+    def get(self, path, headers=""):
+        return f"GET {path} HTTP/1.1\r\nHost: x\r\n{headers}\r\n"
+
+    def test_serves_files_with_live_reload_over_keep_alive(self):
+        server = DevServer(self.files)
+        (index, css) = self.request(server, self.get("/"), self.get("/index.css"))
+        self.assertEqual(index[0], 200)
+        self.assertIn(LIVE_RELOAD_SCRIPT + b"</body>", index[2])
+        self.assertEqual(css[1]["Content-Type"], "text/css; charset=utf-8")
+        self.assertEqual(css[2], b"body {}")
+
+    def test_conditional_get(self):
+        server = DevServer(self.files)
+        ((_, headers, _),) = self.request(server, self.get("/index.css"))
+        (by_etag, by_date) = self.request(
+            server,
+            self.get("/index.css", f"If-None-Match: {headers['ETag']}\r\n"),
+            self.get("/index.css", f"If-Modified-Since: {headers['Last-Modified']}\r\n"),
+        )
+        self.assertEqual(by_etag[0], 304)
+        self.assertEqual(by_date[0], 304)
+
+    def test_redirects_missing_and_bad_requests(self):
+        server = DevServer(self.files)
+        redirect, missing, escape, post = self.request(
+            server,
+            self.get("/blog"),
+            self.get("/nope.html"),
+            self.get("/../../etc/passwd"),
+            "POST / HTTP/1.1\r\nContent-Length: 0\r\n\r\n",
+        )
+        self.assertEqual((redirect[0], redirect[1]["Location"]), (301, "/blog/"))
+        self.assertEqual(missing[0], 404)
+        self.assertEqual(escape[0], 404)
+        self.assertEqual(post[0], 405)
+
+    def test_paths_are_percent_decoded(self):
+        (self.docs / "my notes").mkdir()
+        (self.docs / "my notes" / "index.html").write_text("<body>notes</body>")
+        self.files.refresh()
+        server = DevServer(self.files)
+        page, redirect, escape, nul = self.request(
+            server,
+            self.get("/my%20notes/"),
+            self.get("/my%20notes"),
+            self.get("/%2e%2e/%2e%2e/etc/passwd"),
+            self.get("/index.css%00.html"),
+        )
+        self.assertEqual(page[0], 200)
+        self.assertEqual((redirect[0], redirect[1]["Location"]), (301, "/my%20notes/"))
+        self.assertEqual(escape[0], 404)
+        self.assertEqual(nul[0], 404)
+
+    def test_refresh_picks_up_changes(self):
+        (self.docs / "index.css").write_text("body { color: red }")
+        (self.docs / "new.css").write_text("p {}")
+        self.files.refresh()
+        self.assertEqual(self.files.get("index.css").body, b"body { color: red }")
+        self.assertEqual(self.files.get("new.css").body, b"p {}")
+
+    def test_render_mode_renders_from_content(self):
+        content = self.root / "content"
+        (content / "blog").mkdir(parents=True)
+        (content / "blog" / "index.md").write_text("# Blog\n\nA [post](/blog/post)")
+        template = self.root / "template.html"
+        template.write_text("<title>{{ Title }}</title><body>{{ Content }}</body>")
+        renderer = PageRenderer(content, template, "/docs/")
+        rendered_on = []
+        get = renderer.get
+        renderer.get = lambda rel: rendered_on.append(threading.current_thread()) or get(rel)
+        server = DevServer(FileCache(self.root / "static"), renderer)
+        ((status, _, body),) = self.request(server, self.get("/blog/"))
+        self.assertNotIn(threading.main_thread(), rendered_on)
+        self.assertEqual(status, 200)
+        self.assertIn(b'<title>Blog</title>', body)
+        self.assertIn(b'<a href="/docs/blog/post">post</a>', body)
+        self.assertFalse((content / "blog" / "index.html").exists())
+
+        renderer.invalidate()
+        self.assertEqual(renderer.pages, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,119 @@
+import unittest
+import json
+import tempfile
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from builder import Builder, Site
+from gencontent import content_summary, extract_summary, generate_page, generate_pages_incremental
+from markdown_blocks import markdown_to_html_node
+from render_cache import RenderCache
+from manifest import load_manifest, save_manifest
+from siteindex import PageRecord, atom_feed, page_url, sitemap_xml
+from storage import MemoryStorage
+
+
+ATOM = "{http://www.w3.org/2005/Atom}"
+SITEMAP = "{http://www.sitemaps.org/schemas/sitemap/0.9}"
+
+SOURCES = {
+    "template.html": "<title>{{ Title }}</title>{{ Content }}",
+    "content/index.md": "# Home\n\nWelcome & hello.",
+    "content/blog/first/index.md": "# First\n\n[< Back](/)\n\nThe **first** post.",
+    "content/blog/second/index.md": "# Second\n\nThe second post.",
+}
+
+
+class TestSiteIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_extract_summary(self):
+        self.assertEqual(
+            extract_summary("# Title\n\n![banner](/b.png)\n\n[< Back](/)\n\nSome _real_\ntext [here](/x)."),
+            "Some real text here.",
+        )
+        self.assertEqual(extract_summary("# Title\n\n- a list"), "")
+        summary = extract_summary("word " * 100, length=20)
+        self.assertEqual(len(summary), 20)
+        self.assertTrue(summary.endswith("…"))
+
+    def test_rendering_returns_the_same_summary(self):
+        markdown = "# T\n\n[< Back](/)\n\n![b](/b.png) Some `code` and **bold** [x](/x)\n\n> q"
+        expected = extract_summary(markdown)
+        self.assertEqual(expected, "Some code and bold x")
+        self.assertEqual(content_summary(markdown_to_html_node(markdown).children), expected)
+
+        source = self.root / "page.md"
+        source.write_text(markdown)
+        template = self.root / "template.html"
+        template.write_text("{{ Title }}{{ Content }}")
+        cache = RenderCache(self.root / "cache")
+        for stream, cache in [(False, None), (True, None), (False, cache), (False, cache)]:
+            info = generate_page(source, template, self.root / "page.html", "/", cache=cache, stream=stream)
+            self.assertEqual(info, {"title": "T", "summary": expected})
+        self.assertEqual(cache.hits, 1)
+
+    def test_page_url(self):
+        self.assertEqual(page_url("index.html", "/"), "/")
+        self.assertEqual(page_url("blog/tom/index.html", "/site/"), "/site/blog/tom/")
+        self.assertEqual(page_url("about.html", "/site"), "/site/about.html")
+
+    def test_sitemap_and_feed(self):
+        records = [
+            PageRecord("/", "index.html", "Home", "Hi", 0),
+            PageRecord("/blog/a/", "blog/a/index.html", "A & B", "About <a>", 200),
+            PageRecord("/blog/b/", "blog/b/index.html", "B", "", None),
+        ]
+        sitemap = ET.fromstring(sitemap_xml(records, "https://example.com/"))
+        self.assertEqual(
+            [url.find(f"{SITEMAP}loc").text for url in sitemap],
+            ["https://example.com/", "https://example.com/blog/a/", "https://example.com/blog/b/"],
+        )
+        self.assertIsNone(sitemap[2].find(f"{SITEMAP}lastmod"))
+
+        feed = ET.fromstring(atom_feed(records, "https://example.com", "/", 100))
+        self.assertEqual(feed.find(f"{ATOM}title").text, "Home")
+        entries = feed.findall(f"{ATOM}entry")
+        self.assertEqual([entry.find(f"{ATOM}title").text for entry in entries], ["A & B", "B"])
+        self.assertEqual(entries[0].find(f"{ATOM}summary").text, "About <a>")
+        self.assertEqual(feed.find(f"{ATOM}updated").text, "1970-01-01T00:03:20Z")
+
+    def test_memory_build(self):
+        output = MemoryStorage()
+        Builder(Site(MemoryStorage(SOURCES), "/site/"), output, site_url="https://e.org").build()
+        index = json.loads(output.files["search-index.json"])
+        self.assertEqual(index[0], {"u": "/site/blog/first/", "t": "First", "s": "The first post."})
+        self.assertIn(b"https://e.org/site/blog/second/", output.files["feed.xml"])
+
+    def test_unchanged_pages_come_from_the_manifest(self):
+        for path, text in SOURCES.items():
+            (self.root / path).parent.mkdir(parents=True, exist_ok=True)
+            (self.root / path).write_text(text)
+        (self.root / "static").mkdir()
+        manifest = self.root / "manifest.json"
+        builder = Builder(
+            Site(self.root), self.root / "docs", incremental=True, manifest=manifest,
+            site_url="https://e.org",
+        )
+        builder.build()
+        first = (self.root / "docs" / "search-index.json").read_bytes()
+
+        # Dropped entries (a manifest from before pages were indexed) are
+        # filled in without rendering the page.
+        data = load_manifest(manifest)
+        del data["pages"]["index.html"]["title"]
+        save_manifest(data, manifest)
+        pages = generate_pages_incremental(
+            self.root / "content", self.root / "template.html", self.root / "docs", "/", manifest
+        )
+        self.assertEqual(pages["index.html"]["summary"], "Welcome & hello.")
+        builder.build()
+        self.assertEqual((self.root / "docs" / "search-index.json").read_bytes(), first)
+
+
+if __name__ == "__main__":
+    unittest.main()
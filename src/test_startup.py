@@ -0,0 +1,69 @@
+import unittest
+import os
+from pathlib import Path
+from startup import import_total_us, measure, parse_importtime
+
+
+MAIN = Path(__file__).resolve().parent / "main.py"
+REPO = MAIN.parent.parent
+
+# Time spent importing for `main.py --version`, best of a few runs, as a
+# multiple of a bare interpreter's imports measured in the same run, so the
+# budget holds on slow and fast machines alike. Loading everything eagerly
+# took about 13 times the bare imports; the lazy entry point takes about 4.5.
+STARTUP_IMPORT_BUDGET_RATIO = 8
+
+# Set to a number of milliseconds to check against that instead.
+BUDGET_ENV = "STARTUP_IMPORT_BUDGET_MS"
+
+# Only needed once pages are rendered, static files copied or stats kept.
+LAZY_MODULES = [
+    "gencontent", "markdown_blocks", "inline", "htmlnode", "textnode", "template",
+    "copystatic", "manifest", "render_cache", "buildstats", "watch",
+    "multiprocessing", "concurrent.futures", "tarfile", "zipfile", "cProfile", "pstats",
+]
+
+
+class TestStartup(unittest.TestCase):
+    def test_parse_importtime(self):
+        entries = parse_importtime(
+            "import time: self [us] | cumulative | imported package\n"
+            "import time:       120 |        120 |   zlib\n"
+            "import time:       900 |       1020 | gzip\n"
+            "something else\n"
+        )
+        self.assertEqual(entries, [("zlib", 120, 120, 1), ("gzip", 900, 1020, 0)])
+        self.assertEqual(import_total_us(entries), 1020)
+
+    def test_version_stays_within_budget(self):
+        best = baseline = None
+        for _ in range(3):
+            _, entries, result = measure(MAIN, ["--version"])
+            self.assertEqual(result.returncode, 0, result.stderr)
+            imported = {entry[0] for entry in entries}
+            for module in LAZY_MODULES:
+                self.assertNotIn(module, imported)
+            total = import_total_us(entries) / 1000
+            best = total if best is None else min(best, total)
+
+            _, entries, _ = measure("-c", ["pass"])
+            bare = import_total_us(entries) / 1000
+            baseline = bare if baseline is None else min(baseline, bare)
+
+        if os.environ.get(BUDGET_ENV):
+            budget = float(os.environ[BUDGET_ENV])
+        else:
+            budget = baseline * STARTUP_IMPORT_BUDGET_RATIO
+        self.assertLess(best, budget, f"bare interpreter imports took {baseline:.1f} ms")
+
+    def test_dry_run_does_not_load_the_renderer(self):
+        _, entries, result = measure(MAIN, ["--dry-run"], cwd=REPO)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertIn("page(s) to render", result.stdout)
+        imported = {entry[0] for entry in entries}
+        for module in ("gencontent", "markdown_blocks", "htmlnode", "textnode", "copystatic"):
+            self.assertNotIn(module, imported)
+
+
+if __name__ == "__main__":
+    unittest.main()
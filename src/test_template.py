@@ -0,0 +1,46 @@
+import unittest
+import io
+import tempfile
+from pathlib import Path
+from htmlnode import LeafNode, ParentNode
+from template import Template, load_template
+
+
+class TestTemplate(unittest.TestCase):
+    def test_render_fills_slots(self):
+        template = Template("<title>{{ Title }}</title><article>{{ Content }}</article>")
+        self.assertEqual(
+            template.render(title="Hi", content="<p>x</p>"),
+            "<title>Hi</title><article><p>x</p></article>",
+        )
+
+    def test_basepath_applied_to_literal_segments(self):
+        template = Template('<link href="/index.css" /><img src="/a.png" />{{ Content }}', "/site/")
+        self.assertEqual(
+            template.render(content='<a href="/x">'),
+            '<link href="/site/index.css" /><img src="/site/a.png" /><a href="/x">',
+        )
+
+    def test_repeated_slots(self):
+        template = Template("{{ Title }}|{{ Title }}")
+        self.assertEqual(template.slots, ["title", "title"])
+        self.assertEqual(template.render(title="a"), "a|a")
+
+    def test_write_streams_nodes(self):
+        template = Template("<title>{{ Title }}</title><article>{{ Content }}</article>")
+        buffer = io.StringIO()
+        template.write(buffer, title="Hi", content=ParentNode("div", [LeafNode("b", "x")]))
+        self.assertEqual(buffer.getvalue(), "<title>Hi</title><article><div><b>x</b></div></article>")
+
+    def test_load_template_is_cached_until_file_changes(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "template.html"
+            path.write_text("<h1>{{ Title }}</h1>")
+            first = load_template(path)
+            self.assertIs(load_template(path), first)
+            path.write_text("<h2>{{ Title }}</h2>!")
+            self.assertEqual(load_template(path).render(title="t"), "<h2>t</h2>!")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -90,6 +90,16 @@ class TestTextNode(unittest.TestCase):
         self.assertEqual(html_node.value, "")
         self.assertEqual(html_node.props, {"src": "https://www.google.com/image.png", "alt": "alt text here"},)
 
+    def test_link_basepath(self):
+        node = TextNode("home", TextType.LINK, "/blog/tom")
+        html_node = text_node_to_html_node(node, "/static-site-generator/")
+        self.assertEqual(html_node.props, {"href": "/static-site-generator/blog/tom"})
+
+    def test_image_basepath_skips_absolute_urls(self):
+        node = TextNode("alt", TextType.IMAGE, "https://www.google.com/image.png")
+        html_node = text_node_to_html_node(node, "/static-site-generator/")
+        self.assertEqual(html_node.props["src"], "https://www.google.com/image.png")
+
     def test_invalid_type_raises(self):
         class FakeType: pass
         node = TextNode("x", FakeType())
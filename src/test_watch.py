@@ -0,0 +1,113 @@
+import unittest
+import contextlib
+import io
+import os
+import tempfile
+from pathlib import Path
+from gencontent import generate_pages_incremental
+from manifest import load_manifest
+from watch import PollingWatcher, Rebuilder, is_ignored
+
+
+class TestWatch(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = Path(self.tmp.name).resolve()
+        self.content = self.root / "content"
+        self.static = self.root / "static"
+        self.docs = self.root / "docs"
+        (self.content / "blog").mkdir(parents=True)
+        self.static.mkdir()
+        self.docs.mkdir()
+        self.template = self.root / "template.html"
+        self.template.write_text("<title>{{ Title }}</title>{{ Content }}")
+        (self.content / "index.md").write_text("# Home\n\nhello")
+        (self.content / "blog" / "post.md").write_text("# Post\n\nbody")
+        self.rebuilder = Rebuilder(self.content, self.static, self.template, self.docs, "/")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_polling_watcher_reports_changes(self):
+        watcher = PollingWatcher([self.content], [self.template], interval=0)
+        (self.content / "index.md").write_text("# Home\n\nchanged!")
+        (self.content / "new.md").write_text("# New")
+        (self.content / "blog" / "post.md").unlink()
+        self.assertEqual(
+            watcher.poll(0),
+            {self.content / "index.md", self.content / "new.md", self.content / "blog" / "post.md"},
+        )
+        self.assertEqual(watcher.poll(0), set())
+
+    def test_markdown_change_renders_one_page(self):
+        summary = self.rebuilder.rebuild({self.content / "index.md"})
+        self.assertEqual(summary["pages"], 1)
+        self.assertIn("<p>hello</p>", (self.docs / "index.html").read_text())
+        self.assertFalse((self.docs / "blog" / "post.html").exists())
+
+    def test_deleted_markdown_removes_output(self):
+        self.rebuilder.rebuild({self.content / "blog" / "post.md"})
+        (self.content / "blog" / "post.md").unlink()
+        summary = self.rebuilder.rebuild({self.content / "blog" / "post.md"})
+        self.assertEqual(summary["removed"], 1)
+        self.assertFalse((self.docs / "blog" / "post.html").exists())
+
+    def test_template_change_renders_all_pages(self):
+        summary = self.rebuilder.rebuild({self.template})
+        self.assertEqual(summary["pages"], 2)
+
+    def test_static_file_copied_and_removed(self):
+        (self.static / "a.css").write_text("body {}")
+        self.assertEqual(self.rebuilder.rebuild({self.static / "a.css"})["static"], 1)
+        self.assertEqual((self.docs / "a.css").read_text(), "body {}")
+        os.unlink(self.static / "a.css")
+        self.assertEqual(self.rebuilder.rebuild({self.static / "a.css"})["removed"], 1)
+
+    def test_removed_directory_drops_only_orphans(self):
+        self.rebuilder.rebuild({self.content / "blog"})
+        (self.static / "blog").mkdir()
+        (self.static / "blog" / "style.css").write_text("x")
+        self.rebuilder.rebuild({self.static / "blog"})
+        (self.content / "blog" / "post.md").unlink()
+        (self.content / "blog").rmdir()
+        self.rebuilder.rebuild({self.content / "blog"})
+        self.assertFalse((self.docs / "blog" / "post.html").exists())
+        self.assertTrue((self.docs / "blog" / "style.css").exists())
+
+    def test_rebuilds_update_the_manifest(self):
+        manifest = self.root / "manifest.json"
+
+        def incremental_build():
+            out = io.StringIO()
+            with contextlib.redirect_stdout(out):
+                generate_pages_incremental(
+                    self.content, self.template, self.docs, "/", manifest, static_dir=self.static
+                )
+            return out.getvalue()
+
+        self.assertIn("2 rendered", incremental_build())
+        rebuilder = Rebuilder(
+            self.content, self.static, self.template, self.docs, "/", manifest=manifest
+        )
+        (self.content / "index.md").write_text("# Home\n\n![a](/a.png) changed")
+        (self.content / "blog" / "post.md").unlink()
+        rebuilder.rebuild({self.content / "index.md", self.content / "blog" / "post.md"})
+
+        pages = load_manifest(manifest)["pages"]
+        self.assertEqual(sorted(pages), ["index.html"])
+        self.assertEqual(pages["index.html"]["summary"], "changed")
+        self.assertEqual(pages["index.html"]["assets"], {"a.png": None})
+        self.assertIn("0 rendered, 1 unchanged, 0 removed", incremental_build())
+
+        self.template.write_text("<h1>{{ Title }}</h1>{{ Content }}")
+        rebuilder.rebuild({self.template})
+        self.assertIn("0 rendered", incremental_build())
+
+    def test_editor_temp_files_ignored(self):
+        self.assertTrue(is_ignored(Path(".index.md.swp")))
+        self.assertTrue(is_ignored(Path("index.md~")))
+        self.assertFalse(is_ignored(Path("index.md")))
+
+
+if __name__ == "__main__":
+    unittest.main()
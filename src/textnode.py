@@ -12,6 +12,8 @@ class TextType(Enum):
     
 
 class TextNode():
+    __slots__ = ("text", "text_type", "url")
+
     def __init__(self, some_text, some_type, some_url=None):
         self.text = some_text 
         self.text_type = some_type
@@ -29,24 +31,28 @@ class TextNode():
     def __repr__(self):
         return f"TextNode({self.text}, {self.text_type}, {self.url})"
     
-def text_node_to_html_node(text_node):
-    if text_node.text_type == TextType.TEXT:
-        return LeafNode(None, text_node.text)
-    
-    if text_node.text_type == TextType.BOLD:
-        return LeafNode("b", text_node.text)
-    
-    if text_node.text_type == TextType.ITALIC:
-        return LeafNode("i", text_node.text)
-    
-    if text_node.text_type == TextType.CODE:
-        return LeafNode("code", text_node.text)
-    
-    if text_node.text_type == TextType.LINK:
-        return LeafNode("a", text_node.text, {"href": text_node.url})
-    
-    if text_node.text_type == TextType.IMAGE:
-        return LeafNode("img", "", {"src": text_node.url, "alt": text_node.text})
-    
-    raise Exception(f"Unsupported TextType: {text_node.text_type}")
+def rewrite_url(url, basepath):
+    if basepath != "/" and url.startswith("/"):
+        return basepath + url[1:]
+    return url
+
+
+TEXT_NODE_BUILDERS = {
+    TextType.TEXT: lambda node, basepath: LeafNode(None, node.text),
+    TextType.BOLD: lambda node, basepath: LeafNode("b", node.text),
+    TextType.ITALIC: lambda node, basepath: LeafNode("i", node.text),
+    TextType.CODE: lambda node, basepath: LeafNode("code", node.text),
+    TextType.LINK: lambda node, basepath: LeafNode(
+        "a", node.text, {"href": rewrite_url(node.url, basepath)}
+    ),
+    TextType.IMAGE: lambda node, basepath: LeafNode(
+        "img", "", {"src": rewrite_url(node.url, basepath), "alt": node.text}
+    ),
+}
+
 
+def text_node_to_html_node(text_node, basepath="/"):
+    builder = TEXT_NODE_BUILDERS.get(text_node.text_type)
+    if builder is None:
+        raise Exception(f"Unsupported TextType: {text_node.text_type}")
+    return builder(text_node, basepath)
@@ -0,0 +1,388 @@
+from pathlib import Path
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+from copystatic import FilePlacer
+from gencontent import find_pages, generate_page, referenced_assets, render_pages
+from output import PRECOMPRESSED_SUFFIXES, remove_precompressed
+from manifest import file_fingerprint, load_manifest, page_entry, save_manifest
+
+
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_ATTRIB
+EVENT_HEADER = struct.Struct("iIII")
+
+# Editor swap and backup files that should never trigger a rebuild.
+IGNORED_SUFFIXES = ("~", ".swp", ".swx", ".tmp")
+
+
+def is_ignored(path):
+    name = path.name
+    return name.startswith(".#") or name.endswith(IGNORED_SUFFIXES)
+
+
+class InotifyWatcher():
+    def __init__(self, roots, files=()):
+        libc_name = ctypes.util.find_library("c")
+        if libc_name is None:
+            raise OSError("libc not found")
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self._libc, "inotify_init1"):
+            raise OSError("inotify not available")
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        # wd -> (directory, whole tree?); directories watched only for a
+        # single file report nothing else.
+        self.watches = {}
+        self.files = {Path(f).resolve() for f in files}
+        self.overflowed = False
+        for root in roots:
+            self._watch_tree(Path(root).resolve())
+        # Watch the parent directory of single files: editors often replace a
+        # file with a rename, which would silently drop a watch on the file.
+        for parent in {f.parent for f in self.files}:
+            self._add_watch(parent, tree=False)
+
+    def _add_watch(self, path, tree=True):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {path}")
+        _, was_tree = self.watches.get(wd, (path, False))
+        self.watches[wd] = (path, tree or was_tree)
+
+    def _watch_tree(self, root, changed=None):
+        self._add_watch(root)
+        with os.scandir(root) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    self._watch_tree(Path(entry.path), changed)
+                elif changed is not None:
+                    # Files created before the watch on a new directory existed.
+                    changed.add(Path(entry.path))
+
+    def _read_events(self, changed):
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                self.overflowed = True
+                continue
+            if mask & IN_IGNORED:
+                self.watches.pop(wd, None)
+                continue
+            if wd not in self.watches or not name:
+                continue
+            directory, tree = self.watches[wd]
+            path = directory / os.fsdecode(name)
+            if not tree:
+                if path in self.files:
+                    changed.add(path)
+                continue
+            if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                self._watch_tree(path, changed)
+            changed.add(path)
+
+    def poll(self, timeout):
+        changed = set()
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if readable:
+            self._read_events(changed)
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher():
+    def __init__(self, roots, files=(), interval=0.5):
+        self.roots = [Path(root).resolve() for root in roots]
+        self.files = [Path(f).resolve() for f in files]
+        self.interval = interval
+        self.overflowed = False
+        self.snapshot = self._snapshot()
+
+    def _snapshot(self):
+        snapshot = {}
+        for path in self.files:
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+        pending = list(self.roots)
+        while pending:
+            directory = pending.pop()
+            try:
+                entries = list(os.scandir(directory))
+            except FileNotFoundError:
+                continue
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append(Path(entry.path))
+                    snapshot[Path(entry.path)] = None
+                else:
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    snapshot[Path(entry.path)] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def poll(self, timeout):
+        time.sleep(min(timeout, self.interval) if timeout is not None else self.interval)
+        current = self._snapshot()
+        changed = {
+            path for path, stat in current.items()
+            if stat is not None and self.snapshot.get(path) != stat
+        }
+        changed.update(path for path in self.snapshot if path not in current)
+        self.snapshot = current
+        return changed
+
+    def close(self):
+        pass
+
+
+def make_watcher(roots, files=(), polling=False):
+    if not polling:
+        try:
+            return InotifyWatcher(roots, files)
+        except (OSError, AttributeError) as e:
+            print(f"inotify unavailable ({e}), falling back to polling")
+    return PollingWatcher(roots, files)
+
+
+def wait_for_changes(watcher, debounce=0.1):
+    changed = set()
+    while not changed and not watcher.overflowed:
+        changed = watcher.poll(None if isinstance(watcher, InotifyWatcher) else 1.0)
+    first_event = time.perf_counter()
+    # Keep collecting until the burst (save, rename, git checkout) goes quiet.
+    while True:
+        more = watcher.poll(debounce)
+        if not more:
+            break
+        changed |= more
+    changed = {path for path in changed if not is_ignored(path)}
+    return changed, first_event
+
+
+class Rebuilder():
+    # With a manifest, the entries of pages it re-renders or removes are
+    # updated, so the next incremental build does not redo its work.
+    def __init__(self, content_dir, static_dir, template_path, dest_dir, basepath, cache=None, jobs=1,
+                 manifest=None):
+        self.content_dir = Path(content_dir).resolve()
+        self.static_dir = Path(static_dir).resolve()
+        self.template_path = Path(template_path).resolve()
+        self.dest_dir = Path(dest_dir).resolve()
+        self.basepath = basepath
+        self.cache = cache
+        self.jobs = jobs
+        self.manifest = manifest
+        self.placer = FilePlacer()
+
+    def _relative(self, path, root):
+        try:
+            return path.relative_to(root)
+        except ValueError:
+            return None
+
+    def rebuild(self, changed, full=False):
+        # entries maps the output path (relative, as in the manifest) of each
+        # page rendered to its new manifest entry, or to None if removed.
+        summary = {"pages": 0, "static": 0, "removed": 0, "done": set(), "entries": {}}
+        try:
+            if full or self.template_path in changed:
+                pages = find_pages(self.content_dir, self.dest_dir)
+                entries = [self._entry_before_render(source) for source, _ in pages]
+                infos = render_pages(pages, self.template_path, self.basepath, self.jobs, cache=self.cache)
+                for (_, destination), entry, info in zip(pages, entries, infos):
+                    self._record(destination, entry, info, summary)
+                summary["pages"] = len(pages)
+                changed = {path for path in changed if self._relative(path, self.content_dir) is None}
+
+            for path in sorted(changed):
+                rel = self._relative(path, self.content_dir)
+                if rel is not None:
+                    self._content_changed(path, rel, summary)
+                    continue
+                rel = self._relative(path, self.static_dir)
+                if rel is not None:
+                    self._static_changed(path, rel, summary)
+        finally:
+            # Pages done before a failure are recorded too.
+            self._update_manifest(summary["entries"])
+        return summary
+
+    def _entry_before_render(self, source):
+        # Fingerprinted before rendering, so an edit made while the page
+        # renders leaves it stale for the next build.
+        if self.manifest is None:
+            return None
+        rel_source = source.relative_to(self.content_dir).as_posix()
+        source_fp = file_fingerprint(source)
+        with open(source, "r") as f:
+            referenced = referenced_assets(f, rel_source)
+        assets = {}
+        for asset in referenced:
+            path = self.static_dir / asset
+            assets[asset] = file_fingerprint(path) if path.is_file() else None
+        return rel_source, source_fp, assets
+
+    def _record(self, destination, entry, info, summary):
+        if entry is not None:
+            summary["entries"][destination.relative_to(self.dest_dir).as_posix()] = entry + (info,)
+
+    def _update_manifest(self, entries):
+        if self.manifest is None or not entries:
+            return
+        manifest = load_manifest(self.manifest)
+        template_fp = file_fingerprint(self.template_path, manifest.get("template"))
+        manifest["template"] = template_fp
+        for key, entry in entries.items():
+            if entry is None:
+                manifest["pages"].pop(key, None)
+                continue
+            rel_source, source_fp, assets, info = entry
+            manifest["pages"][key] = page_entry(
+                rel_source, source_fp, template_fp, self.basepath, assets, info
+            )
+        save_manifest(manifest, self.manifest)
+
+    def _content_changed(self, path, rel, summary):
+        if path.is_dir():
+            for source, destination in find_pages(path, self.dest_dir / rel):
+                self._render(source, destination, summary)
+        elif path.is_file():
+            if path.suffix.lower() == ".md":
+                self._render(path, (self.dest_dir / rel).with_suffix(".html"), summary)
+        elif path.suffix.lower() == ".md":
+            self._remove(self.dest_dir / rel.with_suffix(".html"), summary)
+        else:
+            self._remove_orphans(self.dest_dir / rel, summary)
+
+    def _render(self, source, destination, summary):
+        # A new directory is reported along with the files inside it.
+        if source in summary["done"]:
+            return
+        summary["done"].add(source)
+        entry = self._entry_before_render(source)
+        info = generate_page(source, self.template_path, destination, self.basepath, cache=self.cache)
+        self._record(destination, entry, info, summary)
+        summary["pages"] += 1
+
+    def _static_changed(self, path, rel, summary):
+        destination = self.dest_dir / rel
+        if path.is_dir():
+            for source in path.rglob("*"):
+                if source.is_file() and not is_ignored(source):
+                    self._static_changed(source, source.relative_to(self.static_dir), summary)
+        elif path.is_file():
+            os.makedirs(destination.parent, exist_ok=True)
+            self.placer.place(path, destination, os.stat(path))
+            self._remove_precompressed(destination)
+            summary["static"] += 1
+        elif destination.is_dir():
+            self._remove_orphans(destination, summary)
+        else:
+            self._remove(destination, summary)
+
+    def _remove(self, path, summary):
+        if path.is_file():
+            path.unlink()
+            summary["removed"] += 1
+        self._remove_precompressed(path)
+        if self.manifest is not None and path.suffix == ".html":
+            summary["entries"][path.relative_to(self.dest_dir).as_posix()] = None
+
+    def _remove_precompressed(self, path):
+        # A changed or removed output's siblings are stale, except those
+        # that are static files in their own right.
+        rel = path.relative_to(self.dest_dir)
+        keep = {
+            path.with_name(path.name + suffix)
+            for suffix in PRECOMPRESSED_SUFFIXES
+            if (self.static_dir / rel).with_name(path.name + suffix).is_file()
+        }
+        remove_precompressed(path, keep)
+
+    def _remove_orphans(self, directory, summary):
+        # A whole directory vanished from content/ or static/: drop outputs
+        # under it that no longer have a source in either tree.
+        if not directory.is_dir():
+            return
+        for output in sorted(directory.rglob("*"), reverse=True):
+            rel = output.relative_to(self.dest_dir)
+            if output.is_dir():
+                try:
+                    output.rmdir()
+                except OSError:
+                    pass
+                continue
+            if (self.static_dir / rel).exists():
+                continue
+            if output.suffix == ".html" and (self.content_dir / rel.with_suffix(".md")).exists():
+                continue
+            self._remove(output, summary)
+        try:
+            directory.rmdir()
+        except OSError:
+            pass
+
+
+def watch(content_dir, static_dir, template_path, dest_dir, basepath,
+          cache=None, jobs=1, polling=False, debounce=0.1, manifest=None):
+    rebuilder = Rebuilder(
+        content_dir, static_dir, template_path, dest_dir, basepath, cache, jobs, manifest
+    )
+    watcher = make_watcher([content_dir, static_dir], [template_path], polling)
+    kind = "inotify" if isinstance(watcher, InotifyWatcher) else "polling"
+    print(f"Watching {content_dir}, {static_dir} and {template_path} ({kind}); Ctrl-C to stop")
+    try:
+        while True:
+            changed, first_event = wait_for_changes(watcher, debounce)
+            full = watcher.overflowed
+            watcher.overflowed = False
+            if not changed and not full:
+                continue
+            rebuild_start = time.perf_counter()
+            try:
+                summary = rebuilder.rebuild(changed, full)
+            except Exception as e:
+                # Keep watching: the next save may well fix it.
+                print(f"Rebuild failed: {type(e).__name__}: {e}")
+                continue
+            now = time.perf_counter()
+            print(
+                f"Rebuilt {summary['pages']} page(s), copied {summary['static']} static file(s), "
+                f"removed {summary['removed']} in {(now - rebuild_start) * 1000:.1f} ms "
+                f"({(now - first_event) * 1000:.1f} ms since first change)"
+            )
+    except KeyboardInterrupt:
+        print("Stopped watching")
+    finally:
+        watcher.close()